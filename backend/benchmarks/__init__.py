@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the backend. Run them from the `backend/` directory, e.g.
+
+    python -m benchmarks.ann_scaling
+"""
@@ -0,0 +1,145 @@
+"""
+Scaling benchmark for the IVF approximate nearest-neighbor tier.
+
+Generates clustered, unit-norm synthetic catalogs of increasing size and compares
+per-query latency of an exact brute-force scan (optionally vec0 itself) against
+the IVF index at several `nprobe` settings, along with recall@k.
+
+    python -m benchmarks.ann_scaling --sizes 10000 50000 100000 --nprobe 4 8 16
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import sqlite3
+import time
+from typing import List
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from vector_index import IVFVectorIndex, _top_n
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _synthetic_catalog(
+    n_items: int, dimensions: int, n_topics: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Unit-norm vectors scattered around a few "topic" directions."""
+    topics = rng.standard_normal((n_topics, dimensions)).astype(np.float32)
+    vectors = topics[rng.integers(0, n_topics, n_items)]
+    vectors += 0.8 * rng.standard_normal((n_items, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def _vec0_table(vectors: np.ndarray) -> sqlite3.Connection:
+    """Loads the vectors into an in-memory vec0 table shaped like `game_embs`."""
+    import sqlite_vec
+
+    conn = sqlite3.connect(":memory:")
+    conn.enable_load_extension(True)
+    sqlite_vec.load(conn)
+    conn.execute(
+        f"CREATE VIRTUAL TABLE game_embs USING vec0("
+        f"game_id TEXT PRIMARY KEY, vector FLOAT[{vectors.shape[1]}])"
+    )
+    conn.executemany(
+        "INSERT INTO game_embs (game_id, vector) VALUES (?, ?)",
+        ((str(i), vector.tobytes()) for i, vector in enumerate(vectors)),
+    )
+    return conn
+
+
+def _p50_ms(timings: List[float]) -> float:
+    return float(np.percentile(timings, 50) * 1_000)
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, default=[10_000, 30_000, 100_000]
+    )
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[4, 8, 16])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--n-queries", type=int, default=50)
+    parser.add_argument(
+        "--vec0", action="store_true", help="Also time sqlite-vec's brute-force KNN."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    header = f"{'n':>9} | {'method':<22} | {'p50 ms':>8} | {'recall@' + str(args.k):>9}"
+    print(header)
+    print("-" * len(header))
+
+    for n_items in args.sizes:
+        vectors = _synthetic_catalog(n_items, args.dimensions, 200, rng)
+        ids = [str(i) for i in range(n_items)]
+        picks = rng.choice(n_items, size=args.n_queries, replace=False)
+        queries = vectors[picks] + rng.normal(
+            0, 0.02, size=(args.n_queries, args.dimensions)
+        ).astype(np.float32)
+
+        # Exact brute force over the full matrix (what vec0 does, minus SQLite)
+        sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+        exact: List[set] = []
+        timings: List[float] = []
+        for query in queries:
+            start = time.perf_counter()
+            distances = sq_norms - 2.0 * (vectors @ query)
+            exact.append({ids[i] for i in _top_n(distances, args.k)})
+            timings.append(time.perf_counter() - start)
+        print(f"{n_items:>9,} | {'numpy brute force':<22} | {_p50_ms(timings):>8.2f} | {1:>9.3f}")
+
+        if args.vec0:
+            conn = _vec0_table(vectors)
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                conn.execute(
+                    "SELECT game_id, distance FROM game_embs "
+                    "WHERE vector MATCH ? AND k = ? ORDER BY distance",
+                    (query.tobytes(), args.k),
+                ).fetchall()
+                timings.append(time.perf_counter() - start)
+            conn.close()
+            print(f"{n_items:>9,} | {'vec0 brute force':<22} | {_p50_ms(timings):>8.2f} | {1:>9.3f}")
+
+        start = time.perf_counter()
+        index = IVFVectorIndex.build(ids, vectors, seed=args.seed)
+        print(
+            f"{n_items:>9,} | {'ivf build':<22} | "
+            f"{(time.perf_counter() - start) * 1_000:>8.0f} | {'':>9}"
+        )
+        for nprobe in args.nprobe:
+            index.nprobe = nprobe
+            timings, recalls = [], []
+            for query, truth in zip(queries, exact):
+                start = time.perf_counter()
+                found = index.search(query, k=args.k)
+                timings.append(time.perf_counter() - start)
+                recalls.append(len({gid for gid, _ in found} & truth) / args.k)
+            label = f"ivf lists={index.n_lists} np={nprobe}"
+            print(
+                f"{n_items:>9,} | {label:<22} | {_p50_ms(timings):>8.2f} | "
+                f"{np.mean(recalls):>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
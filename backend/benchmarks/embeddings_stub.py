@@ -0,0 +1,143 @@
+"""
+A local stand-in for the OpenAI embeddings API, for load tests.
+
+Serves `POST /v1/embeddings` with `fake_embedding` vectors (float lists, or
+base64 as the OpenAI SDK requests by default), after a log-normal delay around
+`--latency-ms`, and fails a `--error-rate` fraction of requests with a 500.
+Point the API at it with `OPENAI_BASE_URL`:
+
+    python -m benchmarks.embeddings_stub --port 8100 --latency-ms 150
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub uvicorn main:app
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import base64
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from benchmarks.fixtures import EMBEDDING_DIMENSIONS, fake_embedding
+
+# ==========
+# CONSTANTS
+# ==========
+# Spread of the log-normal latency (sigma of the underlying normal)
+LATENCY_SIGMA = 0.3
+# For the reported token usage (same estimate as `utils.openai`)
+CHARS_PER_TOKEN = 3.75
+
+
+# ======
+# SERVER
+# ======
+
+
+def _embeddings_response(request: dict) -> dict:
+    texts = request.get("input")
+    if isinstance(texts, str):
+        texts = [texts]
+    dimensions = request.get("dimensions") or EMBEDDING_DIMENSIONS
+    as_base64 = request.get("encoding_format") == "base64"
+
+    data = []
+    for i, text in enumerate(texts):
+        vector = fake_embedding(text, dimensions)
+        if as_base64:
+            vector = base64.b64encode(np.asarray(vector, np.float32).tobytes())
+            vector = vector.decode()
+        data.append({"object": "embedding", "index": i, "embedding": vector})
+    tokens = sum(max(1, round(len(text) / CHARS_PER_TOKEN)) for text in texts)
+    return {
+        "object": "list",
+        "data": data,
+        "model": request.get("model"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def make_server(
+    host: str, port: int, latency_ms: float, error_rate: float
+) -> ThreadingHTTPServer:
+    """
+    Builds the stand-in server (call `serve_forever()` on it).
+
+    Args:
+        host: Interface to listen on.
+        port: Port to listen on (0 picks a free one; see `server_address`).
+        latency_ms: Median added latency per request.
+        error_rate: Fraction of requests answered with a 500.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if latency_ms > 0:
+                time.sleep(random.lognormvariate(0, LATENCY_SIGMA) * latency_ms / 1000)
+            if not self.path.endswith("/embeddings"):
+                self._send(404, {"error": {"message": f"No route {self.path}"}})
+            elif random.random() < error_rate:
+                self._send(
+                    500,
+                    {"error": {"message": "Injected failure", "type": "server_error"}},
+                )
+            else:
+                self._send(200, _embeddings_response(request))
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stand-in for the OpenAI embeddings API."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms, args.error_rate)
+    print(
+        f"Serving stand-in embeddings on http://{args.host}:{args.port}/v1 "
+        f"({args.latency_ms:g} ms, {args.error_rate:.1%} errors)",
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Microbenchmark suite for the hot request paths, with a JSON baseline.
+
+Builds a synthetic database with the production schema (see `fixtures`), swaps
+the OpenAI embeddings call for the deterministic `fake_embedding`, and times
+each case in-process (route handlers called directly, response encoding
+included), reporting ns/op at p50 and p99.
+
+    python -m benchmarks.endpoints --save-baseline benchmarks/baseline.json
+    # ... change something ...
+    python -m benchmarks.endpoints --baseline benchmarks/baseline.json
+
+With `--baseline`, a case whose p50 is more than `--threshold` slower than the
+baseline's is flagged as a regression, and the run exits with status 1. The
+baseline also records the catalog size and vector tier, and comparing runs
+that differ in either is refused. Baselines are machine-specific; record one
+before changing code.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+import search_utils
+from benchmarks.fixtures import build_fixture_db, fake_embedding, WORDS
+from db import get_db_connection
+from game_filters import get_filter_index
+from main import (
+    get_all_games_for_table,
+    get_game_details,
+    get_games_by_ids,
+    get_recommendations_from_played,
+)
+from models import GameIdList, SearchFilters
+from search_utils import hybrid_search
+from vector_index import build_vector_index, VECTOR_TIER, VECTOR_TIERS
+
+# ==========
+# CONSTANTS
+# ==========
+N_QUERIES = 32
+
+
+# =====
+# CASES
+# =====
+
+
+def _cases(
+    db: sqlite3.Connection, vector_index, seed: int
+) -> Dict[str, Callable[[], object]]:
+    """Each case is a no-argument callable doing one operation."""
+    rng = random.Random(seed)
+    ids = [row["id"] for row in db.execute("SELECT id FROM games ORDER BY id")]
+    queries = [" ".join(rng.sample(WORDS, 2)) for _ in range(N_QUERIES)]
+    filter_index = get_filter_index(db)
+    pc_only = filter_index.match(SearchFilters(platforms=["PC"]))
+    loop = asyncio.new_event_loop()
+
+    def rotating(values: List):
+        """Cycles through values, so repeated calls don't hit one hot row."""
+        state = {"i": 0}
+
+        def next_value():
+            state["i"] = (state["i"] + 1) % len(values)
+            return values[state["i"]]
+
+        return next_value
+
+    next_query = rotating(queries)
+    next_id = rotating(ids)
+    played = [GameIdList(ids=rng.sample(ids, 10)) for _ in range(N_QUERIES)]
+    next_played = rotating(played)
+    cards = [GameIdList(ids=rng.sample(ids, 60)) for _ in range(N_QUERIES)]
+    next_cards = rotating(cards)
+
+    return {
+        "hybrid_search": lambda: hybrid_search(
+            db=db, query_text=next_query(), limit=20, vector_index=vector_index
+        ),
+        "hybrid_search (platform filter)": lambda: hybrid_search(
+            db=db,
+            query_text=next_query(),
+            limit=20,
+            vector_index=vector_index,
+            allowed_ids=pc_only,
+        ),
+        "get_game_details": lambda: get_game_details(
+            next_id(), expand=None, fields=None, db=db
+        ),
+        "get_game_details (expand=similar)": lambda: get_game_details(
+            next_id(), expand="similar", fields=None, db=db
+        ),
+        "get_all_games_for_table": lambda: get_all_games_for_table(
+            limit=None, cursor=None, fields=None, db=db
+        ),
+        "get_all_games_for_table (limit=50)": lambda: get_all_games_for_table(
+            limit=50, cursor=None, fields=None, db=db
+        ),
+        "get_recommendations_from_played": lambda: loop.run_until_complete(
+            get_recommendations_from_played(
+                next_played(), exclude_played_games=True, db=db
+            )
+        ),
+        "get_games_by_ids (60 ids)": lambda: get_games_by_ids(
+            next_cards(), fields=None, db=db
+        ),
+    }
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def max_rss_mb() -> float:
+    """This process's peak resident set size, in MB."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return max_rss / (1e6 if sys.platform == "darwin" else 1e3)
+
+
+def _time_ns(fn: Callable[[], object], n_runs: int, n_warmup: int) -> List[int]:
+    for _ in range(n_warmup):
+        fn()
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter_ns()
+        fn()
+        timings.append(time.perf_counter_ns() - start)
+    return timings
+
+
+def run_suite(
+    db_path: str,
+    n_runs: int,
+    n_warmup: int,
+    tier: str = VECTOR_TIER,
+    seed: int = 0,
+) -> Dict:
+    """
+    Runs every case against a database.
+
+    Args:
+        db_path: The database to benchmark against.
+        n_runs: Timed runs per case.
+        n_warmup: Untimed runs per case (also builds the in-memory indexes).
+        tier: The vector tier `hybrid_search` uses (see `vector_index`).
+        seed: Seed for the queries and ID lists.
+
+    Returns:
+        {"cases": {case: {"p50_ns", "p99_ns", "mean_ns"}}, "n_games": ...,
+         "max_rss_mb": ...}
+    """
+    # Deterministic, network-free embeddings
+    search_utils.get_embedding_for_query = fake_embedding
+
+    results = {}
+    with get_db_connection(db_path) as db:
+        n_games = db.execute("SELECT COUNT(*) AS n FROM games").fetchone()["n"]
+        # Built next to the benchmarked database, not the served one
+        vector_index = None
+        if tier != "exact":
+            vector_index = build_vector_index(db, tier, database_path=db_path)
+        for name, fn in _cases(db, vector_index, seed).items():
+            timings = np.array(_time_ns(fn, n_runs, n_warmup))
+            results[name] = {
+                "p50_ns": int(np.percentile(timings, 50)),
+                "p99_ns": int(np.percentile(timings, 99)),
+                "mean_ns": int(timings.mean()),
+            }
+    return {
+        "n_games": n_games,
+        "tier": tier,
+        "max_rss_mb": round(max_rss_mb(), 1),
+        "cases": results,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Returns the cases whose p50 regressed by more than `threshold`."""
+    regressions = []
+    for name, stats in results["cases"].items():
+        before = baseline["cases"].get(name)
+        if before and stats["p50_ns"] > before["p50_ns"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n-games", type=int, default=2_000)
+    parser.add_argument(
+        "--db", help="Benchmark this database instead of a generated fixture."
+    )
+    parser.add_argument("--tier", choices=VECTOR_TIERS, default=VECTOR_TIER)
+    parser.add_argument("--n-runs", type=int, default=300)
+    parser.add_argument("--n-warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against this JSON baseline.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="p50 slowdown (fraction) that counts as a regression.",
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(tmp_dir, "database.sqlite")
+            start = time.perf_counter()
+            build_fixture_db(db_path, args.n_games, seed=args.seed)
+            print(
+                f"Built a {args.n_games:,}-game fixture in "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+        results = run_suite(
+            db_path, args.n_runs, args.n_warmup, tier=args.tier, seed=args.seed
+        )
+    results["environment"] = {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+    }
+
+    for key in ("n_games", "tier"):
+        if baseline and baseline.get(key) != results[key]:
+            sys.exit(
+                f"The baseline was recorded with {key}={baseline.get(key)}, "
+                f"this run has {key}={results[key]}."
+            )
+
+    header = f"{'case':<38} | {'p50 ns/op':>12} | {'p99 ns/op':>12}"
+    if baseline:
+        header += f" | {'base p50':>12} | {'change':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in results["cases"].items():
+        line = f"{name:<38} | {stats['p50_ns']:>12,} | {stats['p99_ns']:>12,}"
+        before = (baseline or {}).get("cases", {}).get(name)
+        if before:
+            change = stats["p50_ns"] / before["p50_ns"] - 1
+            line += f" | {before['p50_ns']:>12,} | {change:>+6.0%}"
+        print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(
+                f"Regressions (p50 > +{args.threshold:.0%}): {', '.join(regressions)}"
+            )
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
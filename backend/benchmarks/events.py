@@ -0,0 +1,218 @@
+"""
+Multi-event benchmark: what does serving another event cost the others?
+
+Builds `--events` synthetic event databases (see `fixtures`) into a temporary
+events directory, swaps the OpenAI embeddings call for the deterministic
+`fake_embedding`, and calls the search routes in-process, as `endpoints` does.
+
+Opening the events one at a time, it reports the first search of each newly
+opened event (which builds its in-memory structures), the process's private
+memory (USS, Linux only) with that many events open, and the search latency of
+the first event: it should stay flat as events are added. Then it times the
+cross-event search over 1, 2, 4, ... events against searching them one after
+another (as a client would, which also costs one embedding request per event
+instead of one in all; the stand-in embedding here is free):
+
+    python -m benchmarks.events --events 8 --n-games 1000
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import asyncio
+import gc
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+# Third-party imports
+import numpy as np
+from anyio import to_thread
+
+# Local imports
+import events
+import main as api
+import search_utils
+from benchmarks.fixtures import WORDS, build_fixture_db, fake_embedding
+from benchmarks.worker_memory import process_memory
+from events import EventShards
+from models import SearchFilters
+
+# ==========
+# CONSTANTS
+# ==========
+N_QUERIES = 32
+SEARCH_LIMIT = 10
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _time_us(fn: Callable[[], object], n_runs: int, n_warmup: int) -> Dict:
+    for _ in range(n_warmup):
+        fn()
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter_ns()
+        fn()
+        timings.append(time.perf_counter_ns() - start)
+    us = np.array(timings) / 1000
+    return {
+        "p50_us": float(np.percentile(us, 50)),
+        "p99_us": float(np.percentile(us, 99)),
+    }
+
+
+def build_events(events_dir: str, n_events: int, n_games: int) -> List[str]:
+    """Builds `n_events` event databases of `n_games` games each."""
+    names = [f"event-{i:02d}" for i in range(n_events)]
+    for i, name in enumerate(names):
+        path = os.path.join(events_dir, f"{name}.sqlite")
+        build_fixture_db(path, n_games, seed=i)
+    return names
+
+
+# =========
+# BENCHMARK
+# =========
+
+
+def run(names: List[str], n_runs: int, n_warmup: int, seed: int = 0) -> Dict:
+    """
+    Opens the events one at a time, then times the cross-event search.
+
+    Returns:
+        {"opening": [per opened event], "fan_out": [per number of events]}
+    """
+    rng = random.Random(seed)
+    queries = [" ".join(rng.sample(WORDS, 2)) for _ in range(N_QUERIES)]
+    state = {"i": 0}
+
+    def next_query() -> str:
+        state["i"] = (state["i"] + 1) % len(queries)
+        return queries[state["i"]]
+
+    def search(event: str):
+        with events.event_catalog(event).pool.connection() as db:
+            return api.search_event_games(
+                event,
+                q=next_query(),
+                semantic_weight=0.7,
+                limit=SEARCH_LIMIT,
+                filters=SearchFilters(),
+                db=db,
+            )
+
+    loop = asyncio.new_event_loop()
+
+    def search_all(subset: List[str]):
+        return loop.run_until_complete(
+            api.search_events(
+                q=next_query(),
+                semantic_weight=0.7,
+                limit=SEARCH_LIMIT,
+                event=subset,
+                filters=SearchFilters(),
+            )
+        )
+
+    def search_one_by_one(subset: List[str]):
+        # In the threadpool, as FastAPI runs the (sync) per-event route
+        for name in subset:
+            loop.run_until_complete(to_thread.run_sync(search, name))
+
+    opening = []
+    for k, name in enumerate(names):
+        start = time.perf_counter()
+        search(name)
+        first_ms = (time.perf_counter() - start) * 1000
+        gc.collect()
+        row = {
+            "open_events": k + 1,
+            "first_search_ms": first_ms,
+            "uss_mb": process_memory(os.getpid())["uss"],
+        }
+        row.update(_time_us(lambda: search(names[0]), n_runs, n_warmup))
+        opening.append(row)
+        print(
+            f"Opened {name}: first search {first_ms:.1f} ms, "
+            f"{row['uss_mb']:.1f} MB",
+            flush=True,
+        )
+
+    fan_out = []
+    n = 1
+    while n <= len(names):
+        subset = names[:n]
+        row = {"events": n}
+        row.update(_time_us(lambda: search_all(subset), n_runs, n_warmup))
+        one_by_one = _time_us(lambda: search_one_by_one(subset), n_runs, 0)
+        row["one_by_one_p50_us"] = one_by_one["p50_us"]
+        fan_out.append(row)
+        n *= 2
+    loop.close()
+    return {"opening": opening, "fan_out": fan_out}
+
+
+def print_report(results: Dict, first_event: str):
+    print()
+    print(
+        f"{'open events':>11} | {'first search ms':>15} | {'USS MB':>7} | "
+        f"{first_event + ' p50 us':>17} | {'p99 us':>9}"
+    )
+    print("-" * 72)
+    for row in results["opening"]:
+        print(
+            f"{row['open_events']:>11} | {row['first_search_ms']:>15.1f} | "
+            f"{row['uss_mb']:>7.1f} | {row['p50_us']:>17,.0f} | "
+            f"{row['p99_us']:>9,.0f}"
+        )
+    print()
+    print(
+        f"{'events':>6} | {'fan-out p50 us':>14} | {'p99 us':>9} | "
+        f"{'one by one p50 us':>17}"
+    )
+    print("-" * 56)
+    for row in results["fan_out"]:
+        print(
+            f"{row['events']:>6} | {row['p50_us']:>14,.0f} | "
+            f"{row['p99_us']:>9,.0f} | {row['one_by_one_p50_us']:>17,.0f}"
+        )
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=8)
+    parser.add_argument("--n-games", type=int, default=1_000)
+    parser.add_argument("--n-runs", type=int, default=100)
+    parser.add_argument("--n-warmup", type=int, default=10)
+    args = parser.parse_args()
+
+    # Deterministic, network-free embeddings
+    search_utils.get_embedding_for_query = fake_embedding
+    api.get_embedding_for_query = fake_embedding
+
+    with tempfile.TemporaryDirectory() as events_dir:
+        print(f"Building {args.events} events of {args.n_games:,} games...")
+        names = build_events(events_dir, args.events, args.n_games)
+        events.EVENTS = EventShards(events_dir, max_open=args.events)
+        try:
+            results = run(names, args.n_runs, args.n_warmup)
+        finally:
+            events.close_events()
+    print_report(results, names[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Synthetic, schema-faithful databases and a fake embedding provider for the
+benchmarks.
+
+`build_fixture_db` writes a `database.sqlite` of any size with the same tables
+the production database has (`games` with its JSON columns, the `game_embs` vec0
+table, the `games_fts` FTS5 table, as created in notebook 06) and then runs
+`normalize_db` on it, so the API reads it exactly like the real one. Contents
+are random but deterministic for a given seed:
+
+- unit-norm 1536-d embeddings clustered around a few "topics"
+- summaries and descriptions with long-tailed (log-normal) lengths
+- skewed platform and tag distributions (PC and a few tags dominate, like the
+  real catalog), with realistic list lengths
+- a `similar_games` graph that mostly links games of the same topic
+- booths shared by a few games, and some games without a booth
+
+It also runs as a script, to generate a database to point the API at:
+
+    python -m benchmarks.fixtures --n-games 50000 --out /tmp/paxpal/database.sqlite
+
+`fake_embedding` stands in for the OpenAI embeddings API: the same text always
+maps to the same unit vector, with no network round trip.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import json
+import os
+import random
+import sqlite3
+import zlib
+import time
+from typing import List, Sequence
+
+# Third-party imports
+import numpy as np
+import sqlite_vec
+
+# Local imports
+from normalize_db import normalize_games
+
+# ==========
+# CONSTANTS
+# ==========
+EMBEDDING_DIMENSIONS = 1536
+
+# The production schema (see notebook 06)
+SCHEMA = f"""
+CREATE TABLE games (
+    id                TEXT PRIMARY KEY,
+    name              TEXT,
+    snappy_summary    TEXT,
+    description_texts TEXT,
+    platforms         TEXT,
+    developer         TEXT,
+    exhibitor         TEXT,
+    booth_number      REAL,
+    header_image_url  TEXT,
+    steam_link        TEXT,
+    genres_and_tags   TEXT,
+    media             TEXT,
+    released          REAL,
+    release_time      TEXT,
+    links             TEXT,
+    similar_games     TEXT
+);
+CREATE VIRTUAL TABLE game_embs USING vec0(
+    game_id TEXT PRIMARY KEY,
+    vector  FLOAT[{EMBEDDING_DIMENSIONS}]
+);
+CREATE VIRTUAL TABLE games_fts USING fts5(
+    id UNINDEXED,
+    text
+);
+"""
+
+PLATFORMS = ["PC", "Switch", "PS5", "Xbox Series X|S", "Mac", "Mobile", "Tabletop"]
+PLATFORM_WEIGHTS = [0.55, 0.14, 0.08, 0.07, 0.05, 0.04, 0.07]
+TAGS = [
+    "Action", "Adventure", "Co-op", "Deckbuilder", "Horror", "Indie", "Multiplayer",
+    "Platformer", "Puzzle", "Roguelike", "RPG", "Simulation", "Strategy",
+    "Survival", "Tabletop", "Visual Novel", "Metroidvania", "Cozy", "Shooter",
+]  # fmt: skip
+WORDS = (
+    "space dungeon cozy farm pixel card battle robot magic sword castle racing "
+    "puzzle cat ghost ocean tactics hero quest star night city forest island "
+    "witch knight dragon neon tiny legend"
+).split()
+
+SITE = "https://example.com"
+# Tags follow a Zipf-like popularity curve
+TAG_WEIGHTS = [1 / (rank + 1) for rank in range(len(TAGS))]
+
+# Games per similar-games list, and the share of them from the game's own topic
+N_SIMILAR = 6
+SIMILAR_SAME_TOPIC = 0.8
+# Embedding clusters ("topics")
+N_TOPICS = 24
+# Median lengths (words) of the log-normal text lengths
+SUMMARY_WORDS = 14
+DESCRIPTION_WORDS = 90
+
+BATCH_SIZE = 5_000
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _sentence(rng: random.Random, median_words: int) -> str:
+    """Random words, with a log-normal length around `median_words`."""
+    n_words = max(3, round(rng.lognormvariate(0, 0.5) * median_words))
+    return " ".join(rng.choices(WORDS, k=n_words))
+
+
+def _weighted_sample(
+    rng: random.Random, population: Sequence[str], weights: Sequence[float], k: int
+) -> List[str]:
+    """Up to `k` distinct items, drawn by weight."""
+    return list(dict.fromkeys(rng.choices(population, weights=weights, k=k)))
+
+
+def fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """
+    Deterministic stand-in for the embeddings API: a unit vector seeded by the
+    text, so the same query always gets the same embedding.
+    """
+    rng = np.random.default_rng(zlib.crc32(text.encode()))
+    vector = rng.standard_normal(dimensions).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+# =========
+# GENERATOR
+# =========
+
+
+def build_fixture_db(path: str, n_games: int, seed: int = 0) -> str:
+    """
+    Writes a synthetic database with the production schema, then normalizes it.
+
+    Args:
+        path: Where to write the database (replaced if it exists).
+        n_games: Number of games.
+        seed: Random seed; the same arguments always produce the same database.
+
+    Returns:
+        `path`.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+    ids = [f"game-{i:07d}" for i in range(n_games)]
+    game_topics = nrng.integers(0, N_TOPICS, n_games)
+    topic_members: List[List[str]] = [[] for _ in range(N_TOPICS)]
+    for game_id, topic in zip(ids, game_topics):
+        topic_members[topic].append(game_id)
+    # Roughly three games per booth, like the show floor
+    booths = [float(20000 + i) for i in range(max(1, n_games // 3))]
+
+    def similar_games(topic: int) -> List[str]:
+        same_topic = topic_members[topic]
+        return [
+            rng.choice(same_topic if rng.random() < SIMILAR_SAME_TOPIC else ids)
+            for _ in range(min(N_SIMILAR, n_games))
+        ]
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.enable_load_extension(True)
+        sqlite_vec.load(conn)
+        conn.executescript(SCHEMA)
+
+        topics = nrng.standard_normal((N_TOPICS, EMBEDDING_DIMENSIONS))
+        topics = topics.astype(np.float32)
+        for start in range(0, n_games, BATCH_SIZE):
+            batch = ids[start : start + BATCH_SIZE]
+            batch_topics = game_topics[start : start + BATCH_SIZE]
+            vectors = topics[batch_topics]
+            vectors = vectors + 0.7 * nrng.standard_normal(vectors.shape).astype(
+                np.float32
+            )
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+            games, fts = [], []
+            for i, game_id in enumerate(batch):
+                name = " ".join(rng.sample(WORDS, rng.randint(1, 4))).title()
+                summary = _sentence(rng, SUMMARY_WORDS)
+                description = _sentence(rng, DESCRIPTION_WORDS)
+                descriptions = [
+                    {"source": "pax_app", "text": description},
+                    {
+                        "source": "ai_search_summary",
+                        "text": _sentence(rng, DESCRIPTION_WORDS // 2),
+                    },
+                ]
+                media = [
+                    {
+                        "type": rng.choice(["image", "video"]),
+                        "source": "steam",
+                        "url": f"{SITE}/{game_id}/{j}.jpg",
+                    }
+                    for j in range(rng.randint(0, 6))
+                ]
+                games.append(
+                    (
+                        game_id,
+                        name,
+                        summary,
+                        json.dumps(descriptions),
+                        json.dumps(
+                            _weighted_sample(
+                                rng, PLATFORMS, PLATFORM_WEIGHTS, rng.randint(1, 4)
+                            )
+                        ),
+                        f"{rng.choice(WORDS).title()} Studio",
+                        f"{rng.choice(WORDS).title()} Games",
+                        rng.choice(booths) if rng.random() < 0.85 else None,
+                        f"{SITE}/{game_id}/header.jpg",
+                        None,
+                        json.dumps(
+                            _weighted_sample(rng, TAGS, TAG_WEIGHTS, rng.randint(1, 8))
+                        ),
+                        json.dumps(media),
+                        float(rng.random() < 0.4),
+                        None,
+                        json.dumps([{"title": "Website", "url": f"{SITE}/{game_id}"}]),
+                        json.dumps(similar_games(batch_topics[i])),
+                    )
+                )
+                fts.append((game_id, f"{name}. {summary}"))
+                fts.append((game_id, description))
+
+            conn.executemany(
+                f"INSERT INTO games VALUES ({', '.join(['?'] * 16)})", games
+            )
+            conn.executemany(
+                "INSERT INTO game_embs (game_id, vector) VALUES (?, ?)",
+                ((game_id, vectors[i].tobytes()) for i, game_id in enumerate(batch)),
+            )
+            conn.executemany("INSERT INTO games_fts (id, text) VALUES (?, ?)", fts)
+        conn.commit()
+
+        with conn:
+            normalize_games(conn)
+    finally:
+        conn.close()
+    return path
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generates a synthetic database with the production schema."
+    )
+    parser.add_argument("--n-games", type=int, required=True)
+    parser.add_argument("--out", required=True, help="Database path (replaced).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build_fixture_db(args.out, args.n_games, seed=args.seed)
+    size_mb = os.path.getsize(args.out) / 1e6
+    print(
+        f"Wrote {args.n_games:,} games to {args.out} ({size_mb:,.1f} MB) in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Hot-reload check: hammers the API while new databases are swapped in.
+
+Builds a database and `--swaps` updated versions of it (each with `--step` more
+games) ahead of time, starts the production server serving a database directory
+(see `catalog_reload`) with the OpenAI embeddings API replaced by the local
+stand-in, and drives the load test's traffic mix through it with `--concurrency`
+closed-loop clients. Meanwhile it publishes the updated databases into the
+directory one at a time, by renaming them in, and watches `/api/games/count` to
+see when every worker serves the new one.
+
+It reports the swaps and latency before and during them (from publishing a
+database until every worker serves it, plus a second), and exits with status 1
+if any request failed, the final database isn't the one served, or the p99
+latency during the swaps exceeds `--max-p99-ratio` times the baseline p99 plus
+`--p99-slack-ms`:
+
+    python -m benchmarks.hot_reload --n-games 2000 --swaps 3
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+# Third-party imports
+import httpx
+import numpy as np
+
+# Local imports
+from benchmarks.fixtures import build_fixture_db
+from benchmarks.load_test import (
+    DEFAULT_MIX,
+    Workload,
+    local_stack,
+    synthetic_queries,
+)
+
+# ==========
+# CONSTANTS
+# ==========
+# How often the watcher reads the served game count
+WATCH_INTERVAL_SECONDS = 0.05
+
+# Seconds after a swap completes that still count as "during" it
+SWAP_TAIL_SECONDS = 1.0
+
+# (start time, endpoint, seconds, ok)
+Sample = Tuple[float, str, float, bool]
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def build_releases(work_dir: str, n_games: int, swaps: int, step: int) -> List[str]:
+    """
+    Builds the initial database into `<work_dir>/releases` and the updated ones
+    into `<work_dir>/staging`, named to sort in release order.
+
+    Returns:
+        The staged databases, in publishing order.
+    """
+    releases_dir = os.path.join(work_dir, "releases")
+    staging_dir = os.path.join(work_dir, "staging")
+    os.makedirs(releases_dir)
+    os.makedirs(staging_dir)
+    build_fixture_db(os.path.join(releases_dir, "0000.sqlite"), n_games, seed=0)
+    staged = []
+    for i in range(1, swaps + 1):
+        path = os.path.join(staging_dir, f"{i:04d}.sqlite")
+        staged.append(build_fixture_db(path, n_games + i * step, seed=i))
+    return staged
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        nan = float("nan")
+        return {"n": 0, "p50_ms": nan, "p99_ms": nan, "max_ms": nan}
+    ms = np.array(latencies) * 1000
+    return {
+        "n": len(ms),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+# =====
+# CHECK
+# =====
+
+
+async def hammer(
+    url: str,
+    releases_dir: str,
+    staged: List[str],
+    counts: List[int],
+    concurrency: int,
+    settle: float,
+    swap_timeout: float,
+) -> Tuple[List[Sample], List[Dict]]:
+    """
+    Runs the closed-loop clients while publishing each staged database.
+
+    Args:
+        counts: The game count of each staged database, to recognize it by.
+
+    Returns:
+        The request samples, and per swap its publish and completion times.
+    """
+    limits = httpx.Limits(
+        max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1
+    )
+    client = httpx.AsyncClient(base_url=url, timeout=30.0, limits=limits)
+    async with client:
+        response = await client.get("/api/games/all", params={"fields": "id"})
+        response.raise_for_status()
+        game_ids = [row["id"] for row in response.json()]
+        workload = Workload(game_ids, synthetic_queries(), DEFAULT_MIX)
+
+        samples: List[Sample] = []
+        # (time, served game count) as seen by the watcher
+        observed: List[Tuple[float, int]] = []
+        stop = asyncio.Event()
+
+        async def client_loop(rng: random.Random):
+            while not stop.is_set():
+                endpoint, method, path, kwargs = workload.next_request(rng)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                samples.append((start, endpoint, time.perf_counter() - start, ok))
+
+        async def watch():
+            while not stop.is_set():
+                response = await client.get("/api/games/count")
+                count = response.json()["total_games"]
+                observed.append((time.perf_counter(), count))
+                await asyncio.sleep(WATCH_INTERVAL_SECONDS)
+
+        async def publish() -> List[Dict]:
+            swaps = []
+            await asyncio.sleep(settle)
+            for path, count in zip(staged, counts):
+                published = time.perf_counter()
+                os.rename(path, os.path.join(releases_dir, os.path.basename(path)))
+                # Done once a settle period passes without seeing an older count
+                while True:
+                    await asyncio.sleep(settle)
+                    stale = [
+                        t for t, seen in observed if t > published and seen != count
+                    ]
+                    if time.perf_counter() - published > swap_timeout:
+                        completed = None
+                        break
+                    if not stale or time.perf_counter() - max(stale) >= settle:
+                        completed = max(stale) if stale else published
+                        break
+                swaps.append(
+                    {"path": path, "published": published, "completed": completed}
+                )
+                print(
+                    f"Published {os.path.basename(path)}: "
+                    + (
+                        f"served by every worker after {completed - published:.2f}s"
+                        if completed is not None
+                        else f"not served after {swap_timeout:.0f}s"
+                    ),
+                    flush=True,
+                )
+            stop.set()
+            return swaps
+
+        rngs = [random.Random(i) for i in range(concurrency)]
+        results = await asyncio.gather(
+            publish(), watch(), *(client_loop(rng) for rng in rngs)
+        )
+        return samples, results[0]
+
+
+def evaluate(samples: List[Sample], swaps: List[Dict]) -> Dict:
+    """Splits the samples into before and during the swaps, and counts failures."""
+    first_published = swaps[0]["published"]
+    windows = []
+    for swap in swaps:
+        end = (swap["completed"] or swap["published"]) + SWAP_TAIL_SECONDS
+        windows.append((swap["published"], end))
+    # Skip the first second of the baseline: connections are still being opened
+    start = min(t for t, *_ in samples) + 1.0
+    baseline = [s for t, _, s, _ in samples if start <= t < first_published]
+    during = [
+        s
+        for t, _, s, _ in samples
+        if any(begin <= t < end for begin, end in windows)
+    ]
+    failures: Dict[str, int] = {}
+    for _, endpoint, _, ok in samples:
+        if not ok:
+            failures[endpoint] = failures.get(endpoint, 0) + 1
+    return {
+        "requests": len(samples),
+        "failures": failures,
+        "baseline": _percentiles(baseline),
+        "during_swaps": _percentiles(during),
+    }
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Checks that hot-reloading the database fails no requests."
+    )
+    parser.add_argument("--n-games", type=int, default=2_000)
+    parser.add_argument("--swaps", type=int, default=3)
+    parser.add_argument(
+        "--step", type=int, default=50, help="Games added by each update."
+    )
+    # One per core, so the workers' builds don't compete for one CPU
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    # Below saturation, so latency reflects the swaps rather than queueing
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--poll-seconds", type=float, default=0.5, help="The reloader's interval."
+    )
+    parser.add_argument(
+        "--settle", type=float, default=3.0, help="Seconds of load between steps."
+    )
+    parser.add_argument("--swap-timeout", type=float, default=60.0)
+    parser.add_argument("--max-p99-ratio", type=float, default=1.5)
+    parser.add_argument("--p99-slack-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        print("Building databases...", flush=True)
+        staged = build_releases(work_dir, args.n_games, args.swaps, args.step)
+        counts = [args.n_games + i * args.step for i in range(1, args.swaps + 1)]
+        releases_dir = os.path.join(work_dir, "releases")
+        extra_env = {
+            "PAXPAL_DATABASE_DIR": releases_dir,
+            "PAXPAL_RELOAD_POLL_SECONDS": str(args.poll_seconds),
+        }
+        with local_stack(
+            args.workers,
+            None,
+            None,
+            args.embedding_latency_ms,
+            0.0,
+            extra_env=extra_env,
+        ) as (url, _):
+            samples, swaps = asyncio.run(
+                hammer(
+                    url,
+                    releases_dir,
+                    staged,
+                    counts,
+                    args.concurrency,
+                    args.settle,
+                    args.swap_timeout,
+                )
+            )
+            served = httpx.get(f"{url}/api/games/count").json()["total_games"]
+
+    results = evaluate(samples, swaps)
+    print()
+    print(
+        f"{'':<14} | {'requests':>8} | {'p50 ms':>8} | {'p99 ms':>8} | "
+        f"{'max ms':>8}"
+    )
+    print("-" * 58)
+    for name in ("baseline", "during_swaps"):
+        stats = results[name]
+        print(
+            f"{name:<14} | {stats['n']:>8,} | {stats['p50_ms']:>8.1f} | "
+            f"{stats['p99_ms']:>8.1f} | {stats['max_ms']:>8.1f}"
+        )
+    n_failed = sum(results["failures"].values())
+    print(
+        f"\n{results['requests']:,} requests, {n_failed} failed "
+        f"{results['failures']}"
+    )
+
+    problems = []
+    if n_failed:
+        problems.append(f"{n_failed} failed requests")
+    if any(swap["completed"] is None for swap in swaps):
+        problems.append("a database wasn't swapped in")
+    if served != counts[-1]:
+        problems.append(f"serving {served} games, expected {counts[-1]}")
+    p99_limit = (
+        results["baseline"]["p99_ms"] * args.max_p99_ratio + args.p99_slack_ms
+    )
+    if results["during_swaps"]["p99_ms"] > p99_limit:
+        problems.append(
+            f"p99 during swaps {results['during_swaps']['p99_ms']:.1f} ms is over "
+            f"{p99_limit:.1f} ms"
+        )
+    if problems:
+        print("FAIL: " + "; ".join(problems))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
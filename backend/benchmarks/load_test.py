@@ -0,0 +1,442 @@
+"""
+HTTP load test: where does the API saturate?
+
+Starts the API (the production server in `gunicorn.conf.py`, with `--workers`
+processes and `--threads` threads for sync routes) against a database, with the
+OpenAI embeddings API replaced by the local stand-in in `benchmarks.embeddings_stub`
+(configurable latency and error rate), then replays a realistic traffic mix at increasing concurrency:
+
+- searches, with queries drawn from a Zipfian distribution (a few queries are
+  very popular, most are rare)
+- game detail views, also Zipfian over the games
+- full `/api/games/all` loads
+- recommendations from a handful of played games
+
+Each concurrency level is a closed loop of that many clients, each sending its
+next request as soon as the previous one is answered. The report gives, per
+level and endpoint, throughput, p50 / p95 / p99 latency and error rate, and the
+knee of the curve: the level with the highest "power" (successful requests per
+second divided by mean latency), past which added load mostly adds latency.
+
+    python -m benchmarks.load_test --workers 1 --threads 40 \\
+        --concurrency 1 2 4 8 16 32 64 --duration 15 --embedding-latency-ms 150
+
+`--url` load-tests an already running API instead (nothing is started). The
+load generator is a single asyncio process; at a few thousand requests per
+second it becomes the bottleneck itself, so watch its CPU.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Third-party imports
+import httpx
+import numpy as np
+
+# Local imports
+from benchmarks.fixtures import WORDS
+
+# ==========
+# CONSTANTS
+# ==========
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16, 32, 64]
+# Relative weights of the request types
+DEFAULT_MIX = {"search": 50, "detail": 30, "all_games": 5, "recommendations": 15}
+# Exponent of the Zipf distributions over queries and games
+ZIPF_EXPONENT = 1.1
+N_QUERIES = 1_000
+STARTUP_TIMEOUT_SECONDS = 120
+
+# (endpoint, seconds, succeeded)
+Sample = Tuple[str, float, bool]
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _zipf_cum_weights(n: int, exponent: float = ZIPF_EXPONENT) -> List[float]:
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen):
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The API exited with status {process.returncode}.")
+        try:
+            # Past the startup warm-up, like Cloud Run's startup probe
+            if httpx.get(f"{url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"The API wasn't ready after {STARTUP_TIMEOUT_SECONDS}s.")
+
+
+@contextmanager
+def local_stack(
+    workers: int,
+    threads: Optional[int],
+    db_path: Optional[str],
+    embedding_latency_ms: float,
+    embedding_error_rate: float,
+    preload: bool = True,
+    extra_env: Optional[Dict[str, str]] = None,
+) -> Iterator[Tuple[str, subprocess.Popen]]:
+    """
+    Runs the embeddings stand-in and the API in subprocesses.
+
+    Args:
+        preload: Whether the server builds the in-memory indexes once, before
+                 forking its workers (see `gunicorn.conf.py`).
+        extra_env: More environment variables for the API.
+
+    Yields:
+        The API's base URL, and its server (gunicorn master) process.
+    """
+    stub_port, api_port = _free_port(), _free_port()
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+        OPENAI_API_KEY="stub",
+    )
+    if db_path:
+        env["PAXPAL_DATABASE_PATH"] = os.path.abspath(db_path)
+    if threads:
+        env["PAXPAL_THREADPOOL_SIZE"] = str(threads)
+    env["PAXPAL_PRELOAD"] = "1" if preload else "0"
+    env.update(extra_env or {})
+
+    processes = []
+    try:
+        processes.append(
+            subprocess.Popen(
+                [
+                    sys.executable, "-m", "benchmarks.embeddings_stub",
+                    "--port", str(stub_port),
+                    "--latency-ms", str(embedding_latency_ms),
+                    "--error-rate", str(embedding_error_rate),
+                ],
+                cwd=BACKEND_DIR,
+                stdout=subprocess.DEVNULL,
+            )
+        )  # fmt: skip
+        api = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", "main:app",
+                "--bind", f"127.0.0.1:{api_port}",
+                "--workers", str(workers),
+                "--log-level", "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )  # fmt: skip
+        processes.append(api)
+        url = f"http://127.0.0.1:{api_port}"
+        _wait_until_ready(url, api)
+        yield url, api
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# ========
+# WORKLOAD
+# ========
+
+
+class Workload:
+    """Draws requests from the traffic mix."""
+
+    def __init__(
+        self,
+        game_ids: List[str],
+        queries: List[str],
+        mix: Dict[str, float],
+        seed: int = 0,
+    ):
+        rng = random.Random(seed)
+        self.game_ids = game_ids
+        # Popularity ranks are shuffled, so popular games aren't just the first IDs
+        self.popular_ids = rng.sample(game_ids, len(game_ids))
+        self.queries = queries
+        self.id_weights = _zipf_cum_weights(len(game_ids))
+        self.query_weights = _zipf_cum_weights(len(queries))
+        self.endpoints = list(mix)
+        self.endpoint_weights = list(itertools.accumulate(mix.values()))
+
+    def next_request(self, rng: random.Random) -> Tuple[str, str, str, dict]:
+        """Returns (endpoint, method, path, request kwargs)."""
+        (endpoint,) = rng.choices(self.endpoints, cum_weights=self.endpoint_weights)
+        if endpoint == "search":
+            (query,) = rng.choices(self.queries, cum_weights=self.query_weights)
+            return endpoint, "GET", "/api/search", {"params": {"q": query}}
+        if endpoint == "detail":
+            (game_id,) = rng.choices(self.popular_ids, cum_weights=self.id_weights)
+            return endpoint, "GET", f"/api/games/{game_id}", {}
+        if endpoint == "all_games":
+            return endpoint, "GET", "/api/games/all", {}
+        played = rng.sample(self.game_ids, min(len(self.game_ids), rng.randint(3, 10)))
+        return (
+            endpoint,
+            "POST",
+            "/api/recommendations/from-played",
+            {"json": {"ids": played}},
+        )
+
+
+def synthetic_queries(n: int = N_QUERIES, seed: int = 0) -> List[str]:
+    """Distinct one- to three-word queries from the fixture vocabulary."""
+    rng = random.Random(seed)
+    queries: Dict[str, None] = {}
+    while len(queries) < n:
+        queries[" ".join(rng.sample(WORDS, rng.randint(1, 3)))] = None
+    return list(queries)
+
+
+# ====
+# LOAD
+# ====
+
+
+async def run_level(
+    url: str,
+    workload: Workload,
+    concurrency: int,
+    duration: float,
+    timeout: float,
+    seed: int = 0,
+) -> Tuple[List[Sample], float]:
+    """
+    Runs `concurrency` closed-loop clients for `duration` seconds.
+
+    Returns:
+        The samples, and the elapsed wall time.
+    """
+    samples: List[Sample] = []
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    client = httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+    async with client:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def client_loop(rng: random.Random):
+            while time.perf_counter() < deadline:
+                endpoint, method, path, kwargs = workload.next_request(rng)
+                request_start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                samples.append((endpoint, time.perf_counter() - request_start, ok))
+
+        await asyncio.gather(
+            *(client_loop(random.Random(seed * 1_000 + i)) for i in range(concurrency))
+        )
+        return samples, time.perf_counter() - start
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Dict]:
+    """Per-endpoint (and "all") throughput, latency percentiles and error rate."""
+    by_endpoint: Dict[str, List[Sample]] = {"all": samples}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+
+    summary = {}
+    for endpoint, group in by_endpoint.items():
+        latencies_ms = np.array([seconds for _, seconds, _ in group]) * 1000
+        n_errors = sum(1 for _, _, ok in group if not ok)
+        summary[endpoint] = {
+            "requests": len(group),
+            "rps": len(group) / elapsed,
+            "goodput_rps": (len(group) - n_errors) / elapsed,
+            "mean_ms": float(latencies_ms.mean()),
+            "p50_ms": float(np.percentile(latencies_ms, 50)),
+            "p95_ms": float(np.percentile(latencies_ms, 95)),
+            "p99_ms": float(np.percentile(latencies_ms, 99)),
+            "error_rate": n_errors / len(group),
+        }
+    return summary
+
+
+def find_knee(levels: List[Dict]) -> Dict:
+    """The level with the highest power: goodput over mean latency."""
+    return max(
+        levels,
+        key=lambda level: level["summary"]["all"]["goodput_rps"]
+        / level["summary"]["all"]["mean_ms"],
+    )
+
+
+# ======
+# REPORT
+# ======
+
+
+def _print_row(name: str, stats: Dict):
+    print(
+        f"  {name:<16} | {stats['rps']:>8.1f} | {stats['p50_ms']:>8.1f}"
+        f" | {stats['p95_ms']:>8.1f} | {stats['p99_ms']:>8.1f}"
+        f" | {stats['error_rate']:>6.1%}"
+    )
+
+
+def print_report(levels: List[Dict]):
+    for level in levels:
+        print(f"\nConcurrency {level['concurrency']}:")
+        header = (
+            f"  {'endpoint':<16} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8}"
+            f" | {'p99 ms':>8} | {'errors':>6}"
+        )
+        print(header)
+        print("  " + "-" * (len(header) - 2))
+        for endpoint, stats in sorted(level["summary"].items()):
+            if endpoint != "all":
+                _print_row(endpoint, stats)
+        _print_row("all", level["summary"]["all"])
+
+    knee = find_knee(levels)
+    stats = knee["summary"]["all"]
+    print(
+        f"\nKnee: concurrency {knee['concurrency']} ({stats['goodput_rps']:.1f} "
+        f"successful req/s, p99 {stats['p99_ms']:.0f} ms); past it, more load "
+        "mostly adds latency."
+    )
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def _parse_mix(values: Optional[List[str]]) -> Dict[str, float]:
+    if not values:
+        return DEFAULT_MIX
+    mix = {}
+    for value in values:
+        endpoint, _, weight = value.partition("=")
+        if endpoint not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown endpoint '{endpoint}' in --mix.")
+        mix[endpoint] = float(weight)
+    return mix
+
+
+async def _run(args, url: str) -> List[Dict]:
+    response = httpx.get(f"{url}/api/games/all", params={"fields": "id"}, timeout=60)
+    response.raise_for_status()
+    game_ids = [row["id"] for row in response.json()]
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = synthetic_queries(seed=args.seed)
+    workload = Workload(game_ids, queries, _parse_mix(args.mix), seed=args.seed)
+
+    if args.warmup > 0:
+        await run_level(url, workload, 1, args.warmup, args.timeout, seed=args.seed)
+
+    levels = []
+    for concurrency in args.concurrency:
+        print(f"Running {concurrency} concurrent clients...", flush=True)
+        samples, elapsed = await run_level(
+            url, workload, concurrency, args.duration, args.timeout, seed=args.seed
+        )
+        levels.append(
+            {"concurrency": concurrency, "summary": summarize(samples, elapsed)}
+        )
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-tests the API with a realistic traffic mix."
+    )
+    parser.add_argument("--url", help="Test this running API instead of a local one.")
+    parser.add_argument("--db", help="Database for the local API (default: its own).")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--threads", type=int, help="Threads for sync routes (default: 40)."
+    )
+    parser.add_argument("--embedding-latency-ms", type=float, default=150.0)
+    parser.add_argument("--embedding-error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY
+    )
+    parser.add_argument(
+        "--duration", type=float, default=15.0, help="Seconds per level."
+    )
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds.")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds.")
+    default_mix = " ".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items())
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        metavar="ENDPOINT=WEIGHT",
+        help=f"Traffic mix (default: {default_mix}).",
+    )
+    parser.add_argument("--queries", help="File of search queries, one per line.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.url:
+        levels = asyncio.run(_run(args, args.url.rstrip("/")))
+    else:
+        with local_stack(
+            args.workers,
+            args.threads,
+            args.db,
+            args.embedding_latency_ms,
+            args.embedding_error_rate,
+        ) as (url, _):
+            levels = asyncio.run(_run(args, url))
+    print_report(levels)
+
+    if args.out:
+        config = {
+            key: getattr(args, key)
+            for key in (
+                "url", "db", "workers", "threads", "embedding_latency_ms",
+                "embedding_error_rate", "duration",
+            )
+        }  # fmt: skip
+        with open(args.out, "w") as f:
+            json.dump({"config": config, "levels": levels}, f, indent=2)
+        print(f"Saved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark of the booth route planner against exact solutions.
+
+Scatters random booths over a floor-map-sized area and compares the planner's
+nearest-neighbor + 2-opt routes with exact shortest open paths (Held-Karp dynamic
+programming) on small inputs, then times the planner alone on larger ones.
+
+    python -m benchmarks.route_planner --exact-sizes 6 8 10 12 --sizes 20 40 60 100
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import itertools
+import time
+from typing import List, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from route_planner import route_length, solve_open_path
+
+# ==========
+# CONSTANTS
+# ==========
+# Roughly the size of pax-map.jpg, in pixels
+MAP_WIDTH = 3_000
+MAP_HEIGHT = 2_200
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _random_distances(n_stops: int, rng: np.random.Generator) -> np.ndarray:
+    points = rng.uniform((0, 0), (MAP_WIDTH, MAP_HEIGHT), size=(n_stops, 2))
+    deltas = points[:, None, :] - points[None, :, :]
+    return np.sqrt((deltas**2).sum(axis=2))
+
+
+def held_karp_open_path(distances: np.ndarray) -> Tuple[float, List[int]]:
+    """
+    Exact shortest open path through every node (any start, any end), by
+    dynamic programming over subsets. O(2^n * n^2), so only for small n.
+    """
+    n = distances.shape[0]
+    best = {(1 << i, i): (0.0, -1) for i in range(n)}
+    for size in range(2, n + 1):
+        for subset in itertools.combinations(range(n), size):
+            mask = sum(1 << i for i in subset)
+            for last in subset:
+                previous_mask = mask & ~(1 << last)
+                best[(mask, last)] = min(
+                    (best[(previous_mask, prev)][0] + distances[prev, last], prev)
+                    for prev in subset
+                    if prev != last
+                )
+
+    full = (1 << n) - 1
+    length, last = min((best[(full, last)][0], last) for last in range(n))
+    order, mask = [], full
+    while last != -1:
+        order.append(last)
+        _, previous = best[(mask, last)]
+        mask &= ~(1 << last)
+        last = previous
+    return length, order[::-1]
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1_000:.2f}"
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--exact-sizes", nargs="+", type=int, default=[6, 8, 10, 12])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[20, 40, 60, 100])
+    parser.add_argument("--n-trials", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    header = (
+        f"{'stops':>6} | {'planner ms':>10} | {'exact ms':>9} | "
+        f"{'mean gap':>8} | {'max gap':>8} | {'optimal':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for n_stops in args.exact_sizes:
+        gaps, planner_times, exact_times = [], [], []
+        for _ in range(args.n_trials):
+            distances = _random_distances(n_stops, rng)
+
+            start = time.perf_counter()
+            order = solve_open_path(distances)
+            planner_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            exact_length, _ = held_karp_open_path(distances)
+            exact_times.append(time.perf_counter() - start)
+
+            gaps.append(route_length(distances, order) / exact_length - 1.0)
+        gaps = np.array(gaps)
+        print(
+            f"{n_stops:>6} | {_ms(np.median(planner_times)):>10} | "
+            f"{_ms(np.median(exact_times)):>9} | {gaps.mean():>8.2%} | "
+            f"{gaps.max():>8.2%} | {np.mean(gaps < 1e-9):>7.0%}"
+        )
+
+    print()
+    header = f"{'stops':>6} | {'p50 ms':>8} | {'p99 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for n_stops in args.sizes:
+        timings = []
+        for _ in range(args.n_trials):
+            distances = _random_distances(n_stops, rng)
+            start = time.perf_counter()
+            solve_open_path(distances)
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{n_stops:>6} | {_ms(np.percentile(timings, 50)):>8} | "
+            f"{_ms(np.percentile(timings, 99)):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Scaling harness: how the backend behaves at 10x, 100x, ... the real catalog.
+
+For each size, generates a synthetic database (`benchmarks.fixtures`), runs the
+endpoint microbenchmarks (`benchmarks.endpoints`) against it in a fresh process,
+so each size's peak memory is its own, and reports:
+
+- the database size on disk, and how long it took to generate
+- peak resident memory of the benchmark process (connection, in-memory indexes,
+  cached responses)
+- p50 latency per case at each size, and its growth exponent: the slope of
+  log(latency) against log(size), so ~0 is constant, ~1 linear, ~2 quadratic
+
+    python -m benchmarks.scaling --sizes 500 5000 50000 --out scaling.json
+
+Generation holds every embedding in memory while normalizing, about 6 KB per
+game, so the largest sizes need a machine with room for that.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Local imports
+from benchmarks.fixtures import build_fixture_db
+from vector_index import VECTOR_TIER, VECTOR_TIERS
+
+# ==========
+# CONSTANTS
+# ==========
+# The real catalog is a few hundred games
+DEFAULT_SIZES = [500, 5_000, 50_000]
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _disk_mb(db_path: str) -> float:
+    """The database's size on disk, WAL included."""
+    paths = (db_path, db_path + "-wal")
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path)) / 1e6
+
+
+def _growth_exponent(sizes: List[int], values: List[float]) -> float:
+    """Slope of log(value) against log(size) between the smallest and largest size."""
+    if len(sizes) < 2 or min(values) <= 0:
+        return float("nan")
+    return math.log(values[-1] / values[0]) / math.log(sizes[-1] / sizes[0])
+
+
+def measure_size(
+    n_games: int, work_dir: str, n_runs: int, n_warmup: int, tier: str, seed: int
+) -> Dict:
+    """
+    Generates a database with `n_games` games and benchmarks it.
+
+    Returns:
+        The `benchmarks.endpoints` results, plus "db_mb" and "build_seconds".
+    """
+    db_path = os.path.join(work_dir, f"database-{n_games}.sqlite")
+    start = time.perf_counter()
+    build_fixture_db(db_path, n_games, seed=seed)
+    build_seconds = time.perf_counter() - start
+
+    results_path = os.path.join(work_dir, f"results-{n_games}.json")
+    # A fresh process per size, so peak RSS isn't carried over from a larger one
+    subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.endpoints",
+            "--db", db_path,
+            "--n-runs", str(n_runs),
+            "--n-warmup", str(n_warmup),
+            "--tier", tier,
+            "--seed", str(seed),
+            "--save-baseline", results_path,
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )  # fmt: skip
+    with open(results_path) as f:
+        results = json.load(f)
+    results["db_mb"] = round(_disk_mb(db_path), 1)
+    results["build_seconds"] = round(build_seconds, 1)
+    return results
+
+
+def print_report(sizes: List[int], runs: List[Dict]):
+    """Prints the per-size resource table and the per-case latency table."""
+    header = f"{'games':>10} | {'DB MB':>9} | {'build s':>8} | {'peak RSS MB':>11}"
+    print(header)
+    print("-" * len(header))
+    for n_games, run in zip(sizes, runs):
+        print(
+            f"{n_games:>10,} | {run['db_mb']:>9,.1f} | {run['build_seconds']:>8.1f}"
+            f" | {run['max_rss_mb']:>11,.1f}"
+        )
+    print(
+        f"{'growth':>10} | {_growth_exponent(sizes, [r['db_mb'] for r in runs]):>9.2f}"
+        f" | {'':>8} | "
+        f"{_growth_exponent(sizes, [r['max_rss_mb'] for r in runs]):>11.2f}"
+    )
+    print()
+
+    header = f"{'p50 us/op':<38} | " + " | ".join(f"{n:>10,}" for n in sizes)
+    header += f" | {'growth':>6}"
+    print(header)
+    print("-" * len(header))
+    for case in runs[0]["cases"]:
+        p50s = [run["cases"][case]["p50_ns"] / 1000 for run in runs]
+        cells = " | ".join(f"{p50:>10,.0f}" for p50 in p50s)
+        print(f"{case:<38} | {cells} | {_growth_exponent(sizes, p50s):>6.2f}")
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the backend on synthetic catalogs of increasing size."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--tier", choices=VECTOR_TIERS, default=VECTOR_TIER)
+    parser.add_argument("--n-runs", type=int, default=100)
+    parser.add_argument("--n-warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write every size's results to this JSON file.")
+    parser.add_argument(
+        "--work-dir",
+        help="Keep the generated databases here (default: a temporary directory).",
+    )
+    args = parser.parse_args()
+
+    sizes = sorted(args.sizes)
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        for n_games in sizes:
+            print(f"Benchmarking {n_games:,} games...", flush=True)
+            runs.append(
+                measure_size(
+                    n_games, work_dir, args.n_runs, args.n_warmup, args.tier, args.seed
+                )
+            )
+    print()
+    print_report(sizes, runs)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(dict(zip(map(str, sizes), runs)), f, indent=2)
+        print(f"Saved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Microbenchmark of per-endpoint response serialization.
+
+Builds each hot endpoint's payload from `database.sqlite` (already-validated
+models, as the routes build them) and times turning it into response bytes:
+
+- before: FastAPI's `response_model` path, i.e. re-validating the payload
+  against the response model, converting it to plain Python objects, and
+  encoding it with the stdlib-based `JSONResponse`
+- after: `serialization.model_response` (one pass of pydantic-core's serializer),
+  or for `/api/games/all` the bytes cached by the facet index
+
+    python -m benchmarks.serialization --n-runs 200
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable, List
+
+# Third-party imports
+import numpy as np
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+# Local imports
+from db import get_db_connection
+from game_filters import GameFilterIndex
+from main import get_game_details
+from models import BrowseResponse, Game, GameTableRow, SearchResult
+from serialization import model_response
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _fastapi_response_model_path(value: Any, type_: Any) -> Callable[[], bytes]:
+    """What FastAPI does with a returned model when `response_model` is set."""
+    field = create_model_field(name="Response", type_=type_, mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def run() -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=value)
+        )
+        return JSONResponse(content).body
+
+    return run
+
+
+def _time_us(fn: Callable[[], bytes], n_runs: int) -> List[float]:
+    fn()  # warm-up
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n-runs", type=int, default=200)
+    args = parser.parse_args()
+
+    with get_db_connection() as db:
+        index = GameFilterIndex.from_db(db)
+        cards = [
+            SearchResult(**row)
+            for row in db.execute(
+                "SELECT id, name, snappy_summary, header_image_url FROM games LIMIT 60"
+            ).fetchall()
+        ]
+        game_id = cards[0].id
+        detail = json.loads(
+            get_game_details(game_id, expand="similar", db=db).body
+        )
+        game = Game(**detail)
+        total, page, facets = index.browse(None, offset=0, limit=50)
+        browse = BrowseResponse(
+            total=total, offset=0, limit=50, games=page, facets=facets
+        )
+
+    # (endpoint, payload, payload type, optimized path)
+    cases = [
+        (
+            f"/api/games/all ({len(index.rows)} rows)",
+            index.rows,
+            List[GameTableRow],
+            lambda: index.table_json,
+        ),
+        ("/api/games/all (first encode)", index.rows, List[GameTableRow], None),
+        ("/api/search (20 cards)", cards[:20], List[SearchResult], None),
+        ("/api/games/by-ids (60 cards)", cards, List[SearchResult], None),
+        ("/api/games/{id}?expand=similar", game, Game, None),
+        ("/api/games/browse (50 rows)", browse, BrowseResponse, None),
+    ]
+
+    header = (
+        f"{'endpoint':<34} | {'before p50 us':>13} | {'after p50 us':>12} | "
+        f"{'speedup':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for label, value, type_, optimized in cases:
+        before_fn = _fastapi_response_model_path(value, type_)
+        after_fn = optimized or (lambda v=value, t=type_: model_response(v, t).body)
+
+        # Both paths must produce the same JSON document
+        assert json.loads(before_fn()) == json.loads(after_fn()), label
+
+        before = np.percentile(_time_us(before_fn, args.n_runs), 50)
+        after = np.percentile(_time_us(after_fn, args.n_runs), 50)
+        print(
+            f"{label:<34} | {before:>13,.1f} | {after:>12,.1f} | "
+            f"{before / after:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
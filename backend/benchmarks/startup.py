@@ -0,0 +1,193 @@
+"""
+Startup-time report and budget check.
+
+Cold starts on Cloud Run pay for importing the app and running its lifespan
+before the first request is served. This starts fresh interpreters and reports:
+
+- where import time goes, per top-level package (`python -X importtime`)
+- the median time to import `main` and to finish the startup warm-up (see
+  `warmup`), over `--runs`
+- whether importing `main` loaded any module meant to be imported lazily
+  (`LAZY_MODULES`)
+
+and exits with status 1 if the median time to ready exceeds `--budget-ms` or a
+lazy module was imported. The interpreters get no `OPENAI_*` environment
+variables, and query embeddings come from `fixtures.fake_embedding` (after
+importing the OpenAI SDK, as a real first embedding does), so the warm-up sends
+no request and the budget covers the local work only, whatever the machine's
+`.env` or network:
+
+    python -m benchmarks.startup --budget-ms 3000
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from typing import Dict, List
+
+# ==========
+# CONSTANTS
+# ==========
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time to ready (import + warm-up) allowed by default
+STARTUP_BUDGET_MS = 3_000
+
+# Only needed by some requests (or not at all when serving); importing them at
+# startup is a regression
+LAZY_MODULES = ("openai", "tenacity", "dotenv", "tqdm", "pandas")
+
+# Runs in a fresh interpreter; prints its timings as JSON on the last line
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+modules = sorted(sys.modules)
+
+import search_utils
+from benchmarks.fixtures import fake_embedding
+
+def fake_query_embedding(text):
+    import utils.openai
+    return fake_embedding(text)
+
+search_utils.get_embedding_for_query = fake_query_embedding
+main.get_embedding_for_query = fake_query_embedding
+warming = time.perf_counter()
+
+async def startup():
+    async with main.lifespan(main.app):
+        await main.app.state.warmup_task
+
+asyncio.run(startup())
+ready = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "warmup_s": ready - warming,
+    "modules": modules,
+}))
+"""
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _offline_env() -> Dict[str, str]:
+    """The environment without the OpenAI API's key, base URL, ..."""
+    return {
+        name: value
+        for name, value in os.environ.items()
+        if not name.startswith("OPENAI_")
+    }
+
+
+def _probe() -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=_offline_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(runs: int) -> Dict:
+    """
+    Times `runs` fresh interpreters importing `main` and warming up, after one
+    that writes the bytecode caches (not counted).
+
+    Returns:
+        The median "import_ms", "warmup_ms" and "ready_ms", and the
+        "lazy_modules" that importing `main` loaded.
+    """
+    _probe()
+    probes: List[Dict] = [_probe() for _ in range(runs)]
+    import_ms = statistics.median(p["import_s"] for p in probes) * 1000
+    warmup_ms = statistics.median(p["warmup_s"] for p in probes) * 1000
+    loaded = {module.split(".")[0] for module in probes[0]["modules"]}
+    return {
+        "import_ms": import_ms,
+        "warmup_ms": warmup_ms,
+        "ready_ms": import_ms + warmup_ms,
+        "lazy_modules": sorted(loaded.intersection(LAZY_MODULES)),
+    }
+
+
+def import_time_by_package() -> Counter:
+    """Microseconds spent importing `main`, per top-level package (self time)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        env=_offline_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    by_package: Counter = Counter()
+    for line in result.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+    return by_package
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reports startup time and checks it against a budget."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15, help="Packages to list.")
+    args = parser.parse_args()
+
+    # After the probes, whose first run writes the bytecode caches
+    startup = measure_startup(args.runs)
+    by_package = import_time_by_package()
+
+    total_us = sum(by_package.values())
+    print(f"{'package':<24} | {'import ms':>9} | {'share':>6}")
+    print("-" * 45)
+    for package, us in by_package.most_common(args.top):
+        print(f"{package:<24} | {us / 1000:>9.1f} | {us / total_us:>6.1%}")
+
+    ready_ms = startup["ready_ms"]
+    print(
+        f"\nMedian of {args.runs}: import {startup['import_ms']:.0f} ms + warm-up "
+        f"{startup['warmup_ms']:.0f} ms = {ready_ms:.0f} ms to ready "
+        f"(budget {args.budget_ms:.0f} ms)"
+    )
+
+    failures = []
+    if startup["lazy_modules"]:
+        failures.append(f"imported by main: {', '.join(startup['lazy_modules'])}")
+    if ready_ms > args.budget_ms:
+        over_ms = ready_ms - args.budget_ms
+        failures.append(f"over the startup budget by {over_ms:.0f} ms")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Memory report for the multi-worker server: what does each worker cost?
+
+For each worker count, starts the production server (`gunicorn.conf.py`, via
+`benchmarks.load_test.local_stack`), waits for it to be ready, drives the load
+test's traffic mix through it so every worker has served requests, then reads
+each process's memory from `/proc/<pid>/smaps_rollup` (Linux only):
+
+- RSS: resident pages, counting pages shared with other processes in full
+- USS: pages private to the process (what it costs on its own)
+- PSS: resident pages with shared ones split between the processes sharing
+  them; summed over the master and workers, the server's real footprint
+
+With `--compare-no-preload`, each count is also run with the indexes built by
+each worker after forking instead of once before it, to show what sharing saves:
+
+    python -m benchmarks.worker_memory --workers 1 2 4 --compare-no-preload
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+# Third-party imports
+import httpx
+
+# Local imports
+from benchmarks.load_test import (
+    DEFAULT_MIX,
+    Workload,
+    local_stack,
+    run_level,
+    synthetic_queries,
+)
+
+# ==========
+# CONSTANTS
+# ==========
+DEFAULT_WORKERS = [1, 2, 4]
+
+# smaps_rollup fields (in kB) summed into each reported figure
+MEMORY_FIELDS = {
+    "rss": ("Rss",),
+    "pss": ("Pss",),
+    "uss": ("Private_Clean", "Private_Dirty"),
+}
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def process_memory(pid: int) -> Dict[str, float]:
+    """RSS, PSS and USS of a process, in MB."""
+    kb: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                kb[name] = int(value.split()[0])
+    return {
+        figure: sum(kb.get(field, 0) for field in fields) / 1024
+        for figure, fields in MEMORY_FIELDS.items()
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """The direct children of a process (gunicorn's workers, for its master)."""
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+async def _drive_traffic(url: str, concurrency: int, duration: float):
+    response = httpx.get(f"{url}/api/games/all", params={"fields": "id"}, timeout=60)
+    response.raise_for_status()
+    game_ids = [row["id"] for row in response.json()]
+    workload = Workload(game_ids, synthetic_queries(), DEFAULT_MIX)
+    await run_level(url, workload, concurrency, duration, timeout=30.0)
+
+
+def measure(n_workers: int, preload: bool, db_path: str, duration: float) -> Dict:
+    """
+    Starts the server with `n_workers` workers, loads it, and reads its memory.
+
+    Returns:
+        The master's and each worker's figures, and the totals.
+    """
+    with local_stack(n_workers, None, db_path, 0.0, 0.0, preload=preload) as (
+        url,
+        server,
+    ):
+        # Enough clients that every worker gets requests
+        asyncio.run(_drive_traffic(url, 4 * n_workers, duration))
+        time.sleep(0.5)
+        master = process_memory(server.pid)
+        workers = [process_memory(pid) for pid in child_pids(server.pid)]
+
+    processes = [master] + workers
+    return {
+        "n_workers": n_workers,
+        "preload": preload,
+        "master": master,
+        "workers": workers,
+        "total": {
+            figure: sum(p[figure] for p in processes) for figure in MEMORY_FIELDS
+        },
+    }
+
+
+def print_report(runs: List[Dict]):
+    """Prints one row per run: per-worker means, and the whole server's totals."""
+    header = (
+        f"{'workers':>7} | {'preload':>7} | {'master RSS':>10} | "
+        f"{'worker RSS':>10} | {'worker USS':>10} | {'worker PSS':>10} | "
+        f"{'total RSS':>9} | {'total PSS':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for run in runs:
+        workers = run["workers"]
+
+        def mean(figure: str) -> float:
+            return sum(w[figure] for w in workers) / max(1, len(workers))
+
+        print(
+            f"{run['n_workers']:>7} | {'yes' if run['preload'] else 'no':>7} | "
+            f"{run['master']['rss']:>10.1f} | {mean('rss'):>10.1f} | "
+            f"{mean('uss'):>10.1f} | {mean('pss'):>10.1f} | "
+            f"{run['total']['rss']:>9.1f} | {run['total']['pss']:>9.1f}"
+        )
+    print("\nMB. The total PSS is the server's actual memory use; summed RSS counts")
+    print("shared pages once per process.")
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reports per-worker and total memory of the multi-worker server."
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument("--db", help="Database to serve (default: the API's own).")
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="Seconds of traffic per run."
+    )
+    parser.add_argument(
+        "--compare-no-preload",
+        action="store_true",
+        help="Also run each worker count without building before forking.",
+    )
+    parser.add_argument("--out", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    modes = [True, False] if args.compare_no_preload else [True]
+    runs = []
+    for n_workers in args.workers:
+        for preload in modes:
+            print(
+                f"Measuring {n_workers} worker(s), "
+                f"{'with' if preload else 'without'} preload...",
+                flush=True,
+            )
+            runs.append(measure(n_workers, preload, args.db, args.duration))
+    print()
+    print_report(runs)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(runs, f, indent=2)
+        print(f"Saved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Spatial index of the booths on the show-floor map.
+
+Booth geometry comes from `booths.json` (the same file the frontend ships), which
+maps OCR'd booth strings to pixel boxes `[x1, y1, x2, y2]` on `pax-map.jpg`. Some
+keys are several adjacent booths read as one string (e.g. "2410824106"); those
+are split into individual 5-digit booth numbers, each getting an equal slice of
+the box in reading order.
+
+Booths are bucketed into a uniform grid by their center, and joined against
+`games.booth_number` once, so a "what's near booth N" query only touches the
+grid cells overlapping the search radius.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import json
+import math
+import os
+import sqlite3
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Local imports
+from db import catalog_of
+from models import SearchResult
+
+# ==========
+# CONSTANTS
+# ==========
+# booths.json is copied next to the backend at build time; during local
+# development we fall back to the frontend's copy.
+_BACKEND_DIR = os.path.dirname(__file__)
+BOOTHS_PATH = os.environ.get(
+    "PAXPAL_BOOTHS_PATH", os.path.join(_BACKEND_DIR, "booths.json")
+)
+_FRONTEND_BOOTHS_PATH = os.path.join(
+    _BACKEND_DIR, "..", "frontend", "public", "booths.json"
+)
+
+# Booth numbers at PAX are five digits long
+BOOTH_NUMBER_LENGTH = 5
+
+# Side length (in map pixels) of a spatial grid cell
+GRID_CELL_SIZE = 128.0
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def resolve_booths_path() -> Optional[str]:
+    """Returns the booths.json to load, or None if neither copy exists."""
+    for path in (BOOTHS_PATH, _FRONTEND_BOOTHS_PATH):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def format_booth_number(booth_number: float) -> str:
+    """Formats a `games.booth_number` REAL the way booths.json keys it."""
+    if float(booth_number).is_integer():
+        return str(int(booth_number))
+    return str(booth_number)
+
+
+def split_booth_key(
+    key: str, box: List[float]
+) -> List[Tuple[str, Tuple[float, float, float, float]]]:
+    """
+    Splits a (possibly concatenated) booths.json key into individual booths.
+
+    "2410824106" with box [513, 204, 630, 218] becomes booth "24108" on the left
+    half of the box and "24106" on the right half.
+    """
+    x1, y1, x2, y2 = (float(v) for v in box)
+    if (
+        not key.isdigit()
+        or len(key) <= BOOTH_NUMBER_LENGTH
+        or len(key) % BOOTH_NUMBER_LENGTH != 0
+    ):
+        return [(key, (x1, y1, x2, y2))]
+
+    parts = [
+        key[i : i + BOOTH_NUMBER_LENGTH]
+        for i in range(0, len(key), BOOTH_NUMBER_LENGTH)
+    ]
+    width = (x2 - x1) / len(parts)
+    return [
+        (part, (x1 + i * width, y1, x1 + (i + 1) * width, y2))
+        for i, part in enumerate(parts)
+    ]
+
+
+# ===========
+# BOOTH INDEX
+# ===========
+
+
+class BoothIndex:
+    """
+    Booth boxes bucketed into a uniform grid, joined with the games at each booth.
+    """
+
+    def __init__(
+        self,
+        boxes: Dict[str, Tuple[float, float, float, float]],
+        games_by_booth: Dict[str, List[SearchResult]],
+        cell_size: float = GRID_CELL_SIZE,
+    ):
+        self.boxes = boxes
+        self.games_by_booth = games_by_booth
+        self.cell_size = cell_size
+
+        self.centers: Dict[str, Tuple[float, float]] = {
+            booth: ((x1 + x2) / 2, (y1 + y2) / 2)
+            for booth, (x1, y1, x2, y2) in boxes.items()
+        }
+        # Reverse of games_by_booth, for looking up where a game is
+        self.booth_of_game: Dict[str, str] = {
+            game.id: booth
+            for booth, games in games_by_booth.items()
+            for game in games
+        }
+        self.grid: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+        for booth, (cx, cy) in self.centers.items():
+            self.grid[self._cell(cx, cy)].append(booth)
+
+    @classmethod
+    def from_sources(
+        cls, db: sqlite3.Connection, booths_path: Optional[str] = None
+    ) -> "BoothIndex":
+        """Loads booths.json, splits merged keys, and joins the games table."""
+        booths_path = booths_path or resolve_booths_path()
+        raw_boxes: Dict[str, List[float]] = {}
+        if booths_path is None:
+            print("booths.json not found; the booth index will be empty.")
+        else:
+            with open(booths_path) as f:
+                raw_boxes = json.load(f)
+
+        boxes: Dict[str, Tuple[float, float, float, float]] = {}
+        for key, box in raw_boxes.items():
+            for booth, booth_box in split_booth_key(key, box):
+                # Keep the first box if a booth appears under several keys
+                boxes.setdefault(booth, booth_box)
+
+        games_by_booth: Dict[str, List[SearchResult]] = defaultdict(list)
+        rows = db.execute(
+            """
+            SELECT id, name, snappy_summary, header_image_url, booth_number
+            FROM games
+            WHERE booth_number IS NOT NULL
+            ORDER BY name
+            """
+        ).fetchall()
+        for row in rows:
+            booth = format_booth_number(row["booth_number"])
+            games_by_booth[booth].append(
+                SearchResult(
+                    id=row["id"],
+                    name=row["name"],
+                    snappy_summary=row["snappy_summary"],
+                    header_image_url=row["header_image_url"],
+                )
+            )
+        return cls(boxes=boxes, games_by_booth=dict(games_by_booth))
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def __contains__(self, booth: str) -> bool:
+        return booth in self.boxes
+
+    def nearby(self, booth: str, radius: float) -> List[Tuple[str, float]]:
+        """
+        Returns (booth, distance) pairs for every booth whose center lies within
+        `radius` map pixels of `booth`'s center, closest first (including `booth`
+        itself at distance 0).
+        """
+        cx, cy = self.centers[booth]
+        min_cell = self._cell(cx - radius, cy - radius)
+        max_cell = self._cell(cx + radius, cy + radius)
+
+        found: List[Tuple[str, float]] = []
+        for gx in range(min_cell[0], max_cell[0] + 1):
+            for gy in range(min_cell[1], max_cell[1] + 1):
+                for other in self.grid.get((gx, gy), ()):
+                    ox, oy = self.centers[other]
+                    distance = math.hypot(ox - cx, oy - cy)
+                    if distance <= radius:
+                        found.append((other, distance))
+        found.sort(key=lambda pair: (pair[1], pair[0]))
+        return found
+
+
+# ==============
+# INDEX REGISTRY
+# ==============
+
+
+def get_booth_index(db: sqlite3.Connection) -> BoothIndex:
+    """Returns the catalog's booth index, building it on first use."""
+    return catalog_of(db).derived(
+        "booth_index", lambda: BoothIndex.from_sources(db)
+    )
@@ -0,0 +1,263 @@
+"""
+Builds the derived search indexes that sit next to `database.sqlite`.
+
+Run this after the database has been downloaded (the Dockerfile does it at image
+build time), and on every database published for hot reload or as an event
+(`--db`): the API only reads these artifacts, and builds a tier whose artifacts
+are missing in memory only. For each in-memory vector tier it:
+
+- builds the tier from the `game_embs` vectors and persists it (e.g.
+  `database.int8.npz`, `database.reduced256.npz`, `database.ivf.npz`) along with
+  the float32 export used for re-ranking (`database.f32.npy`)
+- reports the memory and on-disk size reduction versus float32
+- reports per-query latency and recall@k against the exact vec0 search
+
+Queries are perturbed catalog vectors, so the report runs over the real catalog
+without calling the embeddings API.
+
+    python build_indexes.py --tiers int8 binary reduced --k 20 --oversample 4
+    python build_indexes.py --tiers reduced --reduced-dims 128 256 512
+    python build_indexes.py --tiers ivf --nprobe 1 4 8 16
+    python build_indexes.py --db events/pax-west-2025.sqlite
+
+`--check` builds nothing: it exits with status 1 if any of `--tiers` would be
+built in memory by the API rather than loaded, because its artifacts are missing
+or the database was written after them (the Dockerfile runs it last).
+
+    python build_indexes.py --check
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from db import DATABASE_PATH, get_db_connection
+from search_utils import semantic_search
+from vector_index import (
+    REDUCED_DIMENSIONS,
+    CompactVectorIndex,
+    ReducedDimVectorIndex,
+    build_vector_index,
+    compact_index_path,
+    full_vectors_path,
+    load_embeddings,
+    vector_artifacts_fresh,
+)
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _sample_queries(vectors: np.ndarray, n_queries: int, seed: int) -> np.ndarray:
+    """
+    Builds offline benchmark queries by perturbing random catalog vectors, so the
+    report can be produced without calling the embeddings API.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(vectors.shape[0], size=min(n_queries, vectors.shape[0]))
+    queries = vectors[picks] + rng.normal(0, 0.02, size=(len(picks), vectors.shape[1]))
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries.astype(np.float32)
+
+
+def _percentile_ms(timings: List[float], pct: float) -> float:
+    return float(np.percentile(timings, pct) * 1_000)
+
+
+def _format_bytes(n_bytes: int) -> str:
+    return f"{n_bytes / 1_048_576:.2f} MiB"
+
+
+def _report_tier(
+    label: str,
+    index: CompactVectorIndex,
+    db,
+    queries: np.ndarray,
+    exact_results: List[Dict[str, float]],
+    float_bytes: int,
+    args: argparse.Namespace,
+    path: Optional[str] = None,
+) -> None:
+    """Times a compact tier against the exact results and prints its report."""
+    timings: List[float] = []
+    recalls: List[float] = []
+    for query, exact in zip(queries, exact_results):
+        start = time.perf_counter()
+        approx = semantic_search(
+            db,
+            query.tolist(),
+            k=args.k,
+            vector_index=index,
+            oversample=args.oversample,
+        )
+        timings.append(time.perf_counter() - start)
+        recalls.append(len(set(approx) & set(exact)) / max(len(exact), 1))
+
+    # The IVF tier's candidate count is set by nprobe, not by the oversample factor
+    shortlist_note = "" if index.tier == "ivf" else f" (oversample {args.oversample}x)"
+    lines = [
+        f"\n[{label}]",
+        f"  resident memory: {_format_bytes(index.nbytes)} "
+        f"({float_bytes / index.nbytes:.1f}x smaller than float32; re-rank vectors "
+        f"are memory-mapped from {os.path.basename(full_vectors_path(args.db))})",
+    ]
+    if path is not None:
+        lines.append(
+            f"  on disk: {os.path.basename(path)} {_format_bytes(os.path.getsize(path))} "
+            f"({os.path.getsize(path) / os.path.getsize(args.db):.1%} of "
+            f"database.sqlite)"
+        )
+    lines += [
+        f"  latency: p50 {_percentile_ms(timings, 50):.2f} ms | "
+        f"p99 {_percentile_ms(timings, 99):.2f} ms",
+        f"  recall@{args.k}{shortlist_note}: {np.mean(recalls):.3f}",
+    ]
+    print("\n".join(lines))
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--db", default=DATABASE_PATH, help="Database to build the indexes of."
+    )
+    parser.add_argument(
+        "--tiers",
+        nargs="+",
+        default=["int8", "binary", "reduced", "ivf"],
+        choices=["int8", "binary", "reduced", "ivf"],
+        help="Vector tiers to build.",
+    )
+    parser.add_argument(
+        "--reduced-dims",
+        nargs="+",
+        type=int,
+        default=[],
+        help="Extra dimensionalities to benchmark for the reduced tier (not persisted).",
+    )
+    parser.add_argument(
+        "--nprobe",
+        nargs="+",
+        type=int,
+        default=[],
+        help="Extra nprobe values to benchmark for the IVF tier.",
+    )
+    parser.add_argument("--k", type=int, default=20, help="k used for recall@k.")
+    parser.add_argument(
+        "--oversample", type=int, default=4, help="Shortlist size as a multiple of k."
+    )
+    parser.add_argument(
+        "--n-queries", type=int, default=100, help="Number of benchmark queries."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only check that the API would load every tier's artifacts.",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        stale = [t for t in args.tiers if not vector_artifacts_fresh(t, args.db)]
+        if stale:
+            print(
+                f"Vector artifacts of {args.db} missing or older than it: "
+                f"{', '.join(stale)}"
+            )
+            sys.exit(1)
+        print(f"Vector artifacts of {args.db} are up to date")
+        return
+
+    with get_db_connection(args.db) as db:
+        ids, vectors = load_embeddings(db)
+        if not ids:
+            print("No vectors found in game_embs; nothing to build.")
+            return
+
+        float_bytes = vectors.nbytes
+        print(f"Loaded {len(ids):,} vectors of dimension {vectors.shape[1]}")
+        print(f"float32 vectors in memory: {_format_bytes(float_bytes)}")
+        print(
+            f"database.sqlite on disk:   {_format_bytes(os.path.getsize(args.db))}"
+        )
+
+        queries = _sample_queries(vectors, args.n_queries, args.seed)
+
+        # Exact results from the vec0 brute-force search that hybrid_search uses
+        exact_results: List[Dict[str, float]] = []
+        exact_timings: List[float] = []
+        for query in queries:
+            start = time.perf_counter()
+            exact_results.append(semantic_search(db, query.tolist(), k=args.k))
+            exact_timings.append(time.perf_counter() - start)
+        print(
+            f"\n[exact]\n  latency: p50 {_percentile_ms(exact_timings, 50):.2f} ms | "
+            f"p99 {_percentile_ms(exact_timings, 99):.2f} ms"
+        )
+
+        for tier in args.tiers:
+            start = time.perf_counter()
+            index = build_vector_index(db, tier, args.db)
+            label = f"{tier}{REDUCED_DIMENSIONS}" if tier == "reduced" else tier
+            if tier == "ivf":
+                label = f"ivf lists={index.n_lists} nprobe={index.nprobe}"
+            print(f"\nBuilt {label} in {time.perf_counter() - start:.2f}s")
+            _report_tier(
+                label,
+                index,
+                db,
+                queries,
+                exact_results,
+                float_bytes,
+                args,
+                path=compact_index_path(tier, args.db),
+            )
+
+            # Recall / speed trade-off of the IVF probe count
+            if tier == "ivf":
+                default_nprobe = index.nprobe
+                for nprobe in args.nprobe:
+                    index.nprobe = nprobe
+                    _report_tier(
+                        f"ivf lists={index.n_lists} nprobe={nprobe}",
+                        index,
+                        db,
+                        queries,
+                        exact_results,
+                        float_bytes,
+                        args,
+                    )
+                index.nprobe = default_nprobe
+
+        # Dimensionality sweep for the coarse-to-fine tier, built in memory only
+        for dimensions in args.reduced_dims:
+            index = ReducedDimVectorIndex.build(ids, vectors, dimensions=dimensions)
+            _report_tier(
+                f"reduced{dimensions}",
+                index,
+                db,
+                queries,
+                exact_results,
+                float_bytes,
+                args,
+            )
+
+
+if __name__ == "__main__":
+    main()
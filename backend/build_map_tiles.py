@@ -0,0 +1,74 @@
+"""
+Cuts `pax-map.jpg` into the zoomable tile pyramid served under `/api/map/tiles`.
+
+Run this after `pax-map.jpg` and `booths.json` have been copied next to the
+backend (the Dockerfile does it at image build time). Tiles are written to
+`map_tiles/<version>/`, where the version is a hash of the map and booth data.
+
+    python build_map_tiles.py
+    python build_map_tiles.py --formats webp jpeg
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import os
+import time
+
+# Local imports
+from map_images import (
+    IMAGE_FORMATS,
+    TILES_DIR,
+    build_tile_pyramid,
+    resolve_map_path,
+    supported_formats,
+)
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        default=None,
+        choices=list(IMAGE_FORMATS),
+        help="Tile formats to write (defaults to every format Pillow can encode).",
+    )
+    parser.add_argument("--out-dir", default=TILES_DIR, help="Tile output directory.")
+    args = parser.parse_args()
+
+    map_path = resolve_map_path()
+    if map_path is None:
+        print("pax-map.jpg not found; no tiles built.")
+        return
+
+    formats = args.formats or supported_formats()
+    start = time.perf_counter()
+    manifest = build_tile_pyramid(map_path, out_dir=args.out_dir, formats=formats)
+    print(
+        f"Built tile pyramid {manifest['version']} ({manifest['width']}x"
+        f"{manifest['height']}, zoom 0-{manifest['max_zoom']}, "
+        f"{', '.join(formats)}) in {time.perf_counter() - start:.1f}s"
+    )
+
+    version_dir = os.path.join(args.out_dir, manifest["version"])
+    for fmt in formats:
+        total = 0
+        for root, _, files in os.walk(version_dir):
+            total += sum(
+                os.path.getsize(os.path.join(root, name))
+                for name in files
+                if name.endswith(f".{fmt}")
+            )
+        print(f"  {fmt}: {total / 1_048_576:.2f} MiB across all zoom levels")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Stores the catalog snapshot history in `database.sqlite`, for
+`/api/catalog/delta`.
+
+A client that has an earlier snapshot version can only get a delta from it if
+that version is in the served database's `catalog_snapshots` table (see
+`catalog_snapshot`). This script writes the database's own snapshot there, along
+with the history of the databases it replaces: each earlier database given with
+`--previous` contributes its own snapshot and the history stored in it. The
+newest `SNAPSHOT_HISTORY` versions are kept.
+
+Run it after `normalize_db.py` on the new database and on the earlier ones (the
+Dockerfile does it at image build time, with the earlier databases the workflow
+downloads), and before the database's version is stamped. To publish into a
+`PAXPAL_DATABASE_DIR`, passing the newest database already there is enough,
+since its history comes along:
+
+    python build_snapshots.py
+    python build_snapshots.py --previous old/2025-08-27.sqlite old/2025-08-28.sqlite
+    python build_snapshots.py --db staging.sqlite --previous releases/2025-08-29.sqlite
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import time
+from typing import Dict, Tuple
+
+# Local imports
+from catalog_snapshot import (
+    CatalogSnapshot,
+    read_snapshot_history,
+    write_snapshot_history,
+)
+from db import DATABASE_PATH, get_db_connection
+from normalize_db import is_normalized
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--db", default=DATABASE_PATH, help="Database to store the history in."
+    )
+    parser.add_argument(
+        "--previous",
+        nargs="*",
+        default=[],
+        help="Earlier databases, oldest first, whose snapshots are carried forward.",
+    )
+    args = parser.parse_args()
+
+    # version -> (built_at, data)
+    history: Dict[str, Tuple[float, bytes]] = {}
+    for path in args.previous:
+        with get_db_connection(path) as db:
+            if not is_normalized(db):
+                print(f"Skipping {path}: run normalize_db.py --db {path} first")
+                continue
+            for version, entry in read_snapshot_history(db).items():
+                history.setdefault(version, entry)
+            snapshot = CatalogSnapshot.from_db(db)
+        history[snapshot.version] = (time.time(), snapshot.data)
+
+    with get_db_connection(args.db) as db:
+        # Re-running keeps the history already stored
+        for version, entry in read_snapshot_history(db).items():
+            history.setdefault(version, entry)
+        snapshot = CatalogSnapshot.from_db(db)
+        history[snapshot.version] = (time.time(), snapshot.data)
+        with db:
+            kept = write_snapshot_history(db, history)
+
+    print(f"Catalog snapshot {snapshot.version}; history: {', '.join(kept)}")
+
+
+if __name__ == "__main__":
+    main()
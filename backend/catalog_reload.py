@@ -0,0 +1,159 @@
+"""
+Hot reload of the database: serve an updated catalog without a redeploy.
+
+With `PAXPAL_DATABASE_DIR` set, the API serves the newest database file in that
+directory (see `db.latest_database`), and `CatalogReloader` checks it every
+`RELOAD_POLL_SECONDS`. When another file becomes the newest:
+
+1. it's opened alongside the served database and checked: it must pass
+   `PRAGMA quick_check` and have the normalized child tables (run
+   `normalize_db.py --db <file> --previous <served file>` on it first, as the
+   Dockerfile does for the bundled database, so unchanged games keep their
+   `updated_at`). A file that fails is logged and skipped until it changes.
+2. a new `db.Catalog` is built from it in a worker thread: its pages are read
+   into the page cache, every in-memory structure and its version are built
+   (`warmup.build_indexes`), and `RELOAD_CONNECTIONS` pooled connections are
+   opened, so its first requests are as fast as the served catalog's.
+3. `db.swap_catalog` makes it the served catalog, in one reference assignment.
+   Requests that already hold a connection finish on the old catalog; requests
+   that start afterwards get the new one.
+4. the old catalog's pool is drained: idle connections are closed at once and
+   borrowed ones when their request gives them back. Its in-memory structures
+   are freed with the last request still using them.
+
+Publish a database by copying it into the directory under a name that doesn't
+end in `.sqlite` and then renaming it, so a half-copied file is never picked up.
+Removing the newest file rolls back to the one before it the same way. With
+several workers, each one swaps on its own, within a poll interval of the others.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import asyncio
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+# Third-party imports
+from starlette.concurrency import run_in_threadpool
+
+# Local imports
+from db import (
+    DATABASE_DIR,
+    DB_POOL_SIZE,
+    Catalog,
+    current_catalog,
+    latest_database,
+    swap_catalog,
+)
+from metrics import CATALOG_RELOADS
+from normalize_db import is_normalized
+from warmup import build_indexes, touch_pages
+
+# ==========
+# CONSTANTS
+# ==========
+# How often the database directory is checked for a new file
+RELOAD_POLL_SECONDS = float(os.getenv("PAXPAL_RELOAD_POLL_SECONDS", "5"))
+
+# Pooled connections opened on a new catalog before it's swapped in
+RELOAD_CONNECTIONS = DB_POOL_SIZE
+
+
+# ========
+# RELOADER
+# ========
+
+
+class CatalogReloader:
+    """Watches a directory of database files and swaps in the newest."""
+
+    def __init__(self, directory: str, poll_seconds: float = RELOAD_POLL_SECONDS):
+        """
+        Args:
+            directory: The directory of versioned database files.
+            poll_seconds: Seconds between checks.
+        """
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        # Path -> (size, mtime) of files that failed to load, skipped until changed
+        self._rejected: Dict[str, Tuple[int, float]] = {}
+
+    def pending(self) -> Optional[str]:
+        """The newest database file, if it isn't the served one (or rejected)."""
+        path = latest_database(self.directory)
+        if path is None or os.path.abspath(path) == current_catalog().path:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if self._rejected.get(path) == (stat.st_size, stat.st_mtime):
+            return None
+        return path
+
+    def prepare(self, path: str) -> Catalog:
+        """
+        Opens and checks a database, and builds its catalog (blocking).
+
+        Raises:
+            ValueError: If the database is corrupt or isn't normalized.
+        """
+        catalog = Catalog(path)
+        with catalog.connect() as db:
+            check = db.execute("PRAGMA quick_check").fetchone()["quick_check"]
+            if check != "ok":
+                raise ValueError(f"failed its integrity check: {check}")
+            if not is_normalized(db):
+                raise ValueError(
+                    "has no normalized child tables; run `python normalize_db.py "
+                    f"--db {path}` on it first"
+                )
+        touch_pages(catalog)
+        build_indexes(catalog)
+        catalog.pool.fill(RELOAD_CONNECTIONS)
+        return catalog
+
+    async def reload(self, path: str) -> bool:
+        """
+        Builds the catalog of `path` in a worker thread, then swaps it in.
+
+        Returns:
+            Whether it was swapped in.
+        """
+        start = time.perf_counter()
+        try:
+            catalog = await run_in_threadpool(self.prepare, path)
+        except Exception as e:
+            stat = os.stat(path) if os.path.exists(path) else None
+            self._rejected[path] = (stat.st_size, stat.st_mtime) if stat else (0, 0)
+            CATALOG_RELOADS.inc(outcome="rejected")
+            print(f"Not reloading {path}: {type(e).__name__}: {e}")
+            return False
+
+        old = swap_catalog(catalog)
+        CATALOG_RELOADS.inc(outcome="swapped")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(
+            f"Now serving {path} (version {catalog.version}, built in "
+            f"{elapsed_ms:.0f} ms) in place of {old.path} (version {old.version})"
+        )
+        await run_in_threadpool(old.close)
+        return True
+
+    async def run(self):
+        """Checks for a new database every `poll_seconds`, until cancelled."""
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                path = self.pending()
+                if path is not None:
+                    await self.reload(path)
+            except Exception as e:
+                print(f"Database reload check failed: {type(e).__name__}: {e}")
+
+
+# The process-wide reloader, if the API serves a database directory
+RELOADER = CatalogReloader(DATABASE_DIR) if DATABASE_DIR else None
@@ -0,0 +1,348 @@
+"""
+Versioned, compact binary snapshot of the catalog, for clients that keep a
+local copy of it.
+
+The snapshot holds what the browse, map and similar-games views need (the card
+fields, platforms and tags, booth numbers, the similar-games graph and the booth
+boxes) as a MessagePack document laid out by column. Every string is interned
+into a single string table and the columns hold indices into it, so repeated
+values (exhibitors, platforms, tags, the ids in the similar-games lists) are
+stored once.
+
+The version is a hash of the snapshot's content, so it only changes when the
+catalog does. The database itself keeps the last `SNAPSHOT_HISTORY` versions, in
+its `catalog_snapshots` table, which lets the API answer "what changed since
+version X" with a delta (upserted games, deleted game ids, and the booths if they
+changed) in the same encoding. The table is written at build time by
+`build_snapshots.py`, which carries the history forward from earlier databases,
+so it ships (and hot-reloads) with the database it belongs to.
+
+Layout (format 1):
+
+    {
+        "format": 1,
+        "version": "<16 hex chars>",
+        "strings": [...],
+        "games": {"id": [...], "name": [...], ..., "similar_games": [[...], ...]},
+        "booths": {"number": [...], "box": [x1, y1, x2, y2, x1, ...]},
+    }
+
+A delta has "from" and "to" versions, "strings", "games" (the upserted games),
+"deleted_games" (ids), and "booths" (null when they didn't change).
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import hashlib
+import re
+import sqlite3
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Third-party imports
+import msgpack
+
+# Local imports
+from booth_index import BoothIndex, get_booth_index
+from db import catalog_of
+
+# ==========
+# CONSTANTS
+# ==========
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_MEDIA_TYPE = "application/msgpack"
+
+# Number of versions kept in a database's snapshot history
+SNAPSHOT_HISTORY = 8
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_snapshots (
+    version   TEXT PRIMARY KEY,
+    built_at  REAL NOT NULL,
+    data      BLOB NOT NULL
+)
+"""
+
+# A snapshot version: a prefix of the SHA-256 of its content
+SNAPSHOT_VERSION = re.compile(r"^[0-9a-f]{16}$")
+
+# Game columns; string columns and list-of-string columns are interned
+STRING_COLUMNS = ("id", "name", "snappy_summary", "header_image_url", "exhibitor")
+VALUE_COLUMNS = ("booth_number", "released")
+LIST_COLUMNS = ("platforms", "genres_and_tags", "similar_games")
+
+Box = Tuple[float, float, float, float]
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def load_catalog(
+    db: sqlite3.Connection, booth_index: BoothIndex
+) -> Tuple[Dict[str, dict], Dict[str, Box]]:
+    """
+    Reads the snapshot's contents.
+
+    Args:
+        db: Database connection.
+        booth_index: Booth boxes to include.
+
+    Returns:
+        (game records keyed by id, in id order; booth boxes keyed by booth number).
+    """
+    lists: Dict[str, Dict[str, List[str]]] = {
+        column: defaultdict(list) for column in LIST_COLUMNS
+    }
+    for column, sql in (
+        ("platforms", "SELECT game_id, platform AS value FROM game_platforms"),
+        ("genres_and_tags", "SELECT game_id, tag AS value FROM game_tags"),
+        (
+            "similar_games",
+            "SELECT game_id, similar_game_id AS value FROM game_similar",
+        ),
+    ):
+        order = "rank" if column == "similar_games" else "position"
+        for row in db.execute(f"{sql} ORDER BY game_id, {order}"):
+            lists[column][row["game_id"]].append(row["value"])
+
+    games: Dict[str, dict] = {}
+    rows = db.execute(
+        """
+        SELECT id, name, snappy_summary, header_image_url, exhibitor,
+               booth_number, released
+        FROM games
+        ORDER BY id
+        """
+    )
+    for row in rows:
+        row["released"] = bool(row["released"] or 0)
+        for column in LIST_COLUMNS:
+            row[column] = lists[column].get(row["id"], [])
+        games[row["id"]] = row
+
+    booths = {booth: booth_index.boxes[booth] for booth in sorted(booth_index.boxes)}
+    return games, booths
+
+
+class _StringTable:
+    """Interns strings into a list, handing out their indices."""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def __call__(self, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return None
+        if value not in self._index:
+            self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return self._index[value]
+
+
+def _encode_games(games: List[dict], intern: _StringTable) -> Dict[str, list]:
+    """Lays out game records by column, with strings interned."""
+    columns: Dict[str, list] = {}
+    for column in STRING_COLUMNS:
+        columns[column] = [intern(game[column]) for game in games]
+    for column in VALUE_COLUMNS:
+        columns[column] = [game[column] for game in games]
+    for column in LIST_COLUMNS:
+        columns[column] = [[intern(v) for v in game[column]] for game in games]
+    return columns
+
+
+def _encode_booths(booths: Dict[str, Box], intern: _StringTable) -> Dict[str, list]:
+    return {
+        "number": [intern(booth) for booth in booths],
+        "box": [float(v) for box in booths.values() for v in box],
+    }
+
+
+def decode_games(payload: Dict[str, Any]) -> Dict[str, dict]:
+    """Decodes the games of a snapshot (or delta) back to records keyed by id."""
+    strings, columns = payload["strings"], payload["games"]
+
+    def lookup(index: Optional[int]) -> Optional[str]:
+        return None if index is None else strings[index]
+
+    games: Dict[str, dict] = {}
+    for i in range(len(columns["id"])):
+        game = {column: lookup(columns[column][i]) for column in STRING_COLUMNS}
+        game.update({column: columns[column][i] for column in VALUE_COLUMNS})
+        for column in LIST_COLUMNS:
+            game[column] = [strings[v] for v in columns[column][i]]
+        games[game["id"]] = game
+    return games
+
+
+def decode_booths(payload: Dict[str, Any]) -> Dict[str, Box]:
+    """Decodes the booth boxes of a snapshot."""
+    strings, booths = payload["strings"], payload["booths"]
+    flat = booths["box"]
+    return {
+        strings[number]: tuple(flat[4 * i : 4 * i + 4])
+        for i, number in enumerate(booths["number"])
+    }
+
+
+# ========
+# SNAPSHOT
+# ========
+
+
+class CatalogSnapshot:
+    """One version of the catalog, encoded once and served as bytes."""
+
+    def __init__(self, games: Dict[str, dict], booths: Dict[str, Box]):
+        self.games = games
+        self.booths = booths
+
+        intern = _StringTable()
+        body = {
+            "games": _encode_games(list(games.values()), intern),
+            "booths": _encode_booths(booths, intern),
+        }
+        body["strings"] = intern.strings
+        self.version = hashlib.sha256(msgpack.packb(body)).hexdigest()[:16]
+        self.data: bytes = msgpack.packb(
+            {
+                "format": SNAPSHOT_FORMAT,
+                "version": self.version,
+                "strings": body["strings"],
+                "games": body["games"],
+                "booths": body["booths"],
+            }
+        )
+        self._deltas: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_db(
+        cls, db: sqlite3.Connection, booth_index: Optional[BoothIndex] = None
+    ) -> "CatalogSnapshot":
+        games, booths = load_catalog(db, booth_index or get_booth_index(db))
+        return cls(games, booths)
+
+    # ------
+    # Deltas
+    # ------
+
+    def delta_from(self, version: str, db: sqlite3.Connection) -> Optional[bytes]:
+        """
+        Encodes the changes from a previous version to this one.
+
+        Args:
+            version: The version the client has.
+            db: Connection to this snapshot's database, whose history holds the
+                previous versions.
+
+        Returns:
+            The encoded delta, or None if `version` isn't a version, isn't in the
+            history or its stored snapshot can't be decoded.
+        """
+        if not SNAPSHOT_VERSION.match(version):
+            return None
+        if version in self._deltas:
+            return self._deltas[version]
+
+        if version == self.version:
+            old_games, old_booths = self.games, self.booths
+        else:
+            data = read_stored_snapshot(db, version)
+            if data is None:
+                return None
+            try:
+                old = msgpack.unpackb(data)
+                old_games, old_booths = decode_games(old), decode_booths(old)
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                print(f"Couldn't read catalog snapshot {version}: {e!r}")
+                return None
+
+        upserts = [
+            game
+            for game_id, game in self.games.items()
+            if old_games.get(game_id) != game
+        ]
+        intern = _StringTable()
+        games = _encode_games(upserts, intern)
+        booths = None
+        if old_booths != self.booths:
+            booths = _encode_booths(self.booths, intern)
+        delta = msgpack.packb(
+            {
+                "format": SNAPSHOT_FORMAT,
+                "from": version,
+                "to": self.version,
+                "strings": intern.strings,
+                "games": games,
+                "deleted_games": sorted(set(old_games) - set(self.games)),
+                "booths": booths,
+            }
+        )
+        self._deltas[version] = delta
+        return delta
+
+
+# =======
+# HISTORY
+# =======
+
+
+def read_stored_snapshot(db: sqlite3.Connection, version: str) -> Optional[bytes]:
+    """Returns a version from the database's snapshot history, if it's there."""
+    try:
+        row = db.execute(
+            "SELECT data FROM catalog_snapshots WHERE version = ?", (version,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # A database built without a history
+        return None
+    return None if row is None else row["data"]
+
+
+def read_snapshot_history(db: sqlite3.Connection) -> Dict[str, Tuple[float, bytes]]:
+    """Returns the database's snapshot history, as version -> (built_at, data)."""
+    try:
+        rows = db.execute("SELECT version, built_at, data FROM catalog_snapshots")
+        return {row["version"]: (row["built_at"], row["data"]) for row in rows}
+    except sqlite3.OperationalError:
+        return {}
+
+
+def write_snapshot_history(
+    db: sqlite3.Connection, history: Dict[str, Tuple[float, bytes]]
+) -> List[str]:
+    """
+    Replaces the database's snapshot history with the newest `SNAPSHOT_HISTORY`
+    versions of `history`.
+
+    Args:
+        db: Database connection (the caller commits).
+        history: version -> (built_at, data).
+
+    Returns:
+        The versions kept, newest first.
+    """
+    kept = sorted(history, key=lambda version: history[version][0], reverse=True)
+    kept = kept[:SNAPSHOT_HISTORY]
+    db.execute(HISTORY_SCHEMA)
+    db.execute("DELETE FROM catalog_snapshots")
+    db.executemany(
+        "INSERT INTO catalog_snapshots (version, built_at, data) VALUES (?, ?, ?)",
+        [(version, *history[version]) for version in kept],
+    )
+    return kept
+
+
+# =================
+# SNAPSHOT REGISTRY
+# =================
+
+
+def get_catalog_snapshot(db: sqlite3.Connection) -> CatalogSnapshot:
+    """Returns the catalog's snapshot, building it on first use."""
+    return catalog_of(db).derived("snapshot", lambda: CatalogSnapshot.from_db(db))
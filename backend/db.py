@@ -1,17 +1,37 @@
 """
 Database connection handling for the FastAPI application.
+
+A `Catalog` is one database file together with its connection pool, its version
+and the in-memory structures built from it (the filter index, the similar-games
+graph, ...). Connections know the catalog they were opened for, and those
+structures are looked up on it (`catalog_of(db)`), so a request only ever sees
+data from the database it's reading. Requests read the served catalog
+(`current_catalog`), which `swap_catalog` replaces atomically when a new
+database is hot-reloaded (see `catalog_reload`). `CatalogMiddleware` pins each
+request to the catalog served when it arrives, so its ETag (see `http_cache`)
+and its data come from the same database even if a swap lands in between.
 """
 
 # =====
 # SETUP
 # =====
 # General imports
+import hashlib
 import sqlite3
 import os
+import threading
+import time
+import weakref
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
 
 # Third-party imports
 import sqlite_vec  # Ensure sqlite_vec is importable, installed via requirements
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Local imports
+from metrics import DB_CONNECTIONS_OPEN, DB_CONNECTIONS_OPENED, DB_SLOW_STATEMENTS
 
 # ==========
 # CONSTANTS
@@ -19,7 +39,33 @@ import sqlite_vec  # Ensure sqlite_vec is importable, installed via requirements
 # Determine the absolute path to the database file relative to this file.
 # __file__ is the path to db.py
 # os.path.dirname(__file__) is the directory containing db.py (backend/)
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "database.sqlite")
+# PAXPAL_DATABASE_PATH points the API at another database (e.g. a synthetic one)
+DATABASE_PATH = os.getenv("PAXPAL_DATABASE_PATH") or os.path.join(
+    os.path.dirname(__file__), "database.sqlite"
+)
+
+# Directory of versioned database files to serve and hot-reload from (see
+# `catalog_reload`); unset serves DATABASE_PATH for the life of the process
+DATABASE_DIR = os.getenv("PAXPAL_DATABASE_DIR")
+DATABASE_SUFFIX = ".sqlite"
+
+# Build stamp written next to a database at image build time (see Dockerfile);
+# if it's missing, the version is hashed from the database file on first use
+VERSION_SUFFIX = ".version"
+
+# Statements taking at least this long (execute plus fetches) are logged with
+# their parameters and query plan; 0 disables the slow-statement log
+SLOW_STATEMENT_MS = float(os.getenv("PAXPAL_SLOW_STATEMENT_MS", "100"))
+# Logged parameters are cut to this many characters (ID lists can be long)
+SLOW_STATEMENT_MAX_PARAMS_CHARS = 300
+
+# Idle connections kept open for reuse by requests (see `ConnectionPool`)
+DB_POOL_SIZE = int(os.getenv("PAXPAL_DB_POOL_SIZE", "16"))
+
+# Connections read the database through a memory map of up to this many bytes,
+# i.e. straight from the OS page cache, which every connection and every worker
+# process shares, instead of copying pages into a private cache each; 0 disables
+SQLITE_MMAP_SIZE = int(os.getenv("PAXPAL_SQLITE_MMAP_MB", "256")) << 20
 
 
 # ===============
@@ -35,41 +81,496 @@ def _dict_factory(cursor, row):
     return {key: value for key, value in zip(fields, row)}
 
 
+# ==================
+# SLOW-STATEMENT LOG
+# ==================
+
+
+def log_slow_statement(
+    conn: sqlite3.Connection, sql: str, parameters, seconds: float
+) -> None:
+    """Prints a slow statement with its parameters, duration and query plan."""
+    DB_SLOW_STATEMENTS.inc()
+    if isinstance(parameters, (list, tuple)):
+        # Embedding vectors are bound as blobs; their size is what's useful
+        parameters_repr = tuple(
+            f"<{len(value)} bytes>" if isinstance(value, bytes) else value
+            for value in parameters
+        )
+    else:
+        parameters_repr = parameters
+    params = repr(parameters_repr)
+    if len(params) > SLOW_STATEMENT_MAX_PARAMS_CHARS:
+        params = params[:SLOW_STATEMENT_MAX_PARAMS_CHARS] + "..."
+    try:
+        plan_cursor = sqlite3.Cursor(conn)
+        plan_cursor.row_factory = None  # (id, parent, notused, detail) tuples
+        plan_rows = plan_cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+        plan = "; ".join(row[3] for row in plan_rows)
+    except sqlite3.Error as e:
+        plan = f"unavailable ({e})"
+    print(
+        f"Slow SQL statement ({seconds * 1000:.1f} ms): {' '.join(sql.split())}\n"
+        f"    params: {params}\n"
+        f"    plan: {plan}"
+    )
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor timing each statement's `execute` and `fetch*` calls, and logging
+    the statement once their total reaches `SLOW_STATEMENT_MS`.
+
+    Each `fetchmany` is timed and logged on its own: a cursor read in batches
+    (the NDJSON export) does work in proportion to what it streams, so its total
+    says nothing about any one round trip. Its `execute` is checked on its own
+    when it returns, before the first batch.
+    """
+
+    _sql = None
+    _parameters = ()
+    _elapsed = 0.0
+    _logged = True
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+            if not self._logged and self._elapsed * 1000 >= SLOW_STATEMENT_MS:
+                self._logged = True
+                log_slow_statement(
+                    self.connection, self._sql, self._parameters, self._elapsed
+                )
+
+    def execute(self, sql, parameters=()):
+        self._sql, self._parameters = sql, parameters
+        self._elapsed, self._logged = 0.0, False
+        return self._timed(super().execute, sql, parameters)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        self._elapsed, self._logged = 0.0, False
+        if size is None:
+            return self._timed(super().fetchmany)
+        return self._timed(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+
+class CatalogConnection(sqlite3.Connection):
+    """Connection that knows the catalog it was opened for."""
+
+    catalog: Optional["Catalog"] = None
+
+
+class TimedConnection(CatalogConnection):
+    """Connection whose cursors (including `execute`'s) are `TimedCursor`s."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+
 # ====================
 # CONNECTION MANAGER
 # ====================
 
 
-@contextmanager
-def get_db_connection():
+def open_connection(
+    path: Optional[str] = None, catalog: Optional["Catalog"] = None
+) -> sqlite3.Connection:
     """
-    Provides a managed database connection using a context manager.
+    Opens a database connection with sqlite-vec loaded and rows as dictionaries.
 
-    Ensures the connection is properly closed even if errors occur.
-    Connects in read-only mode and enables WAL journaling for better concurrency
-    as recommended for the API server in the project description.
+    Args:
+        path: Database file to open (defaults to `DATABASE_PATH`); the benchmarks
+              use this to run against fixture databases.
+        catalog: The catalog the connection reads, set as its `catalog`.
     """
-    conn = None
     try:
         # Connect in read-write mode using URI to allow setting WAL
         conn = sqlite3.connect(
-            f"file:{DATABASE_PATH}?mode=rw",
+            f"file:{path or DATABASE_PATH}?mode=rw",
             uri=True,
             timeout=5.0,  # Set a reasonable timeout
             check_same_thread=False,  # Required for FastAPI/multi-threaded use
+            # Time statements for the slow-statement log, if it's enabled
+            factory=TimedConnection if SLOW_STATEMENT_MS > 0 else CatalogConnection,
         )
+    except sqlite3.Error as e:
+        print(f"Database connection error: {e}")
+        raise
+    DB_CONNECTIONS_OPENED.inc()
+    DB_CONNECTIONS_OPEN.inc()
+    conn.catalog = catalog
+    try:
         conn.enable_load_extension(True)
         sqlite_vec.load(conn)  # Load the sqlite-vec extension
         conn.row_factory = _dict_factory  # Return rows as dictionaries
         conn.execute("PRAGMA journal_mode=WAL;")  # Use WAL for concurrency
-        yield conn
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE};")
     except sqlite3.Error as e:
         print(f"Database connection error: {e}")
-        # Re-raise or handle as appropriate for your application
+        close_connection(conn)
         raise
+    return conn
+
+
+def close_connection(conn: sqlite3.Connection) -> None:
+    """Closes a connection opened by `open_connection`."""
+    conn.close()
+    DB_CONNECTIONS_OPEN.dec()
+
+
+@contextmanager
+def get_db_connection(path: Optional[str] = None):
+    """
+    Provides a managed database connection using a context manager.
+
+    Ensures the connection is properly closed even if errors occur.
+    Connects in read-only mode and enables WAL journaling for better concurrency
+    as recommended for the API server in the project description.
+
+    Args:
+        path: Database file to open (defaults to the served one); the benchmarks
+              use this to run against fixture databases.
+    """
+    catalog = get_catalog(path)
+    conn = open_connection(catalog.path, catalog=catalog)
+    try:
+        yield conn
     finally:
-        if conn:
-            conn.close()
+        close_connection(conn)
+
+
+# ===============
+# CONNECTION POOL
+# ===============
+
+
+class ConnectionPool:
+    """
+    Idle connections to one database, reused across requests.
+
+    Opening a connection and loading sqlite-vec into it costs about a
+    millisecond, more than most queries, and each connection keeps its own
+    cache of compiled statements. So requests borrow a connection and give it
+    back. Nothing ever waits: when no idle connection is left a new one is
+    opened, and connections given back to a full pool are closed.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        size: int = DB_POOL_SIZE,
+        catalog: Optional["Catalog"] = None,
+    ):
+        """
+        Args:
+            path: Database file (defaults to `DATABASE_PATH`).
+            size: Most idle connections kept open.
+            catalog: The catalog its connections read.
+        """
+        self.path = path or DATABASE_PATH
+        self.size = size
+        # Weak, so the pool itself doesn't keep its catalog alive. Its idle
+        # connections do (`conn.catalog`): a catalog is only freed once `close()`
+        # has closed them, and then with the last request still using it
+        self._catalog = weakref.ref(catalog) if catalog is not None else None
+        self.closed = False
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                # Most recently used first: its pages and statements are warmest
+                return self._idle.pop()
+        return open_connection(self.path, catalog=self.catalog)
+
+    @property
+    def catalog(self) -> Optional["Catalog"]:
+        """The catalog its connections read, if any."""
+        return self._catalog() if self._catalog is not None else None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self.closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        close_connection(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection for the duration of the block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def fill(self, n: int) -> None:
+        """Opens connections until `n` are idle (at most `size`)."""
+        while True:
+            with self._lock:
+                if self.closed or len(self._idle) >= min(n, self.size):
+                    return
+            self.release(open_connection(self.path, catalog=self.catalog))
+
+    def close(self) -> None:
+        """Closes the idle connections; borrowed ones are closed when released."""
+        with self._lock:
+            self.closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            close_connection(conn)
+
+
+# ================
+# DATABASE VERSION
+# ================
+
+
+def compute_db_version(path: str = DATABASE_PATH) -> str:
+    """
+    Hashes a database file's content into a short version string.
+
+    Args:
+        path: The database file.
+
+    Returns:
+        The first 16 hex characters of the file's SHA-256.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def read_db_version(path: str) -> str:
+    """
+    Returns a database's version: its build stamp if there is one, otherwise a
+    hash of the file.
+    """
+    stamp_path = f"{path}{VERSION_SUFFIX}"
+    if os.path.isfile(stamp_path):
+        with open(stamp_path) as f:
+            return f.read().strip()
+    return compute_db_version(path)
+
+
+# =======
+# CATALOG
+# =======
+
+
+class Catalog:
+    """
+    One database file, its connection pool, and everything derived from it.
+
+    Structures built from the database are kept in `derived`, so they're built
+    once per catalog, and dropping the catalog frees them once the requests
+    still reading it are done.
+    """
+
+    def __init__(self, path: str, pool_size: int = DB_POOL_SIZE):
+        """
+        Args:
+            path: The database file.
+            pool_size: Most idle connections kept open.
+        """
+        self.path = os.path.abspath(path)
+        self.pool = ConnectionPool(self.path, pool_size, catalog=self)
+        self._version: Optional[str] = None
+        self._derived: Dict[str, Any] = {}
+        # One lock per structure, so concurrent first requests build it once
+        # while structures that don't depend on each other build in parallel
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._build_locks_lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """The database's version (see `read_db_version`), read on first use."""
+        if self._version is None:
+            self._version = read_db_version(self.path)
+        return self._version
+
+    def derived(self, name: str, build: Callable[[], Any]) -> Any:
+        """
+        Returns the structure called `name`, building it on first use. Callers
+        that ask while it's being built wait for that build instead of starting
+        their own.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        with self._build_locks_lock:
+            lock = self._build_locks.setdefault(name, threading.Lock())
+        with lock:
+            try:
+                return self._derived[name]
+            except KeyError:
+                value = self._derived[name] = build()
+                return value
+
+    def peek(self, name: str) -> Any:
+        """Returns the structure called `name` if it's been built, else None."""
+        return self._derived.get(name)
+
+    @contextmanager
+    def connect(self):
+        """A connection of its own (not pooled), closed after the block."""
+        conn = open_connection(self.path, catalog=self)
+        try:
+            yield conn
+        finally:
+            close_connection(conn)
+
+    def close(self) -> None:
+        """Drains the pool: closes idle connections now, borrowed ones on release."""
+        self.pool.close()
+
+
+def latest_database(directory: str) -> Optional[str]:
+    """
+    The newest database file in a directory: the last `*.sqlite` by name, so
+    name them to sort in release order (e.g. `20250829-1400.sqlite`).
+    """
+    try:
+        names = [
+            name
+            for name in os.listdir(directory)
+            if name.endswith(DATABASE_SUFFIX) and not name.startswith(".")
+        ]
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, max(names)) if names else None
+
+
+# ================
+# CATALOG REGISTRY
+# ================
+# Catalogs by absolute database path, and the one requests are served from
+_CATALOGS: Dict[str, Catalog] = {}
+_CURRENT: Optional[Catalog] = None
+_CATALOGS_LOCK = threading.Lock()
+# The catalog the running request is pinned to (see `CatalogMiddleware`)
+_REQUEST_CATALOG: ContextVar[Optional["Catalog"]] = ContextVar(
+    "request_catalog", default=None
+)
+
+
+def get_catalog(path: Optional[str] = None) -> Catalog:
+    """
+    Returns the catalog of a database file, creating it on first use.
+
+    Args:
+        path: The database file (defaults to the served one).
+    """
+    if path is None:
+        return current_catalog()
+    path = os.path.abspath(path)
+    with _CATALOGS_LOCK:
+        catalog = _CATALOGS.get(path)
+        if catalog is None:
+            catalog = _CATALOGS[path] = Catalog(path)
+        return catalog
+
+
+def current_catalog() -> Catalog:
+    """
+    Returns the served catalog. At startup that's the newest database in
+    `DATABASE_DIR` if it's set and has one, otherwise `DATABASE_PATH`.
+    """
+    global _CURRENT
+    if _CURRENT is None:
+        path = (DATABASE_DIR and latest_database(DATABASE_DIR)) or DATABASE_PATH
+        catalog = get_catalog(path)
+        with _CATALOGS_LOCK:
+            if _CURRENT is None:
+                _CURRENT = catalog
+    return _CURRENT
+
+
+def swap_catalog(catalog: Catalog) -> Catalog:
+    """
+    Makes `catalog` the served one. Requests that already hold a connection
+    finish on the old catalog; the caller drains it with `close()`.
+
+    Returns:
+        The previously served catalog, no longer registered.
+    """
+    global _CURRENT
+    old = current_catalog()
+    with _CATALOGS_LOCK:
+        _CATALOGS[catalog.path] = catalog
+        _CURRENT = catalog
+        if old is not catalog and _CATALOGS.get(old.path) is old:
+            del _CATALOGS[old.path]
+    return old
+
+
+def request_catalog() -> Catalog:
+    """
+    Returns the catalog the running request is pinned to, or the served one
+    outside a request.
+    """
+    return _REQUEST_CATALOG.get() or current_catalog()
+
+
+def catalog_of(db: sqlite3.Connection) -> Catalog:
+    """The catalog a connection reads (the request's, for a plain connection)."""
+    return getattr(db, "catalog", None) or request_catalog()
+
+
+def close_catalogs() -> None:
+    """Drains every catalog's pool (at shutdown)."""
+    with _CATALOGS_LOCK:
+        catalogs = list(_CATALOGS.values())
+    for catalog in catalogs:
+        catalog.close()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """Returns the pool of connections to the request's database."""
+    return request_catalog().pool
+
+
+def get_db_version() -> str:
+    """Returns the version of the request's database, read once per catalog."""
+    return request_catalog().version
+
+
+class CatalogMiddleware:
+    """
+    ASGI middleware pinning each request to the catalog served when it arrives.
+    Added outside every middleware and route that reads the database.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Copied into the threads that run the request's dependencies and routes
+        token = _REQUEST_CATALOG.set(current_catalog())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _REQUEST_CATALOG.reset(token)
 
 
 # =====================
@@ -81,7 +582,11 @@ def get_db():
     """
     FastAPI dependency that yields a database connection for a single request.
 
-    Uses the context manager to ensure the connection is closed after the request.
+    The connection is borrowed from the request's catalog's pool (see
+    `CatalogMiddleware`) and returned to it after the request, so the request
+    finishes on that catalog even if another is swapped in meanwhile.
     """
-    with get_db_connection() as db:
+    # Held for the request, so the catalog outlives its connection
+    catalog = request_catalog()
+    with catalog.pool.connection() as db:
         yield db
@@ -0,0 +1,260 @@
+"""
+Multi-event serving: one database per event (show), opened on demand.
+
+With `PAXPAL_EVENTS_DIR` set, every `<event>.sqlite` in that directory is an
+event, searchable at `/api/{event}/search` (and across events at
+`/api/events/search`). Each event is a shard: a `db.Catalog` of its own, so it
+has its own connection pool, version (ETag) and in-memory structures (filter
+index, vector index, ...), all built lazily by its first requests.
+
+Nothing is opened for an event until it's requested, and adding one to the
+directory touches no other event. At most `MAX_OPEN_EVENTS` shards are kept
+open: opening another evicts the least recently used one, whose pool is drained
+and whose structures are freed once the requests still using it are done. An
+evicted event reopens (and rebuilds) on its next request.
+
+Replacing an event's file (copy it in under another name, then rename it over
+the old one) is picked up on that event's next request: the shard is reopened
+on the new file and the old one drained, as with an eviction.
+
+Cross-event search computes the query's embedding once, searches the shards
+concurrently (up to `FAN_OUT_THREADS` at a time) and merges their ranked
+results by combined score. Each shard
+normalizes its scores among its own candidates, so the merge interleaves the
+events' rankings rather than comparing absolute relevance.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import heapq
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Sequence, Tuple
+
+# Third-party imports
+from anyio import CapacityLimiter
+from fastapi import HTTPException, status
+
+# Local imports
+from db import DATABASE_SUFFIX, Catalog, get_db_version
+from metrics import EVENT_SHARD_EVICTIONS, EVENT_SHARDS_OPEN
+
+# ==========
+# CONSTANTS
+# ==========
+EVENTS_DIR = os.getenv("PAXPAL_EVENTS_DIR")
+
+# Most event shards kept open at once
+MAX_OPEN_EVENTS = int(os.getenv("PAXPAL_MAX_OPEN_EVENTS", "8"))
+
+# Most idle connections kept open per event
+EVENT_POOL_SIZE = int(os.getenv("PAXPAL_EVENT_POOL_SIZE", "4"))
+
+# Events a cross-event search searches at once. A search is mostly CPU, so more
+# threads than cores only contend for the GIL.
+FAN_OUT_THREADS = int(os.getenv("PAXPAL_FAN_OUT_THREADS") or os.cpu_count() or 1)
+FAN_OUT_LIMITER = CapacityLimiter(FAN_OUT_THREADS)
+
+# Event names are file names, and appear in URLs
+EVENT_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+# Path of the routes that serve one event's data
+EVENT_PATH = re.compile(r"^/api/(?P<event>[^/]+)/search$")
+
+# Path segments under /api/ that are the API's own, not events
+RESERVED_NAMES = frozenset({"events", "games", "booths", "map", "search"})
+
+
+# ======
+# SHARDS
+# ======
+
+
+class EventShards:
+    """The open event shards, least recently used first."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_open: int = MAX_OPEN_EVENTS,
+        pool_size: int = EVENT_POOL_SIZE,
+    ):
+        """
+        Args:
+            directory: The directory of `<event>.sqlite` files.
+            max_open: Most shards kept open; opening another evicts the least
+                      recently used.
+            pool_size: Most idle connections kept open per shard.
+        """
+        self.directory = directory
+        self.max_open = max_open
+        self.pool_size = pool_size
+        # Event -> (catalog, (device, inode) of the file it was opened on)
+        self._open: "OrderedDict[str, Tuple[Catalog, Tuple[int, int]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def path(self, event: str) -> str:
+        """The database file of an event (whether or not it exists)."""
+        return os.path.join(self.directory, f"{event}{DATABASE_SUFFIX}")
+
+    def names(self) -> List[str]:
+        """The events in the directory, sorted."""
+        try:
+            files = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name[: -len(DATABASE_SUFFIX)]
+            for name in files
+            if name.endswith(DATABASE_SUFFIX)
+            and EVENT_NAME.match(name[: -len(DATABASE_SUFFIX)])
+            and name[: -len(DATABASE_SUFFIX)] not in RESERVED_NAMES
+        )
+
+    def get(self, event: str) -> Catalog:
+        """
+        Returns an event's shard, opening it (and evicting another) if needed.
+
+        Raises:
+            KeyError: If there's no such event.
+        """
+        if not EVENT_NAME.match(event) or event in RESERVED_NAMES:
+            raise KeyError(event)
+        path = self.path(event)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise KeyError(event) from None
+        # Not the mtime: opening a database switches it to WAL mode, which
+        # rewrites its header. Renaming a new file over it changes its inode.
+        identity = (stat.st_dev, stat.st_ino)
+
+        closing = []
+        with self._lock:
+            entry = self._open.get(event)
+            if entry is not None and entry[1] == identity:
+                self._open.move_to_end(event)
+                return entry[0]
+            if entry is not None:
+                # The file was replaced: reopen on the new one
+                closing.append(self._open.pop(event)[0])
+            catalog = Catalog(path, self.pool_size)
+            self._open[event] = (catalog, identity)
+            while len(self._open) > self.max_open:
+                _, (evicted, _) = self._open.popitem(last=False)
+                closing.append(evicted)
+                EVENT_SHARD_EVICTIONS.inc()
+            EVENT_SHARDS_OPEN.inc(1 - len(closing))
+        # Outside the lock: requests for other events needn't wait on it
+        for old in closing:
+            old.close()
+        return catalog
+
+    def open_events(self) -> List[str]:
+        """The events with an open shard, least recently used first."""
+        with self._lock:
+            return list(self._open)
+
+    def close(self) -> None:
+        """Drains every open shard (at shutdown)."""
+        with self._lock:
+            closing = [catalog for catalog, _ in self._open.values()]
+            self._open.clear()
+            EVENT_SHARDS_OPEN.dec(len(closing))
+        for catalog in closing:
+            catalog.close()
+
+
+# The process-wide shards, if the API serves several events
+EVENTS = EventShards(EVENTS_DIR) if EVENTS_DIR else None
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def event_names() -> List[str]:
+    """The events served, sorted (none if `EVENTS_DIR` isn't set)."""
+    return EVENTS.names() if EVENTS is not None else []
+
+
+def open_event_names() -> List[str]:
+    """The events with an open shard, least recently used first."""
+    return EVENTS.open_events() if EVENTS is not None else []
+
+
+def close_events() -> None:
+    """Drains every open event shard (at shutdown)."""
+    if EVENTS is not None:
+        EVENTS.close()
+
+
+def event_catalog(event: str) -> Catalog:
+    """
+    Returns an event's shard.
+
+    Raises:
+        HTTPException: 404 if events aren't served or there's no such event.
+    """
+    try:
+        if EVENTS is None:
+            raise KeyError(event)
+        return EVENTS.get(event)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event '{event}' not found",
+        ) from None
+
+
+def get_event_db(event: str):
+    """
+    FastAPI dependency that yields a connection to the event in the path, for a
+    single request (see `db.get_db`).
+    """
+    # Held for the request, so an evicted shard outlives its connection
+    catalog = event_catalog(event)
+    with catalog.pool.connection() as db:
+        yield db
+
+
+def data_version(path: str) -> str:
+    """
+    The version of the data behind a request path, for ETags: the event's
+    database for an event's routes, otherwise the served database.
+
+    Raises:
+        OSError: If the database isn't available.
+    """
+    match = EVENT_PATH.match(path)
+    if match is not None and EVENTS is not None:
+        try:
+            return EVENTS.get(match["event"]).version
+        except KeyError:
+            # Not an event: left to the routes (which answer 404)
+            pass
+    return get_db_version()
+
+
+def merge_ranked(
+    results: Iterable[Sequence[Tuple[str, object, float]]], limit: int
+) -> List[Tuple[str, object]]:
+    """
+    Merges per-event ranked results into one ranking, by descending score.
+
+    Args:
+        results: Per event, (event, result, score) triples, best first.
+        limit: Most results to return.
+
+    Returns:
+        (event, result) pairs; ties keep the order of `results`.
+    """
+    merged = heapq.merge(*results, key=lambda item: -item[2])
+    return [(event, result) for event, result, _ in merged][:limit]
@@ -0,0 +1,204 @@
+"""
+Streaming NDJSON export of the full game catalog.
+
+`GET /api/games/export` returns every game as a full `Game` record, one JSON
+object per line. Records are read with a single server-side cursor in chunks of
+`EXPORT_CHUNK_SIZE` games (`fetchmany`), and each chunk's child rows (platforms,
+tags, media, links, similar games) are fetched with one `json_each` query per
+child table, so memory stays constant however large the catalog is. Chunks are
+encoded with orjson straight into the response stream, optionally gzipped on
+the fly.
+
+`updated_since` limits the export to the games whose `updated_at` (stamped by
+`normalize_db.py`) is later, for clients that keep a copy of the catalog: they
+pass the `X-Catalog-Updated-At` of their last export. Deleted games aren't in
+an export; a client that needs them compares ids with `/api/games/all`.
+
+The stream runs on its own connection to the request's catalog (the database
+the route read `X-Catalog-Updated-At` from, even if a hot reload swaps another
+in meanwhile), opened when the first chunk is produced and closed when the
+stream ends (or the client disconnects). The open `SELECT`
+keeps one read transaction for the whole export, so in WAL mode the export is a
+consistent snapshot even while the database is being written.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import json
+import sqlite3
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+# Third-party imports
+import orjson
+
+# Local imports
+from db import Catalog
+
+# ==========
+# CONSTANTS
+# ==========
+# Games read (and child rows fetched) per round trip
+EXPORT_CHUNK_SIZE = 500
+
+# gzip compression level for compressed exports (speed over size)
+EXPORT_GZIP_LEVEL = 5
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# The child tables, as (Game field, query returning game_id + the item columns)
+CHILD_QUERIES = {
+    "platforms": "SELECT game_id, platform FROM game_platforms",
+    "genres_and_tags": "SELECT game_id, tag FROM game_tags",
+    "media": "SELECT game_id, type, source, url FROM game_media",
+    "links": "SELECT game_id, title, url FROM game_links",
+    "similar_games": "SELECT game_id, similar_game_id FROM game_similar",
+}
+CHILD_ORDER = {"similar_games": "rank"}
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _children_by_game(
+    db: sqlite3.Connection, field: str, game_ids: List[str]
+) -> Dict[str, List[dict]]:
+    """Fetches one child table's rows for a chunk of games, grouped by game."""
+    sql = (
+        f"{CHILD_QUERIES[field]} "
+        "WHERE game_id IN (SELECT value FROM json_each(?)) "
+        f"ORDER BY game_id, {CHILD_ORDER.get(field, 'position')}"
+    )
+    children: Dict[str, List[dict]] = defaultdict(list)
+    for row in db.execute(sql, (json.dumps(game_ids),)):
+        children[row.pop("game_id")].append(row)
+    return children
+
+
+def _record(row: dict, children: Dict[str, Dict[str, List[dict]]]) -> dict:
+    """
+    Assembles one game's `Game`-shaped record from its row and child rows, as
+    game details return it (without the `expand=similar` cards).
+    """
+    game_id = row["id"]
+    return {
+        "id": game_id,
+        "name": row["name"],
+        "snappy_summary": row["snappy_summary"],
+        "description": row["description"] or "",
+        "platforms": [item["platform"] for item in children["platforms"][game_id]],
+        "developer": row["developer"],
+        "exhibitor": row["exhibitor"],
+        "booth_number": row["booth_number"],
+        "header_image_url": row["header_image_url"],
+        "steam_link": row["steam_link"],
+        "genres_and_tags": [
+            item["tag"] for item in children["genres_and_tags"][game_id]
+        ],
+        # Videos first, as `Game` orders them
+        "media": sorted(
+            children["media"][game_id], key=lambda item: item["type"] != "video"
+        ),
+        "released": bool(row["released"] or 0),
+        "release_time": row["release_time"],
+        "links": children["links"][game_id],
+        "similar_games": [
+            item["similar_game_id"] for item in children["similar_games"][game_id]
+        ],
+    }
+
+
+# ======
+# EXPORT
+# ======
+
+
+def iter_game_chunks(
+    db: sqlite3.Connection,
+    after: Optional[str] = None,
+    updated_since: Optional[str] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Yields the catalog as NDJSON, one chunk of games at a time, in id order.
+
+    Args:
+        db: Connection to read from (kept busy until the iterator is exhausted).
+        after: Only export games whose id sorts after this one (to resume an
+               interrupted export from the last id received).
+        updated_since: Only export games updated after this time (formatted as
+                       `games.updated_at`).
+        chunk_size: Games per chunk.
+
+    Yields:
+        NDJSON bytes, one line per game.
+    """
+    games = db.cursor()
+    games.execute(
+        """
+        SELECT
+            id, name, snappy_summary, description, developer, exhibitor,
+            booth_number, header_image_url, steam_link, released, release_time
+        FROM games
+        WHERE id > ? AND updated_at > ?
+        ORDER BY id
+        """,
+        (after or "", updated_since or ""),
+    )
+    while True:
+        rows = games.fetchmany(chunk_size)
+        if not rows:
+            return
+        game_ids = [row["id"] for row in rows]
+        children = {
+            field: _children_by_game(db, field, game_ids) for field in CHILD_QUERIES
+        }
+        yield b"".join(
+            orjson.dumps(_record(row, children), option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+def latest_update(db: sqlite3.Connection) -> Optional[str]:
+    """The latest `updated_at` of the catalog, to resume from with `updated_since`."""
+    row = db.execute("SELECT MAX(updated_at) AS latest FROM games").fetchone()
+    return row["latest"]
+
+
+def gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Gzips a byte stream on the fly. Each input chunk is flushed, so the client
+    can decode every chunk as soon as it arrives.
+    """
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def stream_export(
+    catalog: Catalog,
+    after: Optional[str] = None,
+    updated_since: Optional[str] = None,
+    gzip: bool = False,
+) -> Iterator[bytes]:
+    """
+    Streams the export on a dedicated connection, which is closed when the
+    stream finishes or is abandoned by the client.
+
+    Args:
+        catalog: The catalog to export (the request's).
+        after, updated_since: See `iter_game_chunks`.
+        gzip: Whether to gzip the stream.
+
+    Yields:
+        Response body chunks.
+    """
+    with catalog.connect() as db:
+        chunks = iter_game_chunks(db, after=after, updated_since=updated_since)
+        yield from gzip_chunks(chunks) if gzip else chunks
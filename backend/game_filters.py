@@ -0,0 +1,346 @@
+"""
+In-memory facet index used to filter searches and to power faceted browsing.
+
+Filtering on platforms and genres/tags in SQL means joining and grouping the
+child tables for every query. This module reads the tables once per process (at
+startup) and keeps:
+
+- every game as a pre-validated `GameTableRow`, in alphabetical order, so each game
+  is identified by a dense ordinal;
+- one packed bitmap (1 bit per game) per platform, genre/tag, exhibitor and
+  released flag, stacked into a matrix per facet;
+- a sorted booth-number array for booth-range filters.
+
+A filter then resolves with a few vectorized AND/OR operations over the bitmaps,
+and the facet counts for a selection are a single popcount per facet matrix.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import base64
+import bisect
+import json
+import sqlite3
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from db import catalog_of
+from models import FacetCount, GameTableRow, SearchFilters
+from serialization import dump_json
+from vector_index import popcount_rows
+
+# ==========
+# CONSTANTS
+# ==========
+# The facets exposed by the index, in the order they're reported
+FACETS = ("platform", "tag", "exhibitor", "released")
+
+
+# ===========
+# FACET INDEX
+# ===========
+
+
+class GameFilterIndex:
+    """
+    Packed bitmaps of game ordinals for each facet value.
+
+    Facet values are matched case-insensitively. Within the platform and exhibitor
+    facets any selected value matches; every selected genre/tag must match.
+    """
+
+    def __init__(
+        self,
+        rows: List[GameTableRow],
+        released: List[bool],
+    ):
+        # Ordinal order is alphabetical, so listing a selection in ordinal order
+        # is listing it by name.
+        self.rows = rows
+        self.ids = [row.id for row in rows]
+        # (lowercased name, id) of each row: the listing's keyset sort key
+        self.sort_keys: List[Tuple[str, str]] = [
+            ((row.name or "").lower(), row.id) for row in rows
+        ]
+        self.n_games = len(rows)
+
+        # Facet value labels (as first seen) and their bitmap row per facet
+        self.labels: Dict[str, List[str]] = {}
+        self.value_rows: Dict[str, Dict[str, int]] = {}
+        self.bitmaps: Dict[str, np.ndarray] = {}
+
+        postings: Dict[str, Dict[str, List[int]]] = {
+            facet: defaultdict(list) for facet in FACETS
+        }
+        labels: Dict[str, Dict[str, str]] = {facet: {} for facet in FACETS}
+
+        def _add(facet: str, value: Optional[str], ordinal: int) -> None:
+            if not value:
+                return
+            key = value.lower()
+            labels[facet].setdefault(key, value)
+            postings[facet][key].append(ordinal)
+
+        booth_pairs: List[Tuple[float, int]] = []
+        for ordinal, (row, is_released) in enumerate(zip(rows, released)):
+            for platform in row.platforms:
+                _add("platform", platform, ordinal)
+            for tag in row.genres_and_tags:
+                _add("tag", tag, ordinal)
+            _add("exhibitor", row.exhibitor, ordinal)
+            _add("released", "true" if is_released else "false", ordinal)
+            if row.booth_number is not None:
+                booth_pairs.append((row.booth_number, ordinal))
+
+        for facet in FACETS:
+            keys = list(postings[facet])
+            self.value_rows[facet] = {key: i for i, key in enumerate(keys)}
+            self.labels[facet] = [labels[facet][key] for key in keys]
+            self.bitmaps[facet] = self._pack_rows(
+                [postings[facet][key] for key in keys]
+            )
+
+        booth_pairs.sort()
+        self.booth_numbers = np.array([b for b, _ in booth_pairs], dtype=np.float64)
+        self.booth_ordinals = np.array([o for _, o in booth_pairs], dtype=np.int64)
+        self.all_games = self._pack(np.arange(self.n_games))
+        self._table_json: Optional[bytes] = None
+
+    @classmethod
+    def from_db(cls, db: sqlite3.Connection) -> "GameFilterIndex":
+        """Builds the index from `games` and its platform / tag child tables."""
+        rows = db.execute(
+            """
+            SELECT id, name, snappy_summary, exhibitor, booth_number, released
+            FROM games
+            """
+        ).fetchall()
+        rows.sort(key=lambda row: ((row["name"] or "").lower(), row["id"]))
+
+        platforms: Dict[str, List[str]] = defaultdict(list)
+        for item in db.execute(
+            "SELECT game_id, platform FROM game_platforms ORDER BY game_id, position"
+        ):
+            platforms[item["game_id"]].append(item["platform"])
+        tags: Dict[str, List[str]] = defaultdict(list)
+        for item in db.execute(
+            "SELECT game_id, tag FROM game_tags ORDER BY game_id, position"
+        ):
+            tags[item["game_id"]].append(item["tag"])
+
+        table_rows: List[GameTableRow] = []
+        released: List[bool] = []
+        for row in rows:
+            try:
+                table_rows.append(
+                    GameTableRow(
+                        id=row["id"],
+                        name=row["name"],
+                        snappy_summary=row["snappy_summary"],
+                        platforms=platforms.get(row["id"], []),
+                        genres_and_tags=tags.get(row["id"], []),
+                        exhibitor=row["exhibitor"],
+                        booth_number=row["booth_number"],
+                    )
+                )
+            except Exception as e:  # Pydantic validation errors
+                print(f"Skipping game {row['id']} in facet index: {e}")
+                continue
+            released.append(bool(row["released"] or 0))
+        return cls(rows=table_rows, released=released)
+
+    @property
+    def table_json(self) -> bytes:
+        """Every row, in name order, encoded as JSON once and then reused."""
+        if self._table_json is None:
+            self._table_json = dump_json(self.rows, List[GameTableRow])
+        return self._table_json
+
+    def page_after(
+        self, after: Optional[Tuple[str, str]], limit: int
+    ) -> Tuple[List[GameTableRow], Optional[Tuple[str, str]]]:
+        """
+        Keyset pagination over the rows in name order.
+
+        Args:
+            after: Sort key of the last row of the previous page (None for the
+                   first page).
+            limit: Page size.
+
+        Returns:
+            (the page, the sort key to continue after, or None on the last page).
+        """
+        start = 0 if after is None else bisect.bisect_right(self.sort_keys, after)
+        page = self.rows[start : start + limit]
+        if start + limit >= self.n_games:
+            return page, None
+        return page, self.sort_keys[start + limit - 1]
+
+    # --------------
+    # Bitmap helpers
+    # --------------
+
+    def _pack(self, ordinals: np.ndarray) -> np.ndarray:
+        """Packs a list of ordinals into a bitmap."""
+        mask = np.zeros(self.n_games, dtype=bool)
+        mask[ordinals] = True
+        return np.packbits(mask)
+
+    def _pack_rows(self, postings: List[List[int]]) -> np.ndarray:
+        """Packs one posting list per row into a (n_values, n_bytes) matrix."""
+        mask = np.zeros((len(postings), self.n_games), dtype=bool)
+        for i, ordinals in enumerate(postings):
+            mask[i, ordinals] = True
+        return np.packbits(mask, axis=1)
+
+    def _empty(self) -> np.ndarray:
+        return np.zeros_like(self.all_games)
+
+    def _any_of(self, facet: str, values: List[str]) -> np.ndarray:
+        rows = [
+            self.value_rows[facet][v.lower()]
+            for v in values
+            if v.lower() in self.value_rows[facet]
+        ]
+        if not rows:
+            return self._empty()
+        return np.bitwise_or.reduce(self.bitmaps[facet][rows], axis=0)
+
+    def _booth_range(
+        self, booth_min: Optional[float], booth_max: Optional[float]
+    ) -> np.ndarray:
+        lo = 0 if booth_min is None else np.searchsorted(self.booth_numbers, booth_min)
+        hi = (
+            self.booth_numbers.size
+            if booth_max is None
+            else np.searchsorted(self.booth_numbers, booth_max, side="right")
+        )
+        return self._pack(self.booth_ordinals[lo:hi])
+
+    def ordinals(self, bitmap: np.ndarray) -> np.ndarray:
+        """Returns the ordinals set in a bitmap, in ascending (alphabetical) order."""
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_games))
+
+    # ---------
+    # Filtering
+    # ---------
+
+    def match_bitmap(self, filters: Optional[SearchFilters]) -> Optional[np.ndarray]:
+        """
+        Resolves filters to a bitmap of matching games, or None when no filter
+        is set (everything matches).
+        """
+        if filters is None or filters.is_empty:
+            return None
+
+        selection = self.all_games
+        if filters.platforms:
+            selection = selection & self._any_of("platform", filters.platforms)
+        if filters.exhibitors:
+            selection = selection & self._any_of("exhibitor", filters.exhibitors)
+        for tag in filters.genres_and_tags:
+            selection = selection & self._any_of("tag", [tag])
+        if filters.released is not None:
+            selection = selection & self._any_of(
+                "released", ["true" if filters.released else "false"]
+            )
+        if filters.booth_min is not None or filters.booth_max is not None:
+            selection = selection & self._booth_range(
+                filters.booth_min, filters.booth_max
+            )
+        return selection
+
+    def match(self, filters: Optional[SearchFilters]) -> Optional[Set[str]]:
+        """
+        Resolves filters to the set of matching game IDs.
+
+        Returns:
+            None when no filter is set (everything matches), otherwise the
+            (possibly empty) set of matching IDs.
+        """
+        selection = self.match_bitmap(filters)
+        if selection is None:
+            return None
+        return {self.ids[i] for i in self.ordinals(selection)}
+
+    # --------
+    # Browsing
+    # --------
+
+    def facet_counts(self, selection: np.ndarray) -> Dict[str, List[FacetCount]]:
+        """
+        Counts, for every facet value, how many games of the selection have it.
+        Values with no games in the selection are left out.
+        """
+        counts: Dict[str, List[FacetCount]] = {}
+        for facet in FACETS:
+            if self.bitmaps[facet].shape[0] == 0:
+                counts[facet] = []
+                continue
+            per_value = popcount_rows(self.bitmaps[facet] & selection)
+            order = np.argsort(-per_value, kind="stable")
+            counts[facet] = [
+                FacetCount(value=self.labels[facet][i], count=int(per_value[i]))
+                for i in order
+                if per_value[i] > 0
+            ]
+        return counts
+
+    def browse(
+        self, filters: Optional[SearchFilters], offset: int, limit: int
+    ) -> Tuple[int, List[GameTableRow], Dict[str, List[FacetCount]]]:
+        """
+        Returns (total matches, one page of rows in name order, facet counts).
+        """
+        selection = self.match_bitmap(filters)
+        if selection is None:
+            selection = self.all_games
+        ordinals = self.ordinals(selection)
+        page = [self.rows[i] for i in ordinals[offset : offset + limit]]
+        return int(ordinals.size), page, self.facet_counts(selection)
+
+
+# =======
+# CURSORS
+# =======
+# Listing cursors are the last row's sort key, as URL-safe base64 JSON. Keyset
+# cursors stay valid (and don't skip or repeat rows) across catalog rebuilds.
+
+
+def encode_cursor(sort_key: Tuple[str, str]) -> str:
+    """Encodes a (lowercased name, id) sort key as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps(list(sort_key)).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decodes a cursor made by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        name_key, game_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(name_key, str) or not isinstance(game_id, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return name_key, game_id
+
+
+# ==============
+# INDEX REGISTRY
+# ==============
+
+
+def get_filter_index(db: sqlite3.Connection) -> GameFilterIndex:
+    """Returns the catalog's facet index, building it on first use."""
+    return catalog_of(db).derived(
+        "filter_index", lambda: GameFilterIndex.from_db(db)
+    )
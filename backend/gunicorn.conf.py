@@ -0,0 +1,58 @@
+"""
+Production server: gunicorn managing uvicorn worker processes.
+
+    gunicorn main:app
+
+With `preload_app`, the master process imports the app, and `when_ready` builds
+every read-only in-memory structure (`warmup.prefork`) before any worker is
+forked. Workers then share those pages copy-on-write instead of each building
+its own copy. Each worker still runs the app's lifespan, which opens its own
+database connections and OpenAI client and gates `/ready` as usual.
+
+(`uvicorn --workers` can't do this: it spawns fresh interpreters rather than
+forking.)
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import os
+
+# ======
+# SERVER
+# ======
+# The port the frontend's nginx proxies to
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("PAXPAL_WORKERS") or os.getenv("WEB_CONCURRENCY") or 2)
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app (and build its shared structures) once, before forking
+preload_app = os.getenv("PAXPAL_PRELOAD", "1") != "0"
+
+# Seconds a silent worker is given before it's restarted, and to finish its
+# requests on shutdown
+timeout = 60
+graceful_timeout = 20
+keepalive = 5
+
+# No runtime control socket (it's written under $HOME, and isn't used)
+control_socket_disable = True
+
+
+# =====
+# HOOKS
+# =====
+
+
+def when_ready(server):
+    """Runs in the master, after the app is loaded and before workers fork."""
+    if not preload_app:
+        return
+    from warmup import prefork
+
+    try:
+        prefork()
+    except Exception as e:
+        # Workers build what's missing themselves, as a single process would
+        print(f"Pre-fork build failed: {type(e).__name__}: {e}")
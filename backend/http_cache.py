@@ -0,0 +1,187 @@
+"""
+HTTP caching for the read-only API.
+
+Every GET response under `/api/` is a function of the request URL, the database
+behind it and the deployed code. So the responses get a strong ETag made of the
+database version (see `db.get_db_version`, which changes when a new database is
+hot-reloaded, and `events.data_version` for an event's own database) and the
+release, plus a `Cache-Control` header that lets browsers and the nginx in front
+of the API cache them.
+
+A request whose `If-None-Match` matches is answered with a 304 by the middleware
+itself, before routing, so revalidating never opens a database connection.
+
+Routes that manage their own caching (they set an ETag, like the map images and
+the catalog snapshot) keep their headers, and `UNCACHED_PATHS` are left alone.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import hashlib
+import os
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Third-party imports
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Local imports
+from metrics import HTTP_NOT_MODIFIED
+
+# ==========
+# CONSTANTS
+# ==========
+# The deployed code's release. Cloud Run sets K_REVISION on every deployment.
+RELEASE = os.getenv("PAXPAL_RELEASE") or os.getenv("K_REVISION") or "dev"
+
+# How long clients and nginx may reuse a response without revalidating
+CACHE_MAX_AGE = int(os.getenv("PAXPAL_CACHE_MAX_AGE", "300"))
+CACHE_CONTROL = f"public, max-age={CACHE_MAX_AGE}"
+
+CACHED_PATH_PREFIX = "/api/"
+# Streamed, or varying by something other than the URL (the events in the
+# events directory, and every one of their databases)
+UNCACHED_PATHS = ("/api/games/export", "/api/events")
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def make_etag(*parts: str) -> str:
+    """Builds a strong ETag from version strings."""
+    return '"' + hashlib.sha256("|".join(parts).encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an `If-None-Match` header matches an ETag. The comparison is weak
+    (`W/` prefixes are ignored), as RFC 9110 requires for `If-None-Match`; nginx
+    weakens ETags when it compresses a response.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def parse_qualities(header: Optional[str]) -> Dict[str, float]:
+    """
+    Parses a header listing values with quality weights (`Accept`,
+    `Accept-Encoding`) into {lowercased value: q}. A value without a `q`
+    parameter has 1, and one with an unparsable `q` has 0.
+    """
+    qualities: Dict[str, float] = {}
+    for item in (header or "").split(","):
+        value, *params = (part.strip() for part in item.split(";"))
+        if not value:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, weight = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(weight)
+                except ValueError:
+                    q = 0.0
+        qualities[value.lower()] = q
+    return qualities
+
+
+def accepts(header: Optional[str], value: str) -> bool:
+    """
+    Whether a quality list (see `parse_qualities`) accepts `value`: it's listed
+    with a q above 0, or isn't listed and `*` is.
+    """
+    qualities = parse_qualities(header)
+    return qualities.get(value.lower(), qualities.get("*", 0.0)) > 0
+
+
+# ==========
+# MIDDLEWARE
+# ==========
+
+
+class ConditionalGetMiddleware:
+    """
+    ASGI middleware adding ETag / Cache-Control to GET responses and answering
+    matching conditional requests with 304s before they reach the app.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        version: Callable[[str], str],
+        uncached_paths: Iterable[str] = UNCACHED_PATHS,
+    ):
+        """
+        Args:
+            app: The wrapped application.
+            version: Returns the version of the database behind a request path
+                     (called per request; may fail if the database isn't
+                     available yet).
+            uncached_paths: Paths to leave alone.
+        """
+        self.app = app
+        self.version = version
+        self.uncached_paths: Tuple[str, ...] = tuple(uncached_paths)
+        # ETag by database version
+        self._etags: Dict[str, str] = {}
+
+    def etag(self, path: str) -> str:
+        version = self.version(path)
+        etag = self._etags.get(version)
+        if etag is None:
+            etag = self._etags[version] = make_etag(version, RELEASE)
+        return etag
+
+    def _applies(self, scope: Scope) -> bool:
+        return (
+            scope["type"] == "http"
+            and scope["method"] in ("GET", "HEAD")
+            and scope["path"].startswith(CACHED_PATH_PREFIX)
+            and not scope["path"].startswith(self.uncached_paths)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            etag = self.etag(scope["path"])
+        except OSError as e:
+            # No database yet; serve uncached (the routes will report the error)
+            print(f"Skipping HTTP caching: {e}")
+            await self.app(scope, receive, send)
+            return
+
+        if etag_matches(Headers(scope=scope).get("if-none-match"), etag):
+            HTTP_NOT_MODIFIED.inc()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [
+                        (b"etag", etag.encode()),
+                        (b"cache-control", CACHE_CONTROL.encode()),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cache_headers(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                if "etag" not in headers:
+                    headers["ETag"] = etag
+                    headers.setdefault("Cache-Control", CACHE_CONTROL)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_headers)
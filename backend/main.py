@@ -8,32 +8,148 @@ Defines API routes and application configuration.
 # SETUP
 # =====
 # General imports
+import asyncio
 import json
+import os
 import sqlite3
-from typing import List, Optional
-from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 # Third-party imports
+from anyio import to_thread
 from pydantic import BaseModel
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Header
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Local imports (relative)
-from models import Game, MediaItem, Link, SearchResult, GameTableRow, GameIdList
-from db import get_db
-from search_utils import hybrid_search
+from models import (
+    Game,
+    MediaItem,
+    Link,
+    SearchResult,
+    EventSearchResult,
+    GameTableRow,
+    GameIdList,
+    SearchFilters,
+    BrowseResponse,
+    NearbyBooth,
+    NearbyBoothsResponse,
+    RouteRequest,
+    RouteStop,
+    RouteResponse,
+)
+from db import Catalog, CatalogMiddleware, catalog_of, close_catalogs, get_db
+from search_utils import get_embedding_for_query, hybrid_search_scored
+from vector_index import get_vector_index
+from export import NDJSON_MEDIA_TYPE, latest_update, stream_export
+from http_cache import (
+    CACHE_CONTROL,
+    ConditionalGetMiddleware,
+    accepts,
+    etag_matches,
+)
+from metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, render, span
+from profiling import ProfilingMiddleware
+from normalize_db import format_timestamp
+from catalog_snapshot import (
+    SNAPSHOT_MEDIA_TYPE,
+    SNAPSHOT_VERSION,
+    get_catalog_snapshot,
+)
+from game_filters import decode_cursor, encode_cursor, get_filter_index
+from booth_index import get_booth_index
+from serialization import (
+    FastJSONResponse,
+    json_bytes_response,
+    model_response,
+    parse_fields,
+)
+from route_planner import get_route_planner
+from similar_games import get_similar_graph
+from warmup import WARMUP
+from catalog_reload import RELOADER
+from events import (
+    FAN_OUT_LIMITER,
+    close_events,
+    data_version,
+    event_catalog,
+    event_names,
+    get_event_db,
+    merge_ranked,
+    open_event_names,
+)
+from map_images import (
+    IMAGE_FORMATS,
+    IMMUTABLE_CACHE_CONTROL,
+    get_booth_map_renderer,
+    load_tile_manifest,
+    negotiate_format,
+    snap_crop_width,
+    tile_path,
+)
+
+# Related data the game detail endpoint can embed with `expand=`
+GAME_EXPANSIONS = {"similar"}
+
+# Page size of /api/games/all when a cursor is given without a limit
+DEFAULT_TABLE_PAGE_SIZE = 200
+
+# Threads running sync routes (each holds a SQLite connection while it works);
+# unset keeps AnyIO's default of 40
+THREADPOOL_SIZE = os.getenv("PAXPAL_THREADPOOL_SIZE")
 
 
 # ===============
 # FastAPI APP
 # ===============
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the warm-up (see `warmup`) in the background: the in-memory indexes,
+    pooled connections, the OpenAI connection and canned queries. `/ready`
+    reports when it's done, and stays unready if the database can't be served.
+    With a database directory, also starts watching it for new databases to
+    hot-reload (see `catalog_reload`). Event databases (see `events`) are only
+    opened by their first request.
+    """
+    if THREADPOOL_SIZE:
+        to_thread.current_default_thread_limiter().total_tokens = int(THREADPOOL_SIZE)
+    app.state.warmup_task = asyncio.create_task(WARMUP.run(app))
+    if RELOADER is not None:
+        app.state.reload_task = asyncio.create_task(RELOADER.run())
+    yield
+    app.state.warmup_task.cancel()
+    if RELOADER is not None:
+        app.state.reload_task.cancel()
+    close_catalogs()
+    close_events()
+
+
 app = FastAPI(
     title="Pax Pal API",
     description="API for searching and retrieving game information.",
     version="0.1.0",
+    lifespan=lifespan,
+    # orjson for plain dict responses; hot routes return pre-validated models
+    # through `model_response` instead (see `serialization`)
+    default_response_class=FastJSONResponse,
     # You can add more metadata here, like contact info or license
 )
 
+# --- HTTP caching ---
+# ETags from the database version (the event's, for an event's routes); added
+# before CORS so 304s get CORS headers too
+app.add_middleware(ConditionalGetMiddleware, version=data_version)
+
+# --- Catalog pinning ---
+# Outside the ETags, so a request's ETag and data come from the same database
+# even if a hot reload swaps another in meanwhile (see `db.CatalogMiddleware`)
+app.add_middleware(CatalogMiddleware)
+
 # --- CORS Configuration ---
 # Adjust origins as needed for development and production
 origins = [
@@ -51,8 +167,17 @@ app.add_middleware(
     allow_credentials=True,  # Allow cookies/auth headers
     allow_methods=["*"],  # Allow all methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor"],  # Let the frontend read pagination cursors
 )
 
+# --- Profiling ---
+# Only active when PAXPAL_PROFILE_TOKEN is set (see `profiling`)
+app.add_middleware(ProfilingMiddleware)
+
+# --- Metrics ---
+# Outermost, so latencies include every middleware and 304s are counted too
+app.add_middleware(MetricsMiddleware)
+
 # --- Database Setup ---
 DATABASE_URL = "./paxpal.db"
 
@@ -76,6 +201,37 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get(
+    "/ready",
+    tags=["Health"],
+    summary="Readiness check",
+    description="Returns 200 once the startup warm-up is done, and 503 until then or if a core stage (database schema, indexes, connections) failed, with the duration and any error of each warm-up stage. Cloud Run's startup probe uses it to hold traffic until the instance is warm.",
+)
+async def readiness_check() -> Response:
+    """Reports whether the startup warm-up is done and succeeded (see `warmup`)."""
+    return FastJSONResponse(
+        content=WARMUP.status(),
+        status_code=(
+            status.HTTP_200_OK
+            if WARMUP.serving
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@app.get(
+    "/metrics",
+    tags=["Health"],
+    summary="Prometheus metrics",
+    description="Request latency histograms, per-stage search timings, and cache, database-connection and OpenAI counters, in the Prometheus text format.",
+    response_class=Response,
+)
+async def get_metrics() -> Response:
+    """Renders the in-process metrics (see `metrics`)."""
+    return Response(content=render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get(
     "/",
     tags=["Root"],
@@ -87,12 +243,130 @@ def read_root():
     return {"message": "Welcome to the Pax Pal API!"}
 
 
+def search_filters(
+    platform: Optional[List[str]] = Query(
+        None, description="Only games on any of these platforms (repeatable)."
+    ),
+    tag: Optional[List[str]] = Query(
+        None, description="Only games with all of these genres/tags (repeatable)."
+    ),
+    exhibitor: Optional[List[str]] = Query(
+        None, description="Only games shown by any of these exhibitors (repeatable)."
+    ),
+    released: Optional[bool] = Query(
+        None, description="Only released (true) or unreleased (false) games."
+    ),
+    booth_min: Optional[float] = Query(None, description="Lowest booth number."),
+    booth_max: Optional[float] = Query(None, description="Highest booth number."),
+) -> SearchFilters:
+    """FastAPI dependency collecting the search routes' metadata filters."""
+    return SearchFilters(
+        platforms=platform or [],
+        genres_and_tags=tag or [],
+        exhibitors=exhibitor or [],
+        released=released,
+        booth_min=booth_min,
+        booth_max=booth_max,
+    )
+
+
+def run_search(
+    db: sqlite3.Connection,
+    q: str,
+    semantic_weight: float,
+    limit: int,
+    filters: SearchFilters,
+    query_embedding: Optional[List[float]] = None,
+) -> List[Tuple[SearchResult, float]]:
+    """
+    Runs a hybrid search on one database and loads the result cards.
+
+    Args:
+        db: The database to search.
+        q: The search query string.
+        semantic_weight: The influence of semantic search in the ranking.
+        limit: Maximum number of results to return.
+        filters: Metadata filters, applied inside both search stages.
+        query_embedding: The query's embedding, if already computed.
+
+    Returns:
+        (result, combined score) pairs, best first.
+    """
+    with span("filter"):
+        allowed_ids = get_filter_index(db).match(filters)
+    scored = hybrid_search_scored(
+        db=db,
+        query_text=q,
+        semantic_weight=semantic_weight,
+        limit=limit,
+        # k_semantic and k_fts will use their defaults from hybrid_search
+        vector_index=get_vector_index(db),
+        allowed_ids=allowed_ids,
+        query_embedding=query_embedding,
+    )
+
+    if not scored:
+        return []
+
+    # Prepare a query to fetch game details for the found IDs
+    # Ensuring the order of results from hybrid_search is maintained.
+    placeholders = ",".join(["?"] * len(scored))
+    sql_query = f"""
+        SELECT id, name, snappy_summary, header_image_url
+        FROM games
+        WHERE id IN ({placeholders})
+    """
+
+    with span("hydration"):
+        cursor = db.cursor()
+        cursor.execute(sql_query, [game_id for game_id, _ in scored])
+        rows = cursor.fetchall()  # Returns list of dicts due to row_factory
+
+        # To maintain the order from hybrid_search, we'll map results
+        # from the IN query (which doesn't guarantee order) back to game_ids order.
+        results_map = {row["id"]: SearchResult(**row) for row in rows}
+        return [
+            (results_map[game_id], score)
+            for game_id, score in scored
+            if game_id in results_map
+        ]
+
+
+@contextmanager
+def search_errors(q: str):
+    """Turns errors raised while searching for `q` into HTTP 500s."""
+    try:
+        yield
+    except HTTPException:
+        raise
+    except sqlite3.Error as e:
+        print(f"Database error during search for query '{q}': {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error during search.",
+        )
+    except RuntimeError as e:  # Catch errors from get_embedding_for_query
+        print(
+            f"Runtime error during search (e.g., embedding generation) for query '{q}': {e}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing search query: {e}",
+        )
+    except Exception as e:
+        print(f"Unexpected error during search for query '{q}': {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred during search.",
+        )
+
+
 @app.get(
     "/api/search",
     response_model=List[SearchResult],
     tags=["Search"],
     summary="Search for games",
-    description="Performs a hybrid search (semantic + full-text) for games based on a query string.",
+    description="Performs a hybrid search (semantic + full-text) for games based on a query string, optionally restricted by platform, genre/tag, exhibitor, release status and booth range.",
     responses={
         500: {"description": "Internal server error during search"},
     },
@@ -105,8 +379,9 @@ def search_games(
     limit: Optional[int] = Query(
         5, ge=1, le=50, description="Number of search results to return."
     ),
+    filters: SearchFilters = Depends(search_filters),
     db: sqlite3.Connection = Depends(get_db),
-) -> List[SearchResult]:
+) -> Response:
     """
     Searches for games using a hybrid approach (semantic and full-text search).
 
@@ -114,6 +389,9 @@ def search_games(
     - **semantic_weight**: The influence of semantic search in the ranking.
                            Lexical search weight is `1.0 - semantic_weight`.
     - **limit**: Maximum number of results to return.
+    - **platform**, **tag**, **exhibitor**, **released**, **booth_min**,
+      **booth_max**: Metadata filters, applied inside both the semantic and the
+      full-text stage.
     - **db**: Database connection dependency.
     """
     if (
@@ -123,61 +401,125 @@ def search_games(
     if limit is None:
         limit = 5
 
-    try:
-        game_ids = hybrid_search(
-            db=db,
-            query_text=q,
-            semantic_weight=semantic_weight,
-            limit=limit,
-            # k_semantic and k_fts will use their defaults from hybrid_search
-        )
+    with search_errors(q):
+        scored = run_search(db, q, semantic_weight, limit, filters)
+        results = [result for result, _ in scored]
+        return model_response(results, List[SearchResult])
 
-        if not game_ids:
-            return []
 
-        # Prepare a query to fetch game details for the found IDs
-        # Ensuring the order of results from hybrid_search is maintained.
-        placeholders = ",".join(["?"] * len(game_ids))
-        sql_query = f"""
-            SELECT id, name, snappy_summary, header_image_url
-            FROM games
-            WHERE id IN ({placeholders})
-        """
-        # print(f"Executing SQL: {sql_query} with IDs: {game_ids}")
+@app.get(
+    "/api/events",
+    response_model=dict,
+    tags=["Events"],
+    summary="List events",
+    description="Lists the events served from their own databases (see `events`).",
+)
+def list_events() -> dict:
+    """Returns the events' names, and which of them are open right now."""
+    return {"events": event_names(), "open": open_event_names()}
 
-        cursor = db.cursor()
-        cursor.execute(sql_query, game_ids)
-        rows = cursor.fetchall()  # Returns list of dicts due to row_factory
 
-        # To maintain the order from hybrid_search, we'll map results
-        # from the IN query (which doesn't guarantee order) back to game_ids order.
-        results_map = {row["id"]: SearchResult(**row) for row in rows}
-        ordered_results = [
-            results_map[game_id] for game_id in game_ids if game_id in results_map
-        ]
-
-        return ordered_results
+@app.get(
+    "/api/events/search",
+    response_model=List[EventSearchResult],
+    tags=["Events"],
+    summary="Search for games across events",
+    description="Runs the hybrid search on several events' databases concurrently and merges the ranked results.",
+    responses={
+        404: {"description": "Unknown event"},
+        500: {"description": "Internal server error during search"},
+    },
+)
+async def search_events(
+    q: str = Query(..., min_length=1, description="The search query string."),
+    semantic_weight: float = Query(
+        0.7, ge=0.0, le=1.0, description="Weight for semantic search (0.0 to 1.0)."
+    ),
+    limit: int = Query(
+        5, ge=1, le=50, description="Number of search results to return in all."
+    ),
+    event: Optional[List[str]] = Query(
+        None, description="Events to search (repeatable; default: all of them)."
+    ),
+    filters: SearchFilters = Depends(search_filters),
+) -> Response:
+    """
+    Searches several events at once. The query is embedded once, the events are
+    searched for `limit` results each in worker threads (`FAN_OUT_THREADS` at a
+    time), and the per-event rankings are merged by combined score (see
+    `events.merge_ranked`).
 
-    except sqlite3.Error as e:
-        print(f"Database error during search for query '{q}': {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Database error during search.",
-        )
-    except RuntimeError as e:  # Catch errors from get_embedding_for_query
-        print(
-            f"Runtime error during search (e.g., embedding generation) for query '{q}': {e}"
-        )
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing search query: {e}",
-        )
-    except Exception as e:
-        print(f"Unexpected error during search for query '{q}': {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An unexpected error occurred during search.",
+    An event whose search fails is left out of the results; the request only
+    fails if every event's search does.
+    """
+    names = list(dict.fromkeys(event)) if event else event_names()
+    # Resolved up front, so an unknown event is a 404 rather than left out
+    catalogs = [(name, event_catalog(name)) for name in names]
+    if not catalogs:
+        return model_response([], List[EventSearchResult])
+
+    def search_event(
+        name: str, catalog: Catalog
+    ) -> List[Tuple[str, SearchResult, float]]:
+        with catalog.pool.connection() as db:
+            scored = run_search(db, q, semantic_weight, limit, filters, embedding)
+        return [(name, result, score) for result, score in scored]
+
+    with search_errors(q):
+        with span("embedding"):
+            embedding = await to_thread.run_sync(get_embedding_for_query, q)
+        outcomes = await asyncio.gather(
+            *(
+                to_thread.run_sync(search_event, name, c, limiter=FAN_OUT_LIMITER)
+                for name, c in catalogs
+            ),
+            return_exceptions=True,
         )
+        rankings = []
+        for (name, _), outcome in zip(catalogs, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Search of event '{name}' failed for query '{q}': {outcome}")
+                continue
+            rankings.append(outcome)
+        if not rankings:
+            raise outcomes[0]
+
+        with span("merge"):
+            results = [
+                EventSearchResult(event=name, **result.model_dump())
+                for name, result in merge_ranked(rankings, limit)
+            ]
+        return model_response(results, List[EventSearchResult])
+
+
+@app.get(
+    "/api/{event}/search",
+    response_model=List[SearchResult],
+    tags=["Events"],
+    summary="Search for games at one event",
+    description="Performs the hybrid search of `/api/search` on one event's database.",
+    responses={
+        404: {"description": "Unknown event"},
+        500: {"description": "Internal server error during search"},
+    },
+)
+def search_event_games(
+    event: str,
+    q: str = Query(..., min_length=1, description="The search query string."),
+    semantic_weight: float = Query(
+        0.7, ge=0.0, le=1.0, description="Weight for semantic search (0.0 to 1.0)."
+    ),
+    limit: int = Query(
+        5, ge=1, le=50, description="Number of search results to return."
+    ),
+    filters: SearchFilters = Depends(search_filters),
+    db: sqlite3.Connection = Depends(get_event_db),
+) -> Response:
+    """Searches one event's games; takes the parameters of `/api/search`."""
+    with search_errors(q):
+        scored = run_search(db, q, semantic_weight, limit, filters)
+        results = [result for result, _ in scored]
+        return model_response(results, List[SearchResult])
 
 
 @app.get(
@@ -232,65 +574,68 @@ def get_total_games_count(db: sqlite3.Connection = Depends(get_db)) -> dict:
     response_model=List[GameTableRow],
     tags=["Games"],
     summary="Get all games for table view",
-    description="Retrieves a summarized list of all games, suitable for a table display.",
+    description=(
+        "Retrieves a summarized list of all games, suitable for a table display. "
+        "Pass `limit` to page through the games by name; the next page's cursor "
+        "is returned in the `X-Next-Cursor` header (absent on the last page)."
+    ),
     responses={
+        400: {"description": "Invalid cursor or unknown field"},
         500: {"description": "Internal server error retrieving games"},
     },
 )
 def get_all_games_for_table(
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=1000,
+        description="Page size. If omitted (and no cursor is given), every game is returned.",
+    ),
+    cursor: Optional[str] = Query(
+        None, description="The `X-Next-Cursor` header of the previous page."
+    ),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated GameTableRow fields to return (`id` is always included).",
+    ),
     db: sqlite3.Connection = Depends(get_db),
-) -> List[GameTableRow]:
+) -> Response:
     """
     Retrieves specific fields for all games to be displayed in a table.
 
     Returns a list of games with their ID, name, snappy summary, platforms,
-    and genres/tags, sorted alphabetically by name.
+    and genres/tags, sorted alphabetically by name. The rows are parsed and
+    validated once, when the facet index is built, and the full list is encoded
+    to JSON once after that; every unpaged request is served the same bytes.
+
+    Pages are keyset-paginated on (lowercased name, id): the cursor is the last
+    row's sort key, so a page is a binary search plus a slice, and paging stays
+    stable (no skipped or repeated games) even if the catalog changes between
+    requests.
     """
-    cursor = db.cursor()
+    include = parse_fields(fields, GameTableRow)
     try:
-        cursor.execute(
-            """
-            SELECT id, name, snappy_summary, platforms, genres_and_tags, links, exhibitor, booth_number
-            FROM games
-            """
-        )
-        rows = cursor.fetchall()  # Returns list of dicts due to row_factory
-
-        games_for_table = []
-        for row in rows:
-            try:
-                platforms = json.loads(row.get("platforms", "[]") or "[]")
-                genres_and_tags = json.loads(row.get("genres_and_tags", "[]") or "[]")
-
-                game_data = {
-                    "id": row["id"],
-                    "name": row["name"],
-                    "snappy_summary": row.get("snappy_summary"),
-                    "platforms": platforms if isinstance(platforms, list) else [],
-                    "genres_and_tags": (
-                        genres_and_tags if isinstance(genres_and_tags, list) else []
-                    ),
-                    "exhibitor": row.get("exhibitor"),
-                    "booth_number": row.get("booth_number"),
-                }
-                games_for_table.append(GameTableRow(**game_data))
-            except json.JSONDecodeError as e:
-                print(
-                    f"JSON decode error for game ID {row.get('id', 'N/A')} while preparing table data: {e} - Data: {row}"
-                )
-                # Skip this game or handle error as appropriate, here we skip
-                continue
-            except Exception as e:  # Catch Pydantic validation errors or others
-                print(
-                    f"Error processing game ID {row.get('id', 'N/A')} for table: {e} - Data: {row}"
-                )
-                continue
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        # Sort alphabetically by game name (case-insensitive)
-        games_for_table.sort(key=lambda g: (g.name or "").lower())
-
-        return games_for_table
+    try:
+        index = get_filter_index(db)
+        if limit is None and cursor is None:
+            if include is None:
+                return json_bytes_response(index.table_json)
+            return model_response(
+                index.rows, List[GameTableRow], include={"__all__": include}
+            )
 
+        page, next_key = index.page_after(after, limit or DEFAULT_TABLE_PAGE_SIZE)
+        headers = {"X-Next-Cursor": encode_cursor(next_key)} if next_key else None
+        return model_response(
+            page,
+            List[GameTableRow],
+            headers=headers,
+            include={"__all__": include} if include else None,
+        )
     except sqlite3.Error as e:
         print(f"Database error while fetching all games for table: {e}")
         raise HTTPException(
@@ -305,6 +650,420 @@ def get_all_games_for_table(
         )
 
 
+@app.get(
+    "/api/games/browse",
+    response_model=BrowseResponse,
+    tags=["Games"],
+    summary="Browse games by facets",
+    description="Returns one page of games matching the selected platforms, genres/tags, exhibitors, release status and booth range, along with facet counts for the whole selection.",
+    responses={
+        500: {"description": "Internal server error while browsing games"},
+    },
+)
+def browse_games(
+    platform: Optional[List[str]] = Query(
+        None, description="Only games on any of these platforms (repeatable)."
+    ),
+    tag: Optional[List[str]] = Query(
+        None, description="Only games with all of these genres/tags (repeatable)."
+    ),
+    exhibitor: Optional[List[str]] = Query(
+        None, description="Only games shown by any of these exhibitors (repeatable)."
+    ),
+    released: Optional[bool] = Query(
+        None, description="Only released (true) or unreleased (false) games."
+    ),
+    booth_min: Optional[float] = Query(None, description="Lowest booth number."),
+    booth_max: Optional[float] = Query(None, description="Highest booth number."),
+    offset: int = Query(0, ge=0, description="Number of matching games to skip."),
+    limit: int = Query(50, ge=1, le=500, description="Page size."),
+    db: sqlite3.Connection = Depends(get_db),
+) -> Response:
+    """
+    Intersects the facet bitmaps built at startup; no JSON is parsed and no SQL
+    is run per request once the index exists.
+
+    - Games are sorted by name.
+    - `facets` maps each facet ("platform", "tag", "exhibitor", "released") to the
+      number of games in the selection having each value, most common first.
+    """
+    filters = SearchFilters(
+        platforms=platform or [],
+        genres_and_tags=tag or [],
+        exhibitors=exhibitor or [],
+        released=released,
+        booth_min=booth_min,
+        booth_max=booth_max,
+    )
+    try:
+        total, games, facets = get_filter_index(db).browse(
+            filters, offset=offset, limit=limit
+        )
+        return model_response(
+            BrowseResponse(
+                total=total, offset=offset, limit=limit, games=games, facets=facets
+            ),
+            BrowseResponse,
+        )
+    except Exception as e:
+        print(f"Unexpected error while browsing games: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while browsing games.",
+        )
+
+
+@app.get(
+    "/api/games/export",
+    tags=["Games"],
+    summary="Export every game as NDJSON",
+    description=(
+        "Streams every game as a full Game record, one JSON object per line, in id "
+        "order. Gzipped on the fly when the client accepts gzip. Pass the "
+        "`X-Catalog-Updated-At` of a previous export as `updated_since` to get only "
+        "the games updated since, and the last id received as `after` to resume an "
+        "interrupted export."
+    ),
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+def export_games(
+    updated_since: Optional[datetime] = Query(
+        None,
+        description="Only export games updated after this time (ISO 8601; UTC "
+        "unless it has an offset).",
+    ),
+    after: Optional[str] = Query(
+        None, description="Only export games whose id sorts after this one."
+    ),
+    accept_encoding: Optional[str] = Header(None),
+    db: sqlite3.Connection = Depends(get_db),
+) -> StreamingResponse:
+    """
+    Streams the full catalog without loading it into memory (see `export`).
+
+    - **updated_since**: The `X-Catalog-Updated-At` of the client's last export.
+    - **after**: Resume point, the last game id already received.
+    - **accept_encoding**: The stream is gzipped when this accepts `gzip`.
+    """
+    gzip = accepts(accept_encoding, "gzip")
+    headers = {
+        "Content-Disposition": 'attachment; filename="games.ndjson"',
+        "Vary": "Accept-Encoding",
+    }
+    # Read before the export, so it never claims updates the export doesn't have
+    latest = latest_update(db)
+    if latest is not None:
+        headers["X-Catalog-Updated-At"] = latest
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_export(
+            catalog_of(db),
+            after=after,
+            updated_since=format_timestamp(updated_since) if updated_since else None,
+            gzip=gzip,
+        ),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers=headers,
+    )
+
+
+@app.get(
+    "/api/catalog/snapshot",
+    tags=["Catalog"],
+    summary="Get the binary catalog snapshot",
+    description=(
+        "Returns the whole catalog (game cards, platforms and tags, booth numbers, "
+        "the similar-games graph and the booth boxes) as a columnar MessagePack "
+        "document with interned strings. The ETag is the snapshot version."
+    ),
+    response_class=Response,
+    responses={
+        200: {"content": {SNAPSHOT_MEDIA_TYPE: {}}},
+        304: {"description": "The client's version is current"},
+    },
+)
+def get_snapshot(
+    if_none_match: Optional[str] = Header(None),
+    db: sqlite3.Connection = Depends(get_db),
+) -> Response:
+    """
+    Serves the snapshot built at startup; see `catalog_snapshot` for the layout.
+
+    - **if_none_match**: The ETag of the snapshot the client already has.
+    """
+    snapshot = get_catalog_snapshot(db)
+    headers = {
+        "ETag": f'"{snapshot.version}"',
+        "X-Catalog-Version": snapshot.version,
+        "Cache-Control": "no-cache",
+    }
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=snapshot.data, media_type=SNAPSHOT_MEDIA_TYPE, headers=headers
+    )
+
+
+@app.get(
+    "/api/catalog/delta",
+    tags=["Catalog"],
+    summary="Get the changes since a catalog snapshot version",
+    description=(
+        "Returns the games upserted and deleted (and the booth boxes, if they "
+        "changed) between snapshot version `since` and the current one, in the "
+        "snapshot's encoding. 404 if `since` is too old; fetch the full snapshot."
+    ),
+    response_class=Response,
+    responses={
+        200: {"content": {SNAPSHOT_MEDIA_TYPE: {}}},
+        404: {"description": "Unknown or expired snapshot version"},
+    },
+)
+def get_snapshot_delta(
+    since: str = Query(
+        ...,
+        pattern=SNAPSHOT_VERSION.pattern,
+        description="The snapshot version the client has.",
+    ),
+    db: sqlite3.Connection = Depends(get_db),
+) -> Response:
+    """
+    Serves the delta from an earlier snapshot version to the current one.
+
+    - **since**: The client's snapshot version (its `X-Catalog-Version`).
+    """
+    snapshot = get_catalog_snapshot(db)
+    delta = snapshot.delta_from(since, db)
+    if delta is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown catalog version '{since}'",
+        )
+    return Response(
+        content=delta,
+        media_type=SNAPSHOT_MEDIA_TYPE,
+        headers={
+            "X-Catalog-Version": snapshot.version,
+            "ETag": f'"{since}-{snapshot.version}"',
+            "Cache-Control": "no-cache",
+        },
+    )
+
+
+@app.get(
+    "/api/booths/{booth_number}/nearby",
+    response_model=NearbyBoothsResponse,
+    tags=["Booths"],
+    summary="Get the booths (and their games) near a booth",
+    description="Returns every booth within a radius of the given booth on the show-floor map, closest first, along with the games at each booth.",
+    responses={
+        404: {"description": "Booth not found on the map"},
+    },
+)
+def get_nearby_booths(
+    booth_number: str,
+    radius: float = Query(
+        150.0, gt=0, le=2_000, description="Search radius in floor-map pixels."
+    ),
+    db: sqlite3.Connection = Depends(get_db),
+) -> NearbyBoothsResponse:
+    """
+    Looks the booth up in the in-memory spatial grid built from booths.json.
+    Concatenated map labels (e.g. "2410824106") are split into their individual
+    booth numbers, so each of those booths can be looked up on its own.
+    """
+    booth_index = get_booth_index(db)
+    if booth_number not in booth_index:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Booth '{booth_number}' not found on the map",
+        )
+
+    booths = [
+        NearbyBooth(
+            booth_number=other,
+            box=list(booth_index.boxes[other]),
+            distance=round(distance, 1),
+            games=booth_index.games_by_booth.get(other, []),
+        )
+        for other, distance in booth_index.nearby(booth_number, radius)
+    ]
+    return NearbyBoothsResponse(
+        booth_number=booth_number, radius=radius, booths=booths
+    )
+
+
+@app.get(
+    "/api/booths/{booth_number}/map",
+    tags=["Booths"],
+    summary="Get a small map image highlighting a booth",
+    description="Returns a square crop of the show-floor map centered on the booth, with the booth highlighted. The format is negotiated from the Accept header (AVIF, WebP, or JPEG).",
+    response_class=Response,
+    responses={
+        200: {"content": {fmt[0]: {} for fmt in IMAGE_FORMATS.values()}},
+        404: {"description": "Booth not found on the map"},
+        503: {"description": "The map image isn't available"},
+    },
+)
+def get_booth_map(
+    booth_number: str,
+    width: int = Query(
+        480, ge=1, le=2_000, description="Image width in pixels (snapped to a rendered size)."
+    ),
+    format: Optional[str] = Query(
+        None, description="Force an image format: avif, webp or jpeg."
+    ),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: sqlite3.Connection = Depends(get_db),
+) -> Response:
+    """
+    Renders the crop on first request and serves it from an in-memory LRU cache
+    (keyed by booth, width and format) after that.
+
+    The URL isn't versioned, so the crop is only cached briefly; its ETag carries
+    the map version, and revalidating with it gets a 304 without rendering.
+    """
+    booth_index = get_booth_index(db)
+    if booth_number not in booth_index:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Booth '{booth_number}' not found on the map",
+        )
+    renderer = get_booth_map_renderer(db)
+    if renderer is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The map image isn't available",
+        )
+
+    fmt = negotiate_format(accept, format)
+    width = snap_crop_width(width)
+    headers = {
+        "Cache-Control": CACHE_CONTROL,
+        "ETag": f'"{renderer.version}-{booth_number}-{width}-{fmt}"',
+        "Vary": "Accept",
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=renderer.render(booth_number, width, fmt),
+        media_type=IMAGE_FORMATS[fmt][0],
+        headers=headers,
+    )
+
+
+@app.post(
+    "/api/route",
+    response_model=RouteResponse,
+    tags=["Booths"],
+    summary="Plan a walking route across the booths of a list of games",
+    description="Orders the booths of the given games into a short walking route over the show-floor map. Games at the same booth share a stop.",
+    responses={
+        404: {"description": "Start booth not found on the map"},
+    },
+)
+def plan_route(
+    request: RouteRequest, db: sqlite3.Connection = Depends(get_db)
+) -> RouteResponse:
+    """
+    Joins games to booths through the in-memory booth index, then orders the
+    booths with nearest-neighbor seeding and 2-opt over a precomputed distance
+    matrix (see `route_planner`).
+    """
+    booth_index = get_booth_index(db)
+    if request.start_booth is not None and request.start_booth not in booth_index:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Booth '{request.start_booth}' not found on the map",
+        )
+
+    # Group the requested games by booth, keeping the request order within one
+    games_at_booth: dict = {}
+    unplaced: List[str] = []
+    for game_id in dict.fromkeys(request.game_ids):
+        booth = booth_index.booth_of_game.get(game_id)
+        if booth is None or booth not in booth_index:
+            unplaced.append(game_id)
+            continue
+        games_at_booth.setdefault(booth, []).append(game_id)
+
+    order, legs = get_route_planner(db).plan(
+        list(games_at_booth), start=request.start_booth
+    )
+
+    stops = []
+    for booth, leg in zip(order, legs):
+        cards = {game.id: game for game in booth_index.games_by_booth.get(booth, [])}
+        stops.append(
+            RouteStop(
+                booth_number=booth,
+                center=list(booth_index.centers[booth]),
+                distance_from_previous=round(leg, 1),
+                games=[cards[game_id] for game_id in games_at_booth.get(booth, [])],
+            )
+        )
+    return RouteResponse(
+        stops=stops,
+        total_distance=round(sum(legs), 1),
+        unplaced_game_ids=unplaced,
+    )
+
+
+@app.get(
+    "/api/map/tiles",
+    tags=["Map"],
+    summary="Describe the map tile pyramid",
+    description="Returns the current tile pyramid's version, map size, tile size, zoom levels and formats. Tiles live at /api/map/tiles/{version}/{z}/{x}/{y}.{format}.",
+    responses={
+        404: {"description": "The tile pyramid hasn't been built"},
+    },
+)
+def get_map_tiles_manifest() -> JSONResponse:
+    """
+    Describes the tile pyramid written by `build_map_tiles.py`, so the frontend
+    knows which version's tile URLs to request.
+
+    Raises HTTPException 404 if the pyramid hasn't been built.
+    """
+    manifest = load_tile_manifest()
+    if manifest is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The map tile pyramid hasn't been built",
+        )
+    # The manifest points at the current version, so it's only cached briefly
+    return JSONResponse(manifest, headers={"Cache-Control": "public, max-age=300"})
+
+
+@app.get(
+    "/api/map/tiles/{version}/{zoom}/{x}/{y}.{format}",
+    tags=["Map"],
+    summary="Get one map tile",
+    response_class=FileResponse,
+    responses={
+        404: {"description": "Tile not found"},
+    },
+)
+def get_map_tile(version: str, zoom: int, x: int, y: int, format: str) -> FileResponse:
+    """
+    Tiles are addressed by pyramid version, so they never change and can be
+    cached forever.
+    """
+    if format not in IMAGE_FORMATS or not version.isalnum():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile not found")
+    path = tile_path(version, zoom, x, y, format)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile not found")
+    return FileResponse(
+        path,
+        media_type=IMAGE_FORMATS[format][0],
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL},
+    )
+
+
 @app.post(
     "/api/games/by-ids",
     response_model=List[SearchResult],
@@ -313,32 +1072,43 @@ def get_all_games_for_table(
     description="Retrieves a list of games as SearchResult objects based on a list of provided game IDs.",
     responses={
         200: {"description": "Successfully retrieved game data"},
+        400: {"description": "Unknown field"},
         500: {"description": "Internal server error"},
     },
 )
 def get_games_by_ids(
-    game_ids_payload: GameIdList, db: sqlite3.Connection = Depends(get_db)
-) -> List[SearchResult]:
+    game_ids_payload: GameIdList,
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated SearchResult fields to return (`id` is always included).",
+    ),
+    db: sqlite3.Connection = Depends(get_db),
+) -> Response:
     """
     Retrieves game details suitable for SearchResult display for a list of game IDs.
 
     - **game_ids_payload**: A Pydantic model containing a list of game IDs.
+    - **fields**: Optional projection of the returned fields.
     - **db**: Database connection dependency.
+
+    The IDs are bound as a single JSON array and expanded with `json_each`, so
+    any number of IDs fits in one query without hitting SQLite's bound-variable
+    limit.
     """
+    include = parse_fields(fields, SearchResult)
     if not game_ids_payload.ids:
         return []
 
     try:
-        placeholders = ",".join(["?"] * len(game_ids_payload.ids))
-        sql_query = f"""
+        cursor = db.cursor()
+        cursor.execute(
+            """
             SELECT id, name, snappy_summary, header_image_url
             FROM games
-            WHERE id IN ({placeholders})
-        """
-        cursor = db.cursor()
-        # Ensure the order of results matches the input IDs if possible,
-        # or handle reordering if necessary. Here, mapping is used.
-        cursor.execute(sql_query, game_ids_payload.ids)
+            WHERE id IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(game_ids_payload.ids),),
+        )
         rows = cursor.fetchall()  # List of dicts
 
         # Create a map for quick lookup and to help maintain order if desired,
@@ -354,7 +1124,11 @@ def get_games_by_ids(
             if game_id in results_map
         ]
 
-        return ordered_results
+        return model_response(
+            ordered_results,
+            List[SearchResult],
+            include={"__all__": include} if include else None,
+        )
 
     except sqlite3.Error as e:
         print(
@@ -404,49 +1178,12 @@ async def get_recommendations_from_played(
     if not played_games_payload.ids:
         return GameIdList(ids=[])
 
-    input_game_ids_set = set(played_games_payload.ids)
-    all_similar_games_counter = Counter()
-
     try:
-        placeholders = ",".join(["?"] * len(played_games_payload.ids))
-        query = f"SELECT id, similar_games FROM games WHERE id IN ({placeholders})"
-
-        cursor = db.cursor()
-        cursor.execute(query, played_games_payload.ids)
-        rows = cursor.fetchall()  # List of dicts due to row_factory
-
-        for row in rows:
-            game_id = row.get("id")  # For logging/debugging if needed
-            similar_games_json = row.get("similar_games")
-            if similar_games_json:
-                try:
-                    similar_ids_for_this_game = json.loads(similar_games_json)
-                    if isinstance(similar_ids_for_this_game, list) and all(
-                        isinstance(gid, str) for gid in similar_ids_for_this_game
-                    ):
-                        all_similar_games_counter.update(similar_ids_for_this_game)
-                    elif (
-                        similar_ids_for_this_game
-                    ):  # If not empty and not list of strings
-                        print(
-                            f"Warning: similar_games for game '{game_id}' was not a list of strings: {similar_games_json}"
-                        )
-                except json.JSONDecodeError:
-                    print(
-                        f"Warning: Could not parse similar_games JSON for game '{game_id}': {similar_games_json}"
-                    )
-                    continue
-
-        # Get game IDs sorted by frequency, most common first
-        sorted_similar_games_with_counts = all_similar_games_counter.most_common()
-
-        recommended_ids_ordered = []
-        for game_id, _ in sorted_similar_games_with_counts:
-            if exclude_played_games and game_id in input_game_ids_set:
-                continue
-            recommended_ids_ordered.append(game_id)
-
-        return GameIdList(ids=recommended_ids_ordered)
+        # Counted over the in-memory similar-games graph (see `similar_games`)
+        graph = get_similar_graph(db)
+        return GameIdList(
+            ids=graph.recommend(played_games_payload.ids, exclude_played_games)
+        )
 
     except sqlite3.Error as e:
         print(f"Database error while fetching recommendations: {e}")
@@ -476,31 +1213,105 @@ async def get_recommendations_from_played(
         500: {"description": "Internal server error processing game data"},
     },
 )
-def get_game_details(game_id: str, db: sqlite3.Connection = Depends(get_db)) -> Game:
+def get_game_details(
+    game_id: str,
+    expand: Optional[str] = Query(
+        None,
+        description="Comma-separated related data to embed. Supported: 'similar' (the similar games' cards, as `similar_game_cards`).",
+    ),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated Game fields to return (`id` is always included).",
+    ),
+    db: sqlite3.Connection = Depends(get_db),
+) -> Response:
     """
     Retrieves detailed information for a specific game using its ID.
 
     - **game_id**: The unique identifier (string) of the game to retrieve.
+    - **expand**: Optional related data to embed in the response.
+    - **fields**: Optional projection of the returned fields.
     - **db**: Database connection dependency injected by FastAPI.
 
-    Raises HTTPException 404 if the game is not found, or 500 if there's an error
-    processing the data retrieved from the database (e.g., JSON parsing error,
-    Pydantic validation error).
+    Raises HTTPException 404 if the game is not found, or 500 if there's a
+    database error or the data doesn't validate.
+
+    List fields come from the normalized child tables (see `normalize_db.py`),
+    one indexed lookup each, so no JSON is parsed per request. Child tables of
+    fields left out by `fields` aren't queried at all.
     """
+    expansions = {item.strip() for item in (expand or "").split(",") if item.strip()}
+    unknown = expansions - GAME_EXPANSIONS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported expand value(s): {', '.join(sorted(unknown))}",
+        )
+    include = parse_fields(fields, Game)
+    if include is not None and "similar" in expansions:
+        include.add("similar_game_cards")
+
+    def wanted(field: str) -> bool:
+        return include is None or field in include
+
     cursor = db.cursor()
     try:
         cursor.execute(
             """
             SELECT
-                id, name, snappy_summary, description_texts, platforms,
-                developer, exhibitor, booth_number, header_image_url, steam_link,
-                genres_and_tags, media, released, release_time, links, similar_games
+                id, name, snappy_summary, description, developer, exhibitor,
+                booth_number, header_image_url, steam_link, released, release_time
             FROM games
             WHERE id = ?
             """,
             (game_id,),
         )
         row = cursor.fetchone()  # Fetchone returns a dict due to row_factory
+        if row is not None:
+
+            def _children(field: str, sql: str) -> List[dict]:
+                if not wanted(field):
+                    return []
+                return cursor.execute(sql, (game_id,)).fetchall()
+
+            platforms = _children(
+                "platforms",
+                "SELECT platform FROM game_platforms WHERE game_id = ? ORDER BY position",
+            )
+            genres_and_tags = _children(
+                "genres_and_tags",
+                "SELECT tag FROM game_tags WHERE game_id = ? ORDER BY position",
+            )
+            media = _children(
+                "media",
+                "SELECT type, source, url FROM game_media "
+                "WHERE game_id = ? ORDER BY position",
+            )
+            links = _children(
+                "links",
+                "SELECT title, url FROM game_links WHERE game_id = ? ORDER BY position",
+            )
+            if "similar" in expansions:
+                # The similar games' cards come along in the same rank-ordered
+                # query. A LEFT JOIN, so `similar_games` is the same list as
+                # without the expansion even if an id had no game to join.
+                similar = _children(
+                    "similar_game_cards",
+                    """
+                    SELECT s.similar_game_id AS id, g.id IS NOT NULL AS found,
+                           g.name, g.snappy_summary, g.header_image_url
+                    FROM game_similar s
+                    LEFT JOIN games g ON g.id = s.similar_game_id
+                    WHERE s.game_id = ?
+                    ORDER BY s.rank
+                    """,
+                )
+            else:
+                similar = _children(
+                    "similar_games",
+                    "SELECT similar_game_id AS id FROM game_similar "
+                    "WHERE game_id = ? ORDER BY rank",
+                )
     except sqlite3.Error as e:
         # Handle potential database errors during query execution
         print(f"Database query error for game {game_id}: {e}")
@@ -515,113 +1326,49 @@ def get_game_details(game_id: str, db: sqlite3.Connection = Depends(get_db)) ->
             detail=f"Game with id '{game_id}' not found",
         )
 
-    # Deserialize JSON fields and construct the Game object
     try:
-        # Handle description_texts -> description mapping
-        # Parse description_texts which contains objects with source and text fields
-        description_texts_json = row.get("description_texts", "[]")
-        description_texts = json.loads(description_texts_json or "[]")
-
-        # Select description based on priority: ai_search_summary > pax_website > pax_app
-        description = ""
-        if isinstance(description_texts, list):
-            # First try to find ai_search_summary
-            for item in description_texts:
-                if (
-                    isinstance(item, dict)
-                    and item.get("source") == "ai_search_summary"
-                    and item.get("text")
-                ):
-                    description = item["text"]
-                    break
-
-            # If not found, try pax_website
-            if not description:
-                for item in description_texts:
-                    if (
-                        isinstance(item, dict)
-                        and item.get("source") == "pax_website"
-                        and item.get("text")
-                    ):
-                        description = item["text"]
-                        break
-
-            # If still not found, try pax_app
-            if not description:
-                for item in description_texts:
-                    if (
-                        isinstance(item, dict)
-                        and item.get("source") == "pax_app"
-                        and item.get("text")
-                    ):
-                        description = item["text"]
-                        break
-        else:
-            # Fallback if not a list
-            description = str(description_texts or "")
-
-        # Helper to load JSON or return empty list/default
-        def _load_json(field_name: str, default_value="[]") -> list:
-            json_str = row.get(field_name, default_value)
-            return json.loads(json_str or default_value)
-
-        platforms = _load_json("platforms")
-        genres_and_tags = _load_json("genres_and_tags")
-        media_list = _load_json("media")
-        links_list = _load_json("links")
-
-        # Validate nested structures using Pydantic models
-        media = [MediaItem(**item) for item in media_list]
-        links = [Link(**item) for item in links_list]
-
-        # Load and parse similar_games (list of IDs)
-        similar_games_ids_json = row.get("similar_games", "[]")
-        similar_games_ids = json.loads(similar_games_ids_json or "[]")
-        if not isinstance(similar_games_ids, list) or not all(
-            isinstance(i, str) for i in similar_games_ids
-        ):
-            print(
-                f"Warning: similar_games for game {game_id} is not a list of strings. Found: {similar_games_ids}. Defaulting to empty list."
-            )
-            similar_games_ids = []
-
-        # Prepare data for the Game model
-        game_data = {
-            "id": row["id"],
-            "name": row["name"],
-            "snappy_summary": row.get("snappy_summary"),
-            "description": description,  # Use the processed description
-            "platforms": platforms if platforms else [],
-            "developer": row.get("developer"),
-            "exhibitor": row.get("exhibitor"),
-            "booth_number": row.get("booth_number"),
-            "header_image_url": row.get("header_image_url"),
-            "steam_link": row.get("steam_link"),
-            "genres_and_tags": genres_and_tags,
-            "media": media,
-            "released": bool(
-                row.get("released", 0.0)
-            ),  # Safely convert DB REAL/INT to bool
-            "release_time": row.get("release_time"),
-            "links": links,
-            "similar_games": similar_games_ids,  # Add the list of similar game IDs
-        }
-
-        # Validate the final structure with the Game model
-        game_obj = Game(**game_data)
-        return game_obj
-
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error for game {game_id}: {e} - Data: {row}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing JSON data for game {game_id}.",
+        game_obj = Game(
+            id=row["id"],
+            name=row["name"],
+            snappy_summary=row["snappy_summary"],
+            description=row["description"] or "",
+            platforms=[item["platform"] for item in platforms],
+            developer=row["developer"],
+            exhibitor=row["exhibitor"],
+            booth_number=row["booth_number"],
+            header_image_url=row["header_image_url"],
+            steam_link=row["steam_link"],
+            genres_and_tags=[item["tag"] for item in genres_and_tags],
+            media=[MediaItem(**item) for item in media],
+            released=bool(row["released"] or 0),  # DB REAL/INT to bool
+            release_time=row["release_time"],
+            links=[Link(**item) for item in links],
+            similar_games=[item["id"] for item in similar],
+            # In `similar_games` order, skipping ids with no game (none once the
+            # database is normalized, which drops them from game_similar)
+            similar_game_cards=(
+                [
+                    SearchResult(
+                        id=item["id"],
+                        name=item["name"],
+                        snappy_summary=item["snappy_summary"],
+                        header_image_url=item["header_image_url"],
+                    )
+                    for item in similar
+                    if item["found"]
+                ]
+                if "similar" in expansions
+                else None
+            ),
         )
-    except Exception as e:  # Catch other errors like Pydantic validation
+        # Without the expansion the field is left out, not null
+        exclude = None if "similar" in expansions else {"similar_game_cards"}
+        return model_response(game_obj, Game, include=include, exclude=exclude)
+    except Exception as e:  # Pydantic validation errors
         print(
             f"Error processing or validating data for game {game_id}: {e} - Data: {row}"
         )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal error processing data for game {game_id}.",
-        )
+        )
\ No newline at end of file
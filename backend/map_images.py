@@ -0,0 +1,346 @@
+"""
+Server-side images of the show-floor map (`pax-map.jpg`).
+
+The full map is ~1.3 MB, which is a lot to pull over convention-floor cellular
+just to point at one booth. This module produces two lighter alternatives:
+
+- a zoomable tile pyramid (256px tiles, AVIF / WebP with a JPEG fallback) cut at
+  build time by `build_map_tiles.py` into `map_tiles/<version>/`, where the
+  version is a hash of the map and booth data, so tile URLs can be cached forever;
+- small viewport crops centered on a booth with the highlight already drawn,
+  rendered on demand and kept in an LRU cache keyed by booth, width and format.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import hashlib
+import io
+import json
+import math
+import os
+import sqlite3
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Third-party imports
+from PIL import Image, ImageDraw, features
+
+# Local imports
+from booth_index import BoothIndex, get_booth_index, resolve_booths_path
+from db import catalog_of, current_catalog
+from http_cache import parse_qualities
+from metrics import register_lru_cache
+
+# ==========
+# CONSTANTS
+# ==========
+# pax-map.jpg is copied next to the backend at build time; during local
+# development we fall back to the frontend's copy.
+_BACKEND_DIR = os.path.dirname(__file__)
+MAP_PATH = os.environ.get("PAXPAL_MAP_PATH", os.path.join(_BACKEND_DIR, "pax-map.jpg"))
+_FRONTEND_MAP_PATH = os.path.join(_BACKEND_DIR, "..", "frontend", "public", "pax-map.jpg")
+TILES_DIR = os.path.join(_BACKEND_DIR, "map_tiles")
+
+TILE_SIZE = 256
+
+# Image formats, best first, with their MIME types and encoder settings
+IMAGE_FORMATS: Dict[str, Tuple[str, str, Dict]] = {
+    "avif": ("image/avif", "AVIF", {"quality": 55}),
+    "webp": ("image/webp", "WEBP", {"quality": 75, "method": 4}),
+    "jpeg": ("image/jpeg", "JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+}
+
+# Crop widths (in output pixels) the booth endpoint renders; requests are snapped
+# up to one of these so the LRU cache stays small.
+CROP_WIDTHS = (320, 480, 640, 960)
+
+# Side of the square map area (in map pixels) shown around a booth
+CROP_SPAN = 700
+
+# Number of rendered crops kept in memory
+CROP_CACHE_SIZE = 512
+
+# Highlight style, matching the overlay drawn by the frontend's full-map view
+_HIGHLIGHT_RADIUS = 60
+_HIGHLIGHT_FILL = (255, 0, 255, 153)
+_HIGHLIGHT_OUTLINE = (0, 0, 0, 255)
+_CENTER_RADIUS = 5
+_CENTER_FILL = (255, 0, 0, 255)
+
+# Long-lived cache headers for versioned / content-addressed images
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Tile manifests read so far, by path (which includes the pyramid version)
+_manifests: Dict[str, Dict] = {}
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def resolve_map_path() -> Optional[str]:
+    """Returns the map image to load, or None if neither copy exists."""
+    for path in (MAP_PATH, _FRONTEND_MAP_PATH):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def supported_formats() -> List[str]:
+    """Returns the image formats this Pillow build can encode, best first."""
+    return [fmt for fmt in IMAGE_FORMATS if fmt == "jpeg" or features.check(fmt)]
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Picks the output format for a request: an explicitly requested format if it's
+    supported, otherwise the best format the client's Accept header lists (with a
+    q above 0), with JPEG as the fallback.
+    """
+    formats = supported_formats()
+    if requested in formats:
+        return requested
+    qualities = parse_qualities(accept)
+    for fmt in formats:
+        if qualities.get(IMAGE_FORMATS[fmt][0], 0.0) > 0:
+            return fmt
+    return "jpeg"
+
+
+def snap_crop_width(width: int) -> int:
+    """Snaps a requested width up to the nearest rendered crop width."""
+    for candidate in CROP_WIDTHS:
+        if width <= candidate:
+            return candidate
+    return CROP_WIDTHS[-1]
+
+
+def encode_image(image: Image.Image, fmt: str) -> bytes:
+    """Encodes an image in one of IMAGE_FORMATS."""
+    _, pil_format, options = IMAGE_FORMATS[fmt]
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def _file_key(path: Optional[str]) -> Optional[Tuple[str, int, int]]:
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=8)
+def _hash_files(keys: Tuple[Optional[Tuple[str, int, int]], ...]) -> str:
+    digest = hashlib.sha256()
+    for key in keys:
+        if key is not None:
+            with open(key[0], "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def map_version(map_path: str, booths_path: Optional[str]) -> str:
+    """
+    Short content hash of the map image and booth boxes. The files are only
+    hashed again when their modification time or size changes.
+    """
+    return _hash_files((_file_key(map_path), _file_key(booths_path)))
+
+
+# ============
+# TILE PYRAMID
+# ============
+
+
+def build_tile_pyramid(
+    map_path: str,
+    out_dir: str = TILES_DIR,
+    formats: Optional[List[str]] = None,
+    tile_size: int = TILE_SIZE,
+) -> Dict:
+    """
+    Cuts the map into a zoomable pyramid of tiles.
+
+    Zoom level 0 fits the whole map in a single tile; each level doubles the
+    resolution until the last one is the map at native size. Tiles are written
+    to `<out_dir>/<version>/<z>/<x>/<y>.<ext>` alongside a `manifest.json`.
+
+    Args:
+        map_path: The map image to tile.
+        out_dir: Root directory of the tile pyramids.
+        formats: Formats to write (defaults to every supported format).
+        tile_size: Side length of a tile in pixels.
+
+    Returns:
+        The manifest describing the pyramid.
+    """
+    formats = formats or supported_formats()
+    version = map_version(map_path, resolve_booths_path())
+    version_dir = os.path.join(out_dir, version)
+
+    source = Image.open(map_path).convert("RGB")
+    width, height = source.size
+    max_zoom = max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+    for zoom in range(max_zoom + 1):
+        scale = 2 ** (zoom - max_zoom)
+        level = source.resize(
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            Image.Resampling.LANCZOS,
+        )
+        n_x = math.ceil(level.width / tile_size)
+        n_y = math.ceil(level.height / tile_size)
+        for x in range(n_x):
+            os.makedirs(os.path.join(version_dir, str(zoom), str(x)), exist_ok=True)
+            for y in range(n_y):
+                tile = level.crop(
+                    (x * tile_size, y * tile_size, (x + 1) * tile_size, (y + 1) * tile_size)
+                )
+                for fmt in formats:
+                    path = os.path.join(version_dir, str(zoom), str(x), f"{y}.{fmt}")
+                    with open(path, "wb") as f:
+                        f.write(encode_image(tile, fmt))
+
+    manifest = {
+        "version": version,
+        "width": width,
+        "height": height,
+        "tile_size": tile_size,
+        "max_zoom": max_zoom,
+        "formats": formats,
+    }
+    with open(os.path.join(version_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def load_tile_manifest(out_dir: str = TILES_DIR) -> Optional[Dict]:
+    """
+    Returns the manifest of the tile pyramid built for the current map, or None
+    if it hasn't been built. It's read once per map version.
+    """
+    map_path = resolve_map_path()
+    if map_path is None:
+        return None
+    version = map_version(map_path, resolve_booths_path())
+    manifest_path = os.path.join(out_dir, version, "manifest.json")
+    manifest = _manifests.get(manifest_path)
+    if manifest is None:
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            manifest = _manifests[manifest_path] = json.load(f)
+    return manifest
+
+
+def tile_path(
+    version: str, zoom: int, x: int, y: int, fmt: str, out_dir: str = TILES_DIR
+) -> str:
+    """Returns where a tile of a pyramid version lives on disk."""
+    return os.path.join(out_dir, version, str(zoom), str(x), f"{y}.{fmt}")
+
+
+# ============
+# BOOTH CROPS
+# ============
+
+
+def _render_crop(
+    map_image: Image.Image,
+    centers: Dict[str, Tuple[float, float]],
+    booth: str,
+    width: int,
+    fmt: str,
+) -> bytes:
+    """
+    Crops a CROP_SPAN-sized square around the booth (shifted to stay inside
+    the map), draws the highlight, scales it to `width` and encodes it.
+    """
+    cx, cy = centers[booth]
+    span = min(CROP_SPAN, map_image.width, map_image.height)
+    left = int(min(max(cx - span / 2, 0), map_image.width - span))
+    top = int(min(max(cy - span / 2, 0), map_image.height - span))
+    crop = map_image.crop((left, top, left + span, top + span)).convert("RGBA")
+
+    # Draw on a transparent layer so the highlight is blended, not painted
+    overlay = Image.new("RGBA", crop.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    x, y = cx - left, cy - top
+    draw.ellipse(
+        (
+            x - _HIGHLIGHT_RADIUS,
+            y - _HIGHLIGHT_RADIUS,
+            x + _HIGHLIGHT_RADIUS,
+            y + _HIGHLIGHT_RADIUS,
+        ),
+        fill=_HIGHLIGHT_FILL,
+        outline=_HIGHLIGHT_OUTLINE,
+        width=2,
+    )
+    draw.ellipse(
+        (x - _CENTER_RADIUS, y - _CENTER_RADIUS, x + _CENTER_RADIUS, y + _CENTER_RADIUS),
+        fill=_CENTER_FILL,
+    )
+    crop = Image.alpha_composite(crop, overlay)
+    crop = crop.resize((width, width), Image.Resampling.LANCZOS)
+    return encode_image(crop, fmt)
+
+
+class BoothMapRenderer:
+    """
+    Renders small, highlighted viewports of the map centered on a booth.
+    """
+
+    def __init__(self, map_image: Image.Image, booth_index: BoothIndex, version: str):
+        self.map_image = map_image
+        self.booth_index = booth_index
+        self.version = version
+        # Over a function of the map and centers rather than a bound method, so
+        # the cache doesn't keep the renderer alive in a reference cycle
+        self.render = lru_cache(maxsize=CROP_CACHE_SIZE)(
+            partial(_render_crop, map_image, booth_index.centers)
+        )
+
+    @classmethod
+    def from_sources(cls, booth_index: BoothIndex) -> Optional["BoothMapRenderer"]:
+        """Loads the map image, or returns None if it isn't available."""
+        map_path = resolve_map_path()
+        if map_path is None:
+            print("pax-map.jpg not found; booth map crops are unavailable.")
+            return None
+        return cls(
+            map_image=load_map_image(map_path),
+            booth_index=booth_index,
+            version=map_version(map_path, resolve_booths_path()),
+        )
+
+
+# =================
+# RENDERER REGISTRY
+# =================
+
+
+@lru_cache(maxsize=None)
+def load_map_image(map_path: str) -> Image.Image:
+    """Decodes the map once per process; every catalog's renderer shares it."""
+    return Image.open(map_path).convert("RGB")
+
+
+def get_booth_map_renderer(db: sqlite3.Connection) -> Optional[BoothMapRenderer]:
+    """Returns the catalog's crop renderer (None if there's no map image)."""
+    return catalog_of(db).derived(
+        "booth_map_renderer",
+        lambda: BoothMapRenderer.from_sources(get_booth_index(db)),
+    )
+
+
+def _served_crops() -> Optional[Callable]:
+    renderer = current_catalog().peek("booth_map_renderer")
+    return renderer.render if renderer is not None else None
+
+
+register_lru_cache("booth_map_crops", _served_crops)
@@ -0,0 +1,340 @@
+"""
+Lightweight in-process metrics, exposed in the Prometheus text format.
+
+- `span(name)` times a stage of a request (the hybrid search stages, result
+  hydration, ...). Each span is recorded in the `paxpal_stage_seconds`
+  histogram and in the current request's `Server-Timing` header.
+- `MetricsMiddleware` records per-route latency histograms and status counts,
+  and writes the `Server-Timing` header.
+- Counters for the HTTP cache, database connections and OpenAI calls are
+  updated where those happen; `register_lru_cache` exposes an `lru_cache`'s
+  hit / miss / size statistics, read at scrape time.
+
+`GET /metrics` renders everything. Recording a value is a dict lookup and an
+add under a lock, so a span costs a couple of microseconds against the
+milliseconds a request takes.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Third-party imports
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# ==========
+# CONSTANTS
+# ==========
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram buckets (seconds): 100us to 10s
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+# =======
+# METRICS
+# =======
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """A monotonically increasing count, per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(labels)} {value:g}"
+
+
+class Gauge(Counter):
+    """A value that goes up and down, per label set."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Observations bucketed by value, per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+ overflow), sum]
+        self._values: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(k, (list(v[0]), v[1])) for k, v in self._values.items()]
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels(labels, f'le="{bound:g}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            cumulative += counts[-1]
+            inf = _format_labels(labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{inf} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {total:g}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+# ========
+# REGISTRY
+# ========
+_METRICS: List = []
+# Cache name -> function returning the cached function (None until it exists)
+_LRU_CACHES: Dict[str, Callable[[], Optional[Callable]]] = {}
+
+
+def counter(name: str, documentation: str) -> Counter:
+    metric = Counter(name, documentation)
+    _METRICS.append(metric)
+    return metric
+
+
+def gauge(name: str, documentation: str) -> Gauge:
+    metric = Gauge(name, documentation)
+    _METRICS.append(metric)
+    return metric
+
+
+def histogram(
+    name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS
+) -> Histogram:
+    metric = Histogram(name, documentation, buckets)
+    _METRICS.append(metric)
+    return metric
+
+
+def register_lru_cache(name: str, get_cached: Callable[[], Optional[Callable]]):
+    """
+    Exposes the statistics of a `functools.lru_cache`-wrapped function.
+
+    Args:
+        name: The `cache` label.
+        get_cached: Returns the wrapped function, or None if it doesn't exist
+                    (yet); called at scrape time.
+    """
+    _LRU_CACHES[name] = get_cached
+
+
+def _lru_cache_samples() -> Iterator[str]:
+    stats = []
+    for name, get_cached in _LRU_CACHES.items():
+        cached = get_cached()
+        if cached is not None:
+            stats.append((name, cached.cache_info()))
+    for field, metric, kind in (
+        ("hits", "paxpal_cache_hits_total", "counter"),
+        ("misses", "paxpal_cache_misses_total", "counter"),
+        ("currsize", "paxpal_cache_size", "gauge"),
+    ):
+        yield f"# HELP {metric} In-process LRU cache {field}."
+        yield f"# TYPE {metric} {kind}"
+        for name, info in stats:
+            yield f'{metric}{{cache="{name}"}} {getattr(info, field)}'
+
+
+def render() -> str:
+    """Renders every metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    lines.extend(_lru_cache_samples())
+    return "\n".join(lines) + "\n"
+
+
+# The app's metrics
+REQUEST_SECONDS = histogram(
+    "paxpal_http_request_seconds", "HTTP request latency by route and method."
+)
+REQUESTS = counter(
+    "paxpal_http_requests_total", "HTTP requests by route, method and status."
+)
+STAGE_SECONDS = histogram(
+    "paxpal_stage_seconds", "Time spent in each timed stage of a request."
+)
+HTTP_NOT_MODIFIED = counter(
+    "paxpal_http_not_modified_total",
+    "Conditional requests answered with a 304 without reaching the routes.",
+)
+DB_CONNECTIONS_OPENED = counter(
+    "paxpal_db_connections_opened_total", "SQLite connections opened."
+)
+DB_CONNECTIONS_OPEN = gauge(
+    "paxpal_db_connections_open", "SQLite connections currently open."
+)
+CATALOG_RELOADS = counter(
+    "paxpal_catalog_reloads_total",
+    "Hot reloads of the database, by outcome (swapped or rejected).",
+)
+EVENT_SHARDS_OPEN = gauge(
+    "paxpal_event_shards_open", "Event databases currently open (see `events`)."
+)
+EVENT_SHARD_EVICTIONS = counter(
+    "paxpal_event_shard_evictions_total",
+    "Event databases closed to make room for another.",
+)
+DB_SLOW_STATEMENTS = counter(
+    "paxpal_db_slow_statements_total",
+    "SQLite statements logged by the slow-statement log.",
+)
+OPENAI_SECONDS = histogram(
+    "paxpal_openai_request_seconds",
+    "OpenAI API request latency by model and outcome.",
+)
+OPENAI_TOKENS = counter(
+    "paxpal_openai_tokens_total", "Tokens billed by the OpenAI API, by model."
+)
+
+
+def record_openai_call(model: str, seconds: float, tokens: Optional[int]):
+    """Records one OpenAI API call (`tokens` is None if the call failed)."""
+    outcome = "error" if tokens is None else "ok"
+    OPENAI_SECONDS.observe(seconds, model=model, outcome=outcome)
+    if tokens:
+        OPENAI_TOKENS.inc(tokens, model=model)
+
+
+# =====
+# SPANS
+# =====
+# The current request's (stage, seconds) spans, for its Server-Timing header.
+# Sync routes run in a worker thread with a copy of the request's context, which
+# still points at the same list.
+_REQUEST_SPANS: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_spans", default=None
+)
+
+
+class span:
+    """
+    Times the enclosed block as stage `name`:
+
+        with span("knn"):
+            ...
+    """
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(seconds, stage=self.name)
+        spans = _REQUEST_SPANS.get()
+        if spans is not None:
+            spans.append((self.name, seconds))
+
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    """Formats spans (and the total) as a `Server-Timing` header value."""
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in spans]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+# ==========
+# MIDDLEWARE
+# ==========
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route, and adding each
+    request's spans as a `Server-Timing` header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        spans: List[Tuple[str, float]] = []
+        token = _REQUEST_SPANS.set(spans)
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", server_timing(spans, time.perf_counter() - start)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _REQUEST_SPANS.reset(token)
+            # Label by route template, so the number of series stays bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            seconds = time.perf_counter() - start
+            REQUEST_SECONDS.observe(seconds, route=path, method=method)
+            REQUESTS.inc(route=path, method=method, status=str(status_code))
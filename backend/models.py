@@ -8,7 +8,7 @@ This module contains various Pydantic models used throughout the API.
 # Below, we'll set up the rest of the file.
 
 # General imports
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 # Third-party imports
 from pydantic import BaseModel, Field, field_validator
@@ -83,6 +83,10 @@ class Game(BaseModel):
     similar_games: List[str] = Field(
         default_factory=list, description="List of recommended similar games' IDs'"
     )
+    similar_game_cards: Optional[List["SearchResult"]] = Field(
+        None,
+        description="The similar games as search result cards, in `similar_games` order (an id with no game has no card). Only in the response with `expand=similar`.",
+    )
 
     @field_validator("media", mode="after")
     @classmethod
@@ -133,6 +137,149 @@ class SearchResult(BaseModel):
     )
 
 
+class EventSearchResult(SearchResult):
+    """
+    A search result from a search across events.
+    """
+
+    event: str = Field(description="The event the game is shown at")
+
+
+class SearchFilters(BaseModel):
+    """
+    Metadata filters applied inside both stages of a search.
+
+    Platforms and exhibitors match if a game has *any* of them; tags match only
+    if a game has *all* of them. Booth bounds are inclusive.
+    """
+
+    platforms: List[str] = Field(
+        default_factory=list, description="Platforms the game must be available on"
+    )
+    exhibitors: List[str] = Field(
+        default_factory=list, description="Exhibitors the game must be shown by"
+    )
+    genres_and_tags: List[str] = Field(
+        default_factory=list, description="Genres/tags the game must have"
+    )
+    released: Optional[bool] = Field(
+        None, description="Only released (True) or unreleased (False) games"
+    )
+    booth_min: Optional[float] = Field(None, description="Lowest booth number")
+    booth_max: Optional[float] = Field(None, description="Highest booth number")
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether no filter is set at all."""
+        return (
+            not self.platforms
+            and not self.exhibitors
+            and not self.genres_and_tags
+            and self.released is None
+            and self.booth_min is None
+            and self.booth_max is None
+        )
+
+
+class FacetCount(BaseModel):
+    """
+    The number of games in the current selection that have a facet value.
+    """
+
+    value: str = Field(description="Facet value (e.g., 'Switch', 'Co-op', 'true')")
+    count: int = Field(description="Number of matching games with this value")
+
+
+class BrowseResponse(BaseModel):
+    """
+    One page of a faceted browse, plus facet counts for the whole selection.
+    """
+
+    total: int = Field(description="Total number of games matching the filters")
+    offset: int = Field(description="Offset of the first game in this page")
+    limit: int = Field(description="Maximum number of games in this page")
+    games: List[GameTableRow] = Field(
+        default_factory=list, description="The games in this page, sorted by name"
+    )
+    facets: Dict[str, List[FacetCount]] = Field(
+        default_factory=dict,
+        description="Facet value counts for the selection, keyed by facet name",
+    )
+
+
+class NearbyBooth(BaseModel):
+    """
+    A booth on the show-floor map and the games being shown there.
+    """
+
+    booth_number: str = Field(description="The booth number")
+    box: List[float] = Field(
+        description="Booth bounding box on the floor map, as [x1, y1, x2, y2] pixels"
+    )
+    distance: float = Field(
+        description="Distance in map pixels from the center of the requested booth"
+    )
+    games: List[SearchResult] = Field(
+        default_factory=list, description="Games at this booth"
+    )
+
+
+class NearbyBoothsResponse(BaseModel):
+    """
+    The booths within a radius of a booth, closest first.
+    """
+
+    booth_number: str = Field(description="The booth the search is centered on")
+    radius: float = Field(description="Search radius in map pixels")
+    booths: List[NearbyBooth] = Field(
+        default_factory=list,
+        description="Booths within the radius, closest first (the requested booth first)",
+    )
+
+
+class RouteRequest(BaseModel):
+    """
+    The games to plan a walking route for.
+    """
+
+    game_ids: List[str] = Field(description="IDs of the games to visit")
+    start_booth: Optional[str] = Field(
+        None, description="Optional booth number to start the route from"
+    )
+
+
+class RouteStop(BaseModel):
+    """
+    One booth on a walking route, with the requested games shown there.
+    """
+
+    booth_number: str = Field(description="The booth number")
+    center: List[float] = Field(
+        description="Center of the booth on the floor map, as [x, y] pixels"
+    )
+    distance_from_previous: float = Field(
+        description="Distance in map pixels from the previous stop (0 for the first)"
+    )
+    games: List[SearchResult] = Field(
+        default_factory=list, description="The requested games at this booth"
+    )
+
+
+class RouteResponse(BaseModel):
+    """
+    An ordered walking route across the booths of a list of games.
+    """
+
+    stops: List[RouteStop] = Field(
+        default_factory=list, description="Booths in visiting order"
+    )
+    total_distance: float = Field(description="Total route length in map pixels")
+    unplaced_game_ids: List[str] = Field(
+        default_factory=list,
+        description="Requested games that couldn't be placed on the map (unknown game, no booth, or booth not on the map)",
+    )
+
+
 # If you want to define a model for the search query parameters (e.g., if using POST)
 # class SearchQuery(BaseModel):
 #     query: str
@@ -146,3 +293,9 @@ class GameIdList(BaseModel):
     """
 
     ids: List[str] = Field(description="A list of game IDs")
+
+
+# Resolve `Game`'s forward reference to `SearchResult` now. Left to pydantic, the
+# model is completed on first use, which isn't thread-safe: concurrent first
+# requests in the threadpool could each see a half-built model.
+Game.model_rebuild()
@@ -0,0 +1,382 @@
+"""
+Normalizes the JSON columns of the `games` table into indexed child tables.
+
+`platforms`, `genres_and_tags`, `media`, `links` and `similar_games` are stored
+as JSON text in `games`, and `description_texts` holds every scraped description.
+This script runs once per database build (the Dockerfile runs it right after the
+database is downloaded) and adds:
+
+- `game_platforms`, `game_tags`, `game_media`, `game_links`: one row per list
+  item, keyed by (game_id, position) so the stored order is kept
+- `game_similar`: one row per similar game, with its rank in the stored list and
+  the cosine similarity between the two games' embeddings
+- `games.description`: the canonical description, resolved from
+  `description_texts` (ai_search_summary > pax_website > pax_app)
+- `games.content_hash` and `games.updated_at`: a hash of the game's source
+  columns, and when the game last changed (UTC, ISO 8601), behind the export's
+  `updated_since` filter. A game whose hash matches the one in the `--previous`
+  database (by default, the hash already stored in this one) keeps its
+  `updated_at`; a new or changed game gets `--as-of`, by default the database
+  file's modification time, i.e. when this version of the data was written.
+
+Malformed JSON and items of the wrong shape are dropped here, so the API reads
+plain, already-clean rows. The original JSON columns are left in place. Re-running
+the script rebuilds the tables from scratch (and keeps `updated_at`).
+
+    python normalize_db.py
+    python normalize_db.py --db ../experiments/notebooks/data/database.sqlite
+    python normalize_db.py --db new.sqlite --previous releases/2025-08-29.sqlite
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+import sqlite_vec
+
+# Local imports
+from db import DATABASE_PATH
+
+# ==========
+# CONSTANTS
+# ==========
+# Description sources, most preferred first
+DESCRIPTION_SOURCES = ("ai_search_summary", "pax_website", "pax_app")
+
+# Columns of `games` written by this script, so not part of a game's content hash
+DERIVED_COLUMNS = ("description", "content_hash", "updated_at")
+
+# Format of `games.updated_at`, which sorts chronologically as text
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+SCHEMA = """
+DROP TABLE IF EXISTS game_platforms;
+DROP TABLE IF EXISTS game_tags;
+DROP TABLE IF EXISTS game_media;
+DROP TABLE IF EXISTS game_links;
+DROP TABLE IF EXISTS game_similar;
+
+CREATE TABLE game_platforms (
+    game_id   TEXT    NOT NULL,
+    position  INTEGER NOT NULL,
+    platform  TEXT    NOT NULL,
+    PRIMARY KEY (game_id, position)
+) WITHOUT ROWID;
+CREATE INDEX idx_game_platforms_platform ON game_platforms (platform, game_id);
+
+CREATE TABLE game_tags (
+    game_id   TEXT    NOT NULL,
+    position  INTEGER NOT NULL,
+    tag       TEXT    NOT NULL,
+    PRIMARY KEY (game_id, position)
+) WITHOUT ROWID;
+CREATE INDEX idx_game_tags_tag ON game_tags (tag, game_id);
+
+CREATE TABLE game_media (
+    game_id   TEXT    NOT NULL,
+    position  INTEGER NOT NULL,
+    type      TEXT    NOT NULL,
+    source    TEXT    NOT NULL,
+    url       TEXT    NOT NULL,
+    PRIMARY KEY (game_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE game_links (
+    game_id   TEXT    NOT NULL,
+    position  INTEGER NOT NULL,
+    title     TEXT    NOT NULL,
+    url       TEXT    NOT NULL,
+    PRIMARY KEY (game_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE game_similar (
+    game_id          TEXT    NOT NULL,
+    rank             INTEGER NOT NULL,
+    similar_game_id  TEXT    NOT NULL,
+    score            REAL,
+    PRIMARY KEY (game_id, rank)
+) WITHOUT ROWID;
+CREATE INDEX idx_game_similar_similar ON game_similar (similar_game_id);
+
+DROP INDEX IF EXISTS idx_games_updated_at;
+"""
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def _load_list(value: Optional[str]) -> List[Any]:
+    """Parses a JSON list, treating anything malformed as empty."""
+    try:
+        parsed = json.loads(value or "[]")
+    except json.JSONDecodeError:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def _strings(value: Optional[str]) -> List[str]:
+    """Parses a JSON list of strings, dropping anything that isn't a string."""
+    return [item for item in _load_list(value) if isinstance(item, str)]
+
+
+def _records(value: Optional[str], fields: Tuple[str, ...]) -> List[Tuple[str, ...]]:
+    """Parses a JSON list of objects, keeping those with every field as a string."""
+    return [
+        tuple(item[field] for field in fields)
+        for item in _load_list(value)
+        if isinstance(item, dict)
+        and all(isinstance(item.get(field), str) for field in fields)
+    ]
+
+
+def canonical_description(description_texts: Optional[str]) -> str:
+    """
+    Resolves `description_texts` to a single description, by source priority.
+    """
+    try:
+        parsed = json.loads(description_texts or "[]")
+    except json.JSONDecodeError:
+        return ""
+    if not isinstance(parsed, list):
+        return str(parsed or "")
+
+    texts: Dict[str, str] = {}
+    for item in parsed:
+        if isinstance(item, dict) and item.get("text"):
+            texts.setdefault(item.get("source"), str(item["text"]))
+    for source in DESCRIPTION_SOURCES:
+        if source in texts:
+            return texts[source]
+    return ""
+
+
+def format_timestamp(moment: datetime) -> str:
+    """Formats a time as stored in `games.updated_at` (naive times are UTC)."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime(TIMESTAMP_FORMAT)
+
+
+def file_timestamp(path: str) -> str:
+    """A file's modification time, as stored in `games.updated_at`."""
+    modified = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+    return format_timestamp(modified)
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Hashes a `games` row's source columns."""
+    source = {k: v for k, v in row.items() if k not in DERIVED_COLUMNS}
+    encoded = json.dumps(source, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def read_game_versions(conn: sqlite3.Connection) -> Dict[str, Tuple[str, str]]:
+    """
+    Returns each game's (content hash, updated_at), or nothing if the database
+    wasn't normalized with them.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(games)")}
+    if not {"content_hash", "updated_at"} <= columns:
+        return {}
+    return {
+        game_id: (hash_, updated_at)
+        for game_id, hash_, updated_at in conn.execute(
+            "SELECT id, content_hash, updated_at FROM games"
+        )
+        if hash_ is not None and updated_at is not None
+    }
+
+
+def _load_unit_embeddings(conn: sqlite3.Connection) -> Dict[str, np.ndarray]:
+    """Loads every game's embedding, normalized to unit length."""
+    embeddings: Dict[str, np.ndarray] = {}
+    for game_id, blob in conn.execute("SELECT game_id, vector FROM game_embs"):
+        vector = np.frombuffer(blob, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        embeddings[game_id] = vector / norm if norm else vector
+    return embeddings
+
+
+# =============
+# NORMALIZATION
+# =============
+
+
+def normalize_games(
+    conn: sqlite3.Connection,
+    previous: Optional[Dict[str, Tuple[str, str]]] = None,
+    as_of: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Rebuilds the normalized child tables and `games.description`, and stamps
+    each game's content hash and `updated_at`.
+
+    Args:
+        conn: Connection to the database (with sqlite-vec loaded).
+        previous: Each game's (content hash, updated_at) in the version of the
+                  data this one replaces (see `read_game_versions`); defaults to
+                  those already stored in this database.
+        as_of: `updated_at` of new and changed games (defaults to now).
+
+    Returns:
+        The number of rows written per table.
+    """
+    if previous is None:
+        previous = read_game_versions(conn)
+    as_of = as_of or format_timestamp(datetime.now(timezone.utc))
+
+    conn.executescript(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(games)")}
+    for column in DERIVED_COLUMNS:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE games ADD COLUMN {column} TEXT")
+    conn.execute("CREATE INDEX idx_games_updated_at ON games (updated_at)")
+
+    versions = []
+    cursor = conn.execute("SELECT * FROM games")
+    names = [column[0] for column in cursor.description]
+    for values in cursor.fetchall():
+        row = dict(zip(names, values))
+        hash_ = content_hash(row)
+        old_hash, updated_at = previous.get(row["id"], (None, None))
+        versions.append((hash_, updated_at if old_hash == hash_ else as_of, row["id"]))
+
+    game_ids = {row[0] for row in conn.execute("SELECT id FROM games")}
+    embeddings = _load_unit_embeddings(conn)
+
+    platforms, tags, media, links, similar = [], [], [], [], []
+    descriptions = []
+    rows = conn.execute(
+        """
+        SELECT id, description_texts, platforms, genres_and_tags, media, links,
+               similar_games
+        FROM games
+        """
+    ).fetchall()
+    for (
+        game_id,
+        description_texts,
+        platforms_json,
+        tags_json,
+        media_json,
+        links_json,
+        similar_json,
+    ) in rows:
+        descriptions.append((canonical_description(description_texts), game_id))
+        platforms += [
+            (game_id, i, value) for i, value in enumerate(_strings(platforms_json))
+        ]
+        tags += [(game_id, i, value) for i, value in enumerate(_strings(tags_json))]
+        media += [
+            (game_id, i, *item)
+            for i, item in enumerate(_records(media_json, ("type", "source", "url")))
+        ]
+        links += [
+            (game_id, i, *item)
+            for i, item in enumerate(_records(links_json, ("title", "url")))
+        ]
+
+        # Only keep similar games that exist, and score them by embedding cosine
+        similar_ids = [
+            similar_id
+            for similar_id in dict.fromkeys(_strings(similar_json))
+            if similar_id in game_ids and similar_id != game_id
+        ]
+        for rank, similar_id in enumerate(similar_ids):
+            score = None
+            if game_id in embeddings and similar_id in embeddings:
+                score = float(embeddings[game_id] @ embeddings[similar_id])
+            similar.append((game_id, rank, similar_id, score))
+
+    conn.executemany("UPDATE games SET description = ? WHERE id = ?", descriptions)
+    conn.executemany(
+        "UPDATE games SET content_hash = ?, updated_at = ? WHERE id = ?", versions
+    )
+    conn.executemany("INSERT INTO game_platforms VALUES (?, ?, ?)", platforms)
+    conn.executemany("INSERT INTO game_tags VALUES (?, ?, ?)", tags)
+    conn.executemany("INSERT INTO game_media VALUES (?, ?, ?, ?, ?)", media)
+    conn.executemany("INSERT INTO game_links VALUES (?, ?, ?, ?)", links)
+    conn.executemany("INSERT INTO game_similar VALUES (?, ?, ?, ?)", similar)
+    conn.execute("ANALYZE")
+    return {
+        "games.description": len(descriptions),
+        "games.updated_at": sum(1 for version in versions if version[1] == as_of),
+        "game_platforms": len(platforms),
+        "game_tags": len(tags),
+        "game_media": len(media),
+        "game_links": len(links),
+        "game_similar": len(similar),
+    }
+
+
+def is_normalized(conn: sqlite3.Connection) -> bool:
+    """Whether the database has the normalized child tables and columns."""
+    row = conn.execute(
+        "SELECT COUNT(*) AS n FROM sqlite_master "
+        "WHERE type = 'table' AND name = 'game_similar'"
+    ).fetchone()
+    count = row["n"] if isinstance(row, dict) else row[0]
+    columns = {
+        row["name"] if isinstance(row, dict) else row[1]
+        for row in conn.execute("PRAGMA table_info(games)")
+    }
+    return count > 0 and "updated_at" in columns
+
+
+# ===========
+# MAIN METHOD
+# ===========
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", default=DATABASE_PATH, help="Database to normalize.")
+    parser.add_argument(
+        "--previous",
+        help="Normalized database this one replaces, whose updated_at are kept "
+        "for unchanged games.",
+    )
+    parser.add_argument(
+        "--as-of",
+        help="updated_at of new and changed games, as YYYY-MM-DDTHH:MM:SSZ "
+        "(defaults to the database file's modification time).",
+    )
+    args = parser.parse_args()
+    as_of = args.as_of or file_timestamp(args.db)
+
+    previous = None
+    if args.previous:
+        previous_conn = sqlite3.connect(f"file:{args.previous}?mode=ro", uri=True)
+        try:
+            previous = read_game_versions(previous_conn)
+        finally:
+            previous_conn.close()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        conn.enable_load_extension(True)
+        sqlite_vec.load(conn)
+        with conn:
+            counts = normalize_games(conn, previous=previous, as_of=as_of)
+    finally:
+        conn.close()
+
+    print(f"Normalized {args.db}")
+    for table, count in counts.items():
+        print(f"  {table}: {count:,} rows")
+
+
+if __name__ == "__main__":
+    main()
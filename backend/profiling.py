@@ -0,0 +1,164 @@
+"""
+On-demand sampling profiler for single requests.
+
+When `PAXPAL_PROFILE_TOKEN` is set, a request carrying that token (as the
+`X-Profile-Token` header or the `profile` query parameter) is run under a
+sampling profiler, and the response is replaced by the profile in the "folded
+stacks" format (one `frame;frame;frame count` line per distinct stack), which
+flamegraph.pl, speedscope and most flame graph viewers load directly:
+
+    curl -H "X-Profile-Token: $TOKEN" "localhost:8000/api/search?q=cozy" > search.folded
+
+The sampler is a background thread reading every thread's current stack
+(`sys._current_frames()`) each `PAXPAL_PROFILE_INTERVAL_MS`, so nothing is
+instrumented and other requests pay nothing. Sync routes run in a worker
+thread, so the samples cover every thread except the sampler; idle worker
+threads are left out, but requests served concurrently show up too.
+
+Without the environment variable the middleware passes every request through.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from urllib.parse import parse_qs
+
+# Third-party imports
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# ==========
+# CONSTANTS
+# ==========
+PROFILE_TOKEN = os.getenv("PAXPAL_PROFILE_TOKEN")
+PROFILE_INTERVAL = float(os.getenv("PAXPAL_PROFILE_INTERVAL_MS", "1")) / 1000
+
+PROFILE_HEADER = "x-profile-token"
+PROFILE_QUERY_PARAM = "profile"
+
+# Stacks whose innermost frame is in one of these files are idle threads
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+
+# ========
+# SAMPLING
+# ========
+
+
+class StackSampler(threading.Thread):
+    """Samples every other thread's stack at a fixed interval while running."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.n_samples = 0
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _fold(frame) -> Optional[str]:
+        """Folds a frame's stack into "outer;...;inner", or None if it's idle."""
+        if os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+            return None
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                f"{code.co_firstlineno})"
+            )
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            self.n_samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                folded = self._fold(frame)
+                if folded:
+                    self.stacks[folded] += 1
+
+    def stop(self) -> str:
+        """Stops sampling and returns the profile as folded stacks."""
+        self._stop_event.set()
+        self.join()
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+# ==========
+# MIDDLEWARE
+# ==========
+
+
+def _is_profiling_request(scope: Scope, token: str) -> bool:
+    supplied = Headers(scope=scope).get(PROFILE_HEADER)
+    if supplied is None:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        supplied = (query.get(PROFILE_QUERY_PARAM) or [None])[0]
+    return supplied is not None and hmac.compare_digest(
+        supplied.encode(), token.encode()
+    )
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests carrying the profiling token and
+    returns the profile instead of the response.
+    """
+
+    def __init__(self, app: ASGIApp, token: Optional[str] = PROFILE_TOKEN):
+        self.app = app
+        self.token = token
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            not self.token
+            or scope["type"] != "http"
+            or not _is_profiling_request(scope, self.token)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def discard(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        sampler = StackSampler()
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profile = sampler.stop()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"cache-control", b"no-store"),
+                    (b"x-profiled-status", str(status_code).encode()),
+                    (b"x-profile-samples", str(sampler.n_samples).encode()),
+                    (b"x-profile-duration-ms", f"{elapsed_ms:.1f}".encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": profile.encode()})
@@ -0,0 +1,227 @@
+"""
+Walking routes across the booths of a list of games.
+
+Every booth center from the booth index goes into one pairwise distance matrix,
+built once per process. A route request then only slices that matrix down to
+its stops and orders them with a vectorized heuristic:
+
+1. nearest-neighbor tours are seeded from every possible first stop at once,
+   and the few shortest are kept;
+2. 2-opt then repeatedly applies the single best segment reversal to each of
+   them, scoring all O(n^2) candidate reversals of a tour in one NumPy
+   expression per pass, and the shortest result wins.
+
+Routes are open paths (you don't walk back to where you started). That's handled
+by adding a dummy stop that is zero distance from every booth, solving the
+closed tour, and cutting the tour at the dummy.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from booth_index import BoothIndex, get_booth_index
+from db import catalog_of
+
+# ==========
+# CONSTANTS
+# ==========
+# Number of nearest-neighbor tours (shortest first) that 2-opt is run from
+N_SEED_TOURS = 4
+
+# Upper bound on 2-opt passes; each pass applies the single best improving move
+MAX_TWO_OPT_PASSES = 1_000
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def route_length(distances: np.ndarray, order: List[int]) -> float:
+    """Length of an open path visiting `order` (indices into `distances`)."""
+    if len(order) < 2:
+        return 0.0
+    order_array = np.asarray(order)
+    return float(distances[order_array[:-1], order_array[1:]].sum())
+
+
+def nearest_neighbor_tours(distances: np.ndarray) -> np.ndarray:
+    """
+    Builds a nearest-neighbor closed tour from every starting node at once.
+
+    Returns:
+        An (n, n) array whose row s is the tour that starts at node s.
+    """
+    n = distances.shape[0]
+    tours = np.empty((n, n), dtype=np.int64)
+    tours[:, 0] = np.arange(n)
+    visited = np.eye(n, dtype=bool)
+    rows = np.arange(n)
+    for step in range(1, n):
+        candidate = np.where(visited, np.inf, distances[tours[:, step - 1]])
+        nearest = np.argmin(candidate, axis=1)
+        tours[:, step] = nearest
+        visited[rows, nearest] = True
+    return tours
+
+
+def closed_tour_lengths(distances: np.ndarray, tours: np.ndarray) -> np.ndarray:
+    """Lengths of closed tours, one per row of `tours`."""
+    return distances[tours, np.roll(tours, -1, axis=1)].sum(axis=1)
+
+
+def two_opt(distances: np.ndarray, tour: np.ndarray) -> np.ndarray:
+    """
+    Improves a closed tour with best-improvement 2-opt.
+
+    Reversing the segment tour[i+1 .. j] replaces edges (a_i, a_i+1) and
+    (a_j, a_j+1) with (a_i, a_j) and (a_i+1, a_j+1); every (i, j) pair is
+    scored in one vectorized pass and the best improving one is applied, until
+    no reversal shortens the tour.
+    """
+    tour = tour.copy()
+    n = tour.size
+    if n < 4:
+        return tour
+    upper = np.triu(np.ones((n, n), dtype=bool), k=2)
+    # Reversing everything but one edge just mirrors the tour
+    upper[0, n - 1] = False
+
+    for _ in range(MAX_TWO_OPT_PASSES):
+        nxt = np.roll(tour, -1)
+        edge = distances[tour, nxt]
+        delta = (
+            distances[np.ix_(tour, tour)]
+            + distances[np.ix_(nxt, nxt)]
+            - edge[:, None]
+            - edge[None, :]
+        )
+        delta = np.where(upper, delta, 0.0)
+        best = int(np.argmin(delta))
+        i, j = divmod(best, n)
+        if delta[i, j] >= -1e-9:
+            break
+        tour[i + 1 : j + 1] = tour[i + 1 : j + 1][::-1]
+    return tour
+
+
+def solve_open_path(
+    distances: np.ndarray, start: Optional[int] = None
+) -> List[int]:
+    """
+    Orders the nodes of a distance matrix into a short open path.
+
+    Args:
+        distances: (n, n) symmetric distance matrix.
+        start: Optional node the path must begin at.
+
+    Returns:
+        Node indices in visiting order.
+    """
+    n = distances.shape[0]
+    if n <= 2:
+        if start is not None and n == 2 and start == 1:
+            return [1, 0]
+        return list(range(n))
+
+    # Node n is the dummy: free to reach from anywhere, so the closed tour's
+    # edges to it are the open path's two free ends. With a fixed start, only
+    # the start is free to reach from the dummy.
+    padded = np.zeros((n + 1, n + 1), dtype=np.float64)
+    padded[:n, :n] = distances
+    if start is not None:
+        padded[n, :n] = padded[:n, n] = distances.max() * n + 1.0
+        padded[n, start] = padded[start, n] = 0.0
+
+    # 2-opt from the few shortest nearest-neighbor seeds, keeping the best result
+    tours = nearest_neighbor_tours(padded)
+    seeds = np.argsort(closed_tour_lengths(padded, tours))[:N_SEED_TOURS]
+    improved = np.stack([two_opt(padded, tours[seed]) for seed in seeds])
+    tour = improved[np.argmin(closed_tour_lengths(padded, improved))]
+
+    # Cut the closed tour at the dummy
+    cut = int(np.flatnonzero(tour == n)[0])
+    order = np.concatenate([tour[cut + 1 :], tour[:cut]]).tolist()
+    if start is not None and order[0] != start:
+        order.reverse()
+    return order
+
+
+# =============
+# ROUTE PLANNER
+# =============
+
+
+class RoutePlanner:
+    """
+    Plans walking routes over the booths of a booth index.
+    """
+
+    def __init__(self, booth_index: BoothIndex):
+        self.booth_index = booth_index
+        self.booths = list(booth_index.centers)
+        self.position: Dict[str, int] = {
+            booth: i for i, booth in enumerate(self.booths)
+        }
+        centers = np.array(
+            [booth_index.centers[booth] for booth in self.booths], dtype=np.float64
+        ).reshape(-1, 2)
+
+        # Pairwise booth-to-booth distances in map pixels
+        deltas = centers[:, None, :] - centers[None, :, :]
+        self.distances = np.sqrt((deltas**2).sum(axis=2))
+
+    def plan(
+        self, booths: List[str], start: Optional[str] = None
+    ) -> Tuple[List[str], List[float]]:
+        """
+        Orders booths into a short walking route.
+
+        Args:
+            booths: Booths to visit (each must be in the booth index).
+            start: Optional booth to start from; it's added to the route if it
+                   isn't one of `booths`.
+
+        Returns:
+            (booths in visiting order, distance walked from the previous booth
+            for each stop).
+        """
+        stops = list(dict.fromkeys(booths))
+        if start is not None and start not in stops:
+            stops.insert(0, start)
+        if not stops:
+            return [], []
+
+        rows = np.array([self.position[booth] for booth in stops])
+        distances = self.distances[np.ix_(rows, rows)]
+        order = solve_open_path(
+            distances, start=None if start is None else stops.index(start)
+        )
+
+        legs = [0.0] + [
+            float(distances[a, b]) for a, b in zip(order[:-1], order[1:])
+        ]
+        return [stops[i] for i in order], legs
+
+
+# ================
+# PLANNER REGISTRY
+# ================
+
+
+def get_route_planner(db: sqlite3.Connection) -> RoutePlanner:
+    """
+    Returns the catalog's route planner, building it on first use (once per
+    booth index, since the distance matrix covers every booth).
+    """
+    return catalog_of(db).derived(
+        "route_planner", lambda: RoutePlanner(get_booth_index(db))
+    )
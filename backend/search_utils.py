@@ -4,10 +4,11 @@ Utility functions for performing search operations.
 
 import sqlite3
 import json
-from typing import List, Tuple, Dict, Optional
+import struct
+from typing import Collection, List, Tuple, Dict, Optional
 
-# Import the real embedding function from backend.utils.openai
-from utils.openai import generate_embeddings_for_texts
+from vector_index import CompactVectorIndex, DEFAULT_OVERSAMPLE
+from metrics import record_openai_call, span
 
 
 def get_embedding_for_query(text: str) -> List[float]:
@@ -20,9 +21,15 @@ def get_embedding_for_query(text: str) -> List[float]:
     Returns:
         A list of floats representing the embedding.
     """
+    # Imported on first use: the OpenAI SDK is by far the slowest import in the
+    # app, and most requests never need it
+    from utils.openai import generate_embeddings_for_texts
+
     # Use the real embedding function for a single query
     # generate_embeddings_for_texts returns a np.ndarray, typically shape (1, embedding_dim) for a single text
-    embedding_array = generate_embeddings_for_texts([text])
+    embedding_array = generate_embeddings_for_texts(
+        [text], show_progress=False, usage_callback=record_openai_call
+    )
 
     # Check if the array is valid and contains data
     if embedding_array is None or embedding_array.shape[0] == 0:
@@ -46,6 +53,81 @@ def get_embedding_for_query(text: str) -> List[float]:
     return first_embedding_list
 
 
+def serialize_f32(vector: List[float]) -> bytes:
+    """Serializes a list of floats into a compact 'raw bytes' format for sqlite-vec."""
+    return struct.pack(f"{len(vector)}f", *vector)
+
+
+def semantic_search(
+    db: sqlite3.Connection,
+    query_embedding: List[float],
+    k: int = 20,
+    vector_index: Optional[CompactVectorIndex] = None,
+    oversample: int = DEFAULT_OVERSAMPLE,
+    allowed_ids: Optional[Collection[str]] = None,
+) -> Dict[str, float]:
+    """
+    Finds the k games closest to the query embedding.
+
+    Args:
+        db: SQLite database connection.
+        query_embedding: The query's embedding vector.
+        k: Number of nearest games to return.
+        vector_index: Optional compact vector tier. If None, the exact brute-force
+                      vec0 KNN over `game_embs` is used.
+        oversample: How many times k candidates the compact tier shortlists
+                    before the exact re-rank.
+        allowed_ids: Optional pre-filter. Only these games are considered inside
+                     the KNN itself, so a full k is returned whenever at least k
+                     games match.
+
+    Returns:
+        A dict mapping game IDs to their L2 distance from the query.
+    """
+    if allowed_ids is not None and not allowed_ids:
+        return {}
+
+    if vector_index is not None:
+        allowed_rows = (
+            None if allowed_ids is None else vector_index.rows_for_ids(allowed_ids)
+        )
+        return dict(
+            vector_index.search(
+                query_embedding, k=k, oversample=oversample, allowed_rows=allowed_rows
+            )
+        )
+
+    # Use parameterized query with raw bytes for the embedding vector
+    cursor = db.cursor()
+    if allowed_ids is None:
+        cursor.execute(
+            """
+            SELECT game_id, distance
+            FROM game_embs
+            WHERE vector MATCH ?
+                AND k = ?
+            ORDER BY distance
+            """,
+            (serialize_f32(query_embedding), k),
+        )
+    else:
+        # vec0 applies a constraint on its primary key as a pre-filter inside the
+        # KNN. The IDs go in as one JSON array to stay clear of SQLite's limit on
+        # bound variables.
+        cursor.execute(
+            """
+            SELECT game_id, distance
+            FROM game_embs
+            WHERE vector MATCH ?
+                AND k = ?
+                AND game_id IN (SELECT value FROM json_each(?))
+            ORDER BY distance
+            """,
+            (serialize_f32(query_embedding), k, json.dumps(list(allowed_ids))),
+        )
+    return {row["game_id"]: float(row["distance"]) for row in cursor.fetchall()}
+
+
 def hybrid_search(
     db: sqlite3.Connection,
     query_text: str,
@@ -53,10 +135,45 @@ def hybrid_search(
     limit: int = 5,
     k_semantic: int = 20,  # Number of results to fetch from semantic search
     k_fts: int = 20,  # Number of results to fetch from FTS
+    vector_index: Optional[CompactVectorIndex] = None,
+    allowed_ids: Optional[Collection[str]] = None,
 ) -> List[str]:
     """
     Performs a hybrid search combining semantic and full-text search results.
 
+    Takes the same arguments as `hybrid_search_scored`.
+
+    Returns:
+        A list of game IDs, ordered by relevance.
+    """
+    scored = hybrid_search_scored(
+        db=db,
+        query_text=query_text,
+        semantic_weight=semantic_weight,
+        limit=limit,
+        k_semantic=k_semantic,
+        k_fts=k_fts,
+        vector_index=vector_index,
+        allowed_ids=allowed_ids,
+    )
+    return [game_id for game_id, _ in scored]
+
+
+def hybrid_search_scored(
+    db: sqlite3.Connection,
+    query_text: str,
+    semantic_weight: float = 0.7,
+    limit: int = 5,
+    k_semantic: int = 20,  # Number of results to fetch from semantic search
+    k_fts: int = 20,  # Number of results to fetch from FTS
+    vector_index: Optional[CompactVectorIndex] = None,
+    allowed_ids: Optional[Collection[str]] = None,
+    query_embedding: Optional[List[float]] = None,
+) -> List[Tuple[str, float]]:
+    """
+    Performs a hybrid search combining semantic and full-text search results,
+    keeping each result's combined score.
+
     Args:
         db: SQLite database connection.
         query_text: The user's search query.
@@ -65,43 +182,37 @@ def hybrid_search(
         limit: The final number of results to return.
         k_semantic: Number of candidates to retrieve from semantic search.
         k_fts: Number of candidates to retrieve from full-text search.
+        vector_index: Optional compact vector tier. When given, the semantic stage
+                      shortlists candidates from it and re-ranks them exactly
+                      instead of running the brute-force vec0 KNN.
+        allowed_ids: Optional metadata pre-filter (see `game_filters`). Applied
+                     inside both the KNN and the FTS query rather than afterwards.
+        query_embedding: The query's embedding, if it's already computed (e.g. to
+                         search several databases with one embedding request).
 
     Returns:
-        A list of game IDs, ordered by relevance.
+        (game ID, combined score in [0, 1]) pairs, best first. Both stages'
+        scores are normalized within this database's candidates.
     """
-    cursor = db.cursor()
-    query_embedding = get_embedding_for_query(query_text)
+    if allowed_ids is not None and not allowed_ids:
+        return []
 
-    # For sqlite-vec, the MATCH operator expects a JSON string representation of the vector.
-    # We will now also include k={k_semantic} in the match string.
-    vector_as_json_string = json.dumps(query_embedding)
-    match_query_argument = f"{vector_as_json_string} and k= {k_semantic} "
-
-    # 1. Semantic Search (using sqlite-vec's vec0 MATCH operator, using raw bytes for embedding)
-    import struct
-
-    def serialize_f32(vector: List[float]) -> bytes:
-        """Serializes a list of floats into a compact 'raw bytes' format for sqlite-vec."""
-        return struct.pack(f"{len(vector)}f", *vector)
+    cursor = db.cursor()
+    if query_embedding is None:
+        with span("embedding"):
+            query_embedding = get_embedding_for_query(query_text)
 
+    # 1. Semantic Search (vec0 KNN, or the compact tier + exact re-rank)
     semantic_results: Dict[str, float] = {}
     try:
-        # Use parameterized query with raw bytes for the embedding vector
-        semantic_query = f"""
-            SELECT game_id, distance
-            FROM game_embs
-            WHERE vector MATCH ?
-                AND k = ?
-            ORDER BY distance
-        """
-        # Use the serialize_f32 function to convert the embedding to bytes
-        cursor.execute(
-            semantic_query,
-            (serialize_f32(query_embedding), k_semantic),
-        )
-        raw_semantic_scores = {
-            row["game_id"]: float(row["distance"]) for row in cursor.fetchall()
-        }
+        with span("knn"):
+            raw_semantic_scores = semantic_search(
+                db=db,
+                query_embedding=query_embedding,
+                k=k_semantic,
+                vector_index=vector_index,
+                allowed_ids=allowed_ids,
+            )
 
         # Normalize: convert distance to similarity and scale to 0-1
         if raw_semantic_scores:
@@ -137,15 +248,30 @@ def hybrid_search(
         # The schema setup uses `CREATE VIRTUAL TABLE games_fts USING fts5(id UNINDEXED, text);`
         # And populates it. Then it queries `SELECT id, rank FROM games_fts WHERE text MATCH ? ORDER BY rank`.
         # The `rank` here is an implicit column from FTS5. Lower values of rank are better (more relevant).
-        cursor.execute(
-            """
-            SELECT id, rank
-            FROM games_fts
-            WHERE text MATCH ? ORDER BY rank LIMIT ?;
-            """,
-            (query_text, k_fts),
-        )
-        raw_fts_scores = {row["id"]: float(row["rank"]) for row in cursor.fetchall()}
+        with span("fts"):
+            if allowed_ids is None:
+                cursor.execute(
+                    """
+                    SELECT id, rank
+                    FROM games_fts
+                    WHERE text MATCH ? ORDER BY rank LIMIT ?;
+                    """,
+                    (query_text, k_fts),
+                )
+            else:
+                cursor.execute(
+                    """
+                    SELECT id, rank
+                    FROM games_fts
+                    WHERE text MATCH ?
+                        AND id IN (SELECT value FROM json_each(?))
+                    ORDER BY rank LIMIT ?;
+                    """,
+                    (query_text, json.dumps(list(allowed_ids)), k_fts),
+                )
+            raw_fts_scores = {
+                row["id"]: float(row["rank"]) for row in cursor.fetchall()
+            }
 
         if raw_fts_scores:
             min_rank = min(raw_fts_scores.values())
@@ -162,25 +288,26 @@ def hybrid_search(
         print(f"Error during FTS search: {e}")
 
     # 3. Combine and Rank
-    combined_scores: Dict[str, float] = {}
-    all_game_ids = set(semantic_results.keys()) | set(fts_results.keys())
+    with span("fusion"):
+        combined_scores: Dict[str, float] = {}
+        all_game_ids = set(semantic_results.keys()) | set(fts_results.keys())
 
-    lexical_weight = 1.0 - semantic_weight
+        lexical_weight = 1.0 - semantic_weight
 
-    for game_id in all_game_ids:
-        s_score = semantic_results.get(game_id, 0.0)
-        f_score = fts_results.get(game_id, 0.0)
+        for game_id in all_game_ids:
+            s_score = semantic_results.get(game_id, 0.0)
+            f_score = fts_results.get(game_id, 0.0)
 
-        # If a game is only in one result set, we might want to penalize it slightly
-        # or ensure the weights still make sense.
-        # For now, a simple weighted sum.
-        combined_scores[game_id] = (semantic_weight * s_score) + (
-            lexical_weight * f_score
-        )
+            # If a game is only in one result set, we might want to penalize it slightly
+            # or ensure the weights still make sense.
+            # For now, a simple weighted sum.
+            combined_scores[game_id] = (semantic_weight * s_score) + (
+                lexical_weight * f_score
+            )
 
-    # Sort by combined score in descending order
-    sorted_game_ids = sorted(
-        combined_scores.keys(), key=lambda gid: combined_scores[gid], reverse=True
-    )
+        # Sort by combined score in descending order
+        sorted_game_ids = sorted(
+            combined_scores.keys(), key=lambda gid: combined_scores[gid], reverse=True
+        )
 
-    return sorted_game_ids[:limit]
+    return [(game_id, combined_scores[game_id]) for game_id in sorted_game_ids[:limit]]
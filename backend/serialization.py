@@ -0,0 +1,137 @@
+"""
+Fast JSON responses for payloads that are already validated.
+
+The routes build their Pydantic models by hand, so the models are valid by the
+time they're returned. Returning them as-is makes FastAPI validate them a second
+time against the route's `response_model`, convert them to plain Python objects,
+and only then encode them with the stdlib `json` module. For `/api/games/all`
+that's thousands of objects per request.
+
+Instead, hot routes return `model_response(...)`, which encodes the models once
+with a cached Pydantic `TypeAdapter` (pydantic-core's Rust serializer, no
+validation). Routes still declare `response_model` so the OpenAPI docs are
+unchanged; FastAPI skips it when a `Response` is returned. Everything else goes
+through `FastJSONResponse`, the app's default response class, which encodes with
+orjson instead of the stdlib encoder.
+
+`parse_fields` handles the `fields=` projection parameter, which the serializer
+applies while encoding.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Set, Type
+
+# Third-party imports
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+
+# ================
+# JSON RESPONSES
+# ================
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-encoded JSON response, used as the app's default response class."""
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(type_: Any) -> TypeAdapter:
+    """Returns a cached TypeAdapter, since building one compiles a serializer."""
+    return TypeAdapter(type_)
+
+
+def dump_json(
+    value: Any, type_: Any, include: Any = None, exclude: Any = None
+) -> bytes:
+    """
+    Encodes already-validated models (or lists of them) as JSON bytes,
+    optionally keeping only the fields in `include` and leaving out those in
+    `exclude` (Pydantic include / exclude syntax).
+    """
+    return get_type_adapter(type_).dump_json(value, include=include, exclude=exclude)
+
+
+def json_bytes_response(
+    content: bytes,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Wraps pre-encoded JSON bytes in a response."""
+    return Response(
+        content=content,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def model_response(
+    value: Any,
+    type_: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    include: Any = None,
+    exclude: Any = None,
+) -> Response:
+    """
+    Encodes already-validated models straight to a JSON response.
+
+    Args:
+        value: A model, or a list of models, that is valid for `type_`.
+        type_: The type to serialize `value` as, e.g. `List[SearchResult]`.
+        status_code: Response status code.
+        headers: Optional extra response headers.
+        include: Optional field projection, in Pydantic include syntax (use
+                 `{"__all__": fields}` for lists).
+        exclude: Optional fields to leave out, in Pydantic exclude syntax.
+
+    Returns:
+        A response FastAPI sends as-is (no `response_model` re-validation).
+    """
+    return json_bytes_response(
+        dump_json(value, type_, include=include, exclude=exclude),
+        status_code=status_code,
+        headers=headers,
+    )
+
+
+# ================
+# FIELD PROJECTION
+# ================
+
+
+def parse_fields(
+    fields: Optional[str],
+    model: Type[BaseModel],
+    always: Iterable[str] = ("id",),
+) -> Optional[Set[str]]:
+    """
+    Parses a comma-separated `fields=` query parameter against a model.
+
+    Args:
+        fields: The raw parameter (None or blank means every field).
+        model: The response model the fields must belong to.
+        always: Fields that are always returned.
+
+    Returns:
+        The set of fields to return, or None for every field.
+
+    Raises:
+        HTTPException: 400 if a field isn't part of the model.
+    """
+    requested = {item.strip() for item in (fields or "").split(",") if item.strip()}
+    if not requested:
+        return None
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field(s): {', '.join(sorted(unknown))}",
+        )
+    return requested | set(always)
@@ -0,0 +1,107 @@
+"""
+The similar-games graph, in memory, for recommendations.
+
+`game_similar` holds each game's ranked list of similar games. The graph loads
+it once per process into compressed sparse rows: game IDs are numbered in sorted
+order, `neighbors[indptr[i]:indptr[i + 1]]` are game `i`'s similar games in rank
+order, and both are flat NumPy arrays. A recommendation request then counts
+neighbors in memory instead of querying SQLite.
+
+The arrays are built before the server forks its workers (see `gunicorn.conf.py`),
+so every worker shares one copy of them.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import sqlite3
+from collections import Counter
+from typing import Dict, Iterable, List
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from db import catalog_of
+
+
+# =====
+# GRAPH
+# =====
+
+
+class SimilarGamesGraph:
+    """Each game's ranked similar games, as compressed sparse rows."""
+
+    def __init__(self, game_ids: List[str], indptr: np.ndarray, neighbors: np.ndarray):
+        # Sorted, so iterating nodes in order is iterating game IDs in order
+        self.game_ids = game_ids
+        self.node_of: Dict[str, int] = {
+            game_id: i for i, game_id in enumerate(game_ids)
+        }
+        self.indptr = indptr
+        self.neighbors = neighbors
+
+    @classmethod
+    def from_db(cls, db: sqlite3.Connection) -> "SimilarGamesGraph":
+        """Loads the graph from the normalized `game_similar` table."""
+        edges = db.execute(
+            "SELECT game_id, similar_game_id FROM game_similar ORDER BY game_id, rank"
+        ).fetchall()
+        game_ids = sorted(
+            {row["game_id"] for row in edges}
+            | {row["similar_game_id"] for row in edges}
+        )
+        node_of = {game_id: i for i, game_id in enumerate(game_ids)}
+
+        sources = np.fromiter(
+            (node_of[row["game_id"]] for row in edges), np.int32, len(edges)
+        )
+        neighbors = np.fromiter(
+            (node_of[row["similar_game_id"]] for row in edges), np.int32, len(edges)
+        )
+        indptr = np.zeros(len(game_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(game_ids)), out=indptr[1:])
+        return cls(game_ids, indptr, neighbors)
+
+    def recommend(self, played_ids: Iterable[str], exclude_played: bool) -> List[str]:
+        """
+        Ranks the similar games of the played games by how many list them.
+
+        Ties keep the order the edges are read in (played games by ID, then
+        rank), which is the order the SQL version of this counted them in.
+
+        Args:
+            played_ids: IDs of the games played; unknown IDs are ignored.
+            exclude_played: Whether to leave the played games out.
+
+        Returns:
+            Game IDs, most often similar first.
+        """
+        played = set(played_ids)
+        nodes = sorted(self.node_of[i] for i in played if i in self.node_of)
+        counts: Counter = Counter()
+        for node in nodes:
+            start, end = self.indptr[node], self.indptr[node + 1]
+            counts.update(self.neighbors[start:end].tolist())
+
+        recommended = []
+        for node, _ in counts.most_common():
+            game_id = self.game_ids[node]
+            if exclude_played and game_id in played:
+                continue
+            recommended.append(game_id)
+        return recommended
+
+
+# ==============
+# GRAPH REGISTRY
+# ==============
+
+
+def get_similar_graph(db: sqlite3.Connection) -> SimilarGamesGraph:
+    """Returns the catalog's similar-games graph, loading it on first use."""
+    return catalog_of(db).derived(
+        "similar_graph", lambda: SimilarGamesGraph.from_db(db)
+    )
@@ -0,0 +1,55 @@
+"""
+`GET /api/games/{game_id}`: `similar_game_cards` is only in the response with
+`expand=similar`, so plain game details keep their payload.
+"""
+
+# =====
+# SETUP
+# =====
+# Third-party imports
+import pytest
+from fastapi.testclient import TestClient
+
+# Local imports
+import db
+import main
+from benchmarks.fixtures import build_fixture_db
+
+# ==========
+# CONSTANTS
+# ==========
+GAME_ID = "game-0000000"
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+@pytest.fixture
+def client(tmp_path) -> TestClient:
+    """Serves a fixture database, until the test is done."""
+    path = build_fixture_db(str(tmp_path / "database.sqlite"), 50)
+    previous = db.swap_catalog(db.Catalog(path))
+    yield TestClient(main.app)
+    db.swap_catalog(previous).close()
+
+
+# =====
+# TESTS
+# =====
+
+
+@pytest.mark.parametrize("query", ["", "?fields=name,similar_games"])
+def test_no_similar_cards_without_the_expansion(client, query):
+    game = client.get(f"/api/games/{GAME_ID}{query}").json()
+    assert "similar_game_cards" not in game
+    assert game["similar_games"]
+
+
+@pytest.mark.parametrize("query", ["?expand=similar", "?fields=name&expand=similar"])
+def test_similar_cards_with_the_expansion(client, query):
+    game = client.get(f"/api/games/{GAME_ID}{query}").json()
+    plain = client.get(f"/api/games/{GAME_ID}").json()
+    cards = game["similar_game_cards"]
+    assert [card["id"] for card in cards] == plain["similar_games"]
@@ -0,0 +1,120 @@
+"""
+Hot reload under concurrent requests (see `catalog_reload`): swapping databases
+fails no request, and every response comes from one database only.
+
+Each fixture database has a different number of games, so a response's body
+tells which database answered it, and its ETag (see `http_cache`) which database
+the middleware thought was served. They must agree.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import asyncio
+import os
+from typing import Dict, List
+
+# Third-party imports
+import httpx
+import pytest
+
+# Local imports
+import db
+import main
+from benchmarks.fixtures import build_fixture_db
+from catalog_reload import CatalogReloader
+from http_cache import RELEASE, make_etag
+
+# ==========
+# CONSTANTS
+# ==========
+# Games in each release, in publishing order
+RELEASE_GAMES = (300, 400, 500)
+
+CLIENTS = 8
+
+# Requests each client makes after the last swap
+REQUESTS_AFTER_SWAPS = 5
+
+# Paths whose body gives the number of games served
+COUNTED_PATHS = ("/api/games/count", "/api/games/browse?limit=5")
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def served_games(path: str, body: Dict) -> int:
+    """The number of games in the database that answered a request."""
+    if path.startswith("/api/games/count"):
+        return body["total_games"]
+    return body["total"]
+
+
+@pytest.fixture
+def releases(tmp_path) -> List[str]:
+    """Builds the releases and serves the first, until the test is done."""
+    paths = []
+    for i, n_games in enumerate(RELEASE_GAMES):
+        path = build_fixture_db(str(tmp_path / f"{i:04d}.sqlite"), n_games, seed=i)
+        # Stamped, as the image's database is: opening a database rewrites it
+        with open(f"{path}{db.VERSION_SUFFIX}", "w") as f:
+            f.write(f"release-{i}")
+        paths.append(path)
+    previous = db.swap_catalog(db.Catalog(paths[0]))
+    yield paths
+    db.swap_catalog(previous).close()
+
+
+# =====
+# TESTS
+# =====
+
+
+def test_swaps_serve_one_version_per_response(releases):
+    # ETag -> games of the release it belongs to
+    games_by_etag = {
+        make_etag(db.read_db_version(path), RELEASE): n_games
+        for path, n_games in zip(releases, RELEASE_GAMES)
+    }
+    reloader = CatalogReloader(os.path.dirname(releases[0]))
+    responses = []
+
+    async def client(i: int, http: httpx.AsyncClient, swapped: asyncio.Event):
+        after = 0
+        while after < REQUESTS_AFTER_SWAPS:
+            path = COUNTED_PATHS[i % len(COUNTED_PATHS)]
+            after_swaps = swapped.is_set()
+            response = await http.get(path)
+            responses.append((path, after_swaps, response))
+            i += 1
+            after += after_swaps
+
+    async def check():
+        swapped = asyncio.Event()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as http:
+            clients = [
+                asyncio.create_task(client(i, http, swapped)) for i in range(CLIENTS)
+            ]
+            for path in releases[1:]:
+                await asyncio.sleep(0.05)
+                assert await reloader.reload(path)
+            swapped.set()
+            await asyncio.gather(*clients)
+
+    asyncio.run(check())
+
+    assert responses
+    for path, after_swaps, response in responses:
+        assert response.status_code == 200, (path, response.text)
+        etag = response.headers["etag"]
+        assert etag in games_by_etag, (path, etag)
+        # The body is from the database the ETag names
+        assert served_games(path, response.json()) == games_by_etag[etag], path
+        if after_swaps:
+            assert games_by_etag[etag] == RELEASE_GAMES[-1], path
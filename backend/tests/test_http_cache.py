@@ -0,0 +1,46 @@
+"""
+Header parsing in `http_cache`: quality lists (`Accept-Encoding`, `Accept`).
+"""
+
+# =====
+# SETUP
+# =====
+# Third-party imports
+import pytest
+
+# Local imports
+from http_cache import accepts, parse_qualities
+
+
+# =====
+# TESTS
+# =====
+
+
+def test_parse_qualities():
+    assert parse_qualities("gzip, br;q=0.5, identity; q=0, x;q=oops") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "identity": 0.0,
+        "x": 0.0,
+    }
+    assert parse_qualities(None) == {}
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, gzip",
+    [
+        ("gzip", True),
+        ("GZIP;q=0.3, br", True),
+        ("gzip;q=0", False),
+        ("gzip;q=0.0, *", False),
+        ("x-gzip", False),
+        ("deflate, br", False),
+        ("*", True),
+        ("*;q=0", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_accepts(accept_encoding, gzip):
+    assert accepts(accept_encoding, "gzip") is gzip
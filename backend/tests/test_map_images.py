@@ -0,0 +1,34 @@
+"""
+Image format negotiation for the booth crops and map tiles (see `map_images`).
+"""
+
+# =====
+# SETUP
+# =====
+# Third-party imports
+import pytest
+
+# Local imports
+import map_images
+
+
+# =====
+# TESTS
+# =====
+
+
+@pytest.mark.parametrize(
+    "accept, requested, fmt",
+    [
+        ("image/avif,image/webp,*/*", None, "avif"),
+        ("image/avif;q=0, image/webp", None, "webp"),
+        ("image/webp;q=0, image/avif;q=0, */*", None, "jpeg"),
+        ("*/*", None, "jpeg"),
+        (None, None, "jpeg"),
+        ("image/avif", "webp", "webp"),
+    ],
+)
+def test_negotiate_format(monkeypatch, accept, requested, fmt):
+    formats = ["avif", "webp", "jpeg"]
+    monkeypatch.setattr(map_images, "supported_formats", lambda: formats)
+    assert map_images.negotiate_format(accept, requested) == fmt
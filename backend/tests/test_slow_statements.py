@@ -0,0 +1,79 @@
+"""
+The slow-statement log (see `db.TimedCursor`): a statement read in batches is
+logged once per slow batch, and its `execute` on its own.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import sqlite3
+import time
+
+# Third-party imports
+import pytest
+
+# Local imports
+import db
+
+# ==========
+# CONSTANTS
+# ==========
+SLOW_STATEMENT_MS = 25
+
+# Rows of SLOW_ROWS_SQL, each taking `slow`'s sleep to produce
+SLOW_ROWS_SQL = """
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+SELECT slow(i) AS i FROM n
+"""
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+@pytest.fixture
+def timed_conn(tmp_path, monkeypatch):
+    """A connection timing its statements, with a low slow-statement threshold."""
+    path = str(tmp_path / "empty.sqlite")
+    sqlite3.connect(path).close()
+    monkeypatch.setattr(db, "SLOW_STATEMENT_MS", SLOW_STATEMENT_MS)
+    conn = db.open_connection(path)
+    yield conn
+    db.close_connection(conn)
+
+
+def sleeping_rows(conn: sqlite3.Connection, row_ms: float):
+    """Registers `slow(x)`, which sleeps `row_ms` and returns `x`."""
+    conn.create_function("slow", 1, lambda x: time.sleep(row_ms / 1000) or x)
+
+
+def logged(capsys) -> int:
+    return capsys.readouterr().out.count("Slow SQL statement")
+
+
+# =====
+# TESTS
+# =====
+
+
+def test_each_slow_batch_is_logged(timed_conn, capsys):
+    # sqlite3 reads one row ahead: execute reads 1 row, each batch 4
+    sleeping_rows(timed_conn, 10)
+    cursor = timed_conn.execute(SLOW_ROWS_SQL, (9,))
+    assert logged(capsys) == 0
+    batches = []
+    while batch := cursor.fetchmany(4):
+        batches.append(batch)
+
+    assert [len(batch) for batch in batches] == [4, 4, 1]
+    assert logged(capsys) == 2
+
+
+def test_slow_execute_is_logged_before_the_batches(timed_conn, capsys):
+    sleeping_rows(timed_conn, 30)
+    cursor = timed_conn.execute(SLOW_ROWS_SQL, (3,))
+    assert logged(capsys) == 1
+    cursor.fetchmany(2)
+    assert logged(capsys) == 1
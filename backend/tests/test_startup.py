@@ -0,0 +1,25 @@
+"""
+Startup budget (see `benchmarks.startup`), checked without building the image.
+"""
+
+# =====
+# SETUP
+# =====
+# Local imports
+from benchmarks.startup import STARTUP_BUDGET_MS, measure_startup
+
+# ==========
+# CONSTANTS
+# ==========
+RUNS = 3
+
+
+# =====
+# TESTS
+# =====
+
+
+def test_no_lazy_module_imported_and_ready_within_budget():
+    startup = measure_startup(RUNS)
+    assert not startup["lazy_modules"], "imported by main"
+    assert startup["ready_ms"] <= STARTUP_BUDGET_MS, startup
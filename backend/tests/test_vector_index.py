@@ -0,0 +1,79 @@
+"""
+Persisted vector artifacts (see `build_indexes.py`): the API loads them, with the
+float32 vectors memory-mapped, when they're built after the database's last
+write, as the Dockerfile does.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import time
+
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local imports
+import db
+from benchmarks.fixtures import build_fixture_db
+from catalog_snapshot import CatalogSnapshot, write_snapshot_history
+from vector_index import build_vector_index, get_vector_index, vector_artifacts_fresh
+
+# ==========
+# CONSTANTS
+# ==========
+TIER = "int8"
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def store_snapshot_history(path: str) -> None:
+    """Writes the database's snapshot history, as `build_snapshots.py` does."""
+    with db.get_db_connection(path) as conn:
+        snapshot = CatalogSnapshot.from_db(conn)
+        with conn:
+            write_snapshot_history(conn, {snapshot.version: (0.0, snapshot.data)})
+
+
+def served_index(path: str):
+    """The tier's index as a fresh catalog of `path` gets it."""
+    catalog = db.Catalog(path)
+    try:
+        with catalog.pool.connection() as conn:
+            return get_vector_index(conn, TIER)
+    finally:
+        catalog.close()
+
+
+@pytest.fixture
+def database(tmp_path) -> str:
+    return build_fixture_db(str(tmp_path / "database.sqlite"), 200)
+
+
+# =====
+# TESTS
+# =====
+
+
+def test_artifacts_built_last_are_loaded(database):
+    store_snapshot_history(database)
+    with db.get_db_connection(database) as conn:
+        build_vector_index(conn, TIER, database)
+
+    assert vector_artifacts_fresh(TIER, database)
+    assert isinstance(served_index(database).full_vectors, np.memmap)
+
+
+def test_writing_after_the_artifacts_builds_in_memory(database):
+    with db.get_db_connection(database) as conn:
+        build_vector_index(conn, TIER, database)
+    # Modification times may be coarser than the build
+    time.sleep(0.01)
+    store_snapshot_history(database)
+
+    assert not vector_artifacts_fresh(TIER, database)
+    assert not isinstance(served_index(database).full_vectors, np.memmap)
@@ -7,12 +7,10 @@ This module contains various utility functions related to the OpenAI APIs.
 # =====
 # The code below will help to set up the rest of this utility file.
 
-from dotenv import load_dotenv
-load_dotenv(override=True)
-
 # General import statements
 import time
 import random
+from functools import lru_cache
 from typing import List, Optional, Tuple, Union, Callable
 from concurrent.futures import ThreadPoolExecutor
 
@@ -57,6 +55,29 @@ OPENAI_MODEL_RATE_LIMITS = {
 # Now, I'll define some utility methods that will help to interact with the OpenAI API.
 
 
+@lru_cache(maxsize=None)
+def _load_env() -> None:
+    """
+    Loads the `.env` file (the OpenAI API key) into the environment, once. This
+    runs when the first request is made rather than at import time, so importing
+    this module has no side effects.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+
+
+@lru_cache(maxsize=None)
+def get_openai_client() -> OpenAI:
+    """
+    Returns the process-wide OpenAI client. Reusing it keeps its HTTP connections
+    (and their TLS sessions) open between requests, instead of paying a new
+    handshake for every query embedding.
+    """
+    _load_env()
+    return OpenAI()
+
+
 def _calculate_sleep_time(
     tokens: Optional[int], model: str, n_workers: int, multiplier: float = 1.35
 ) -> float:
@@ -134,6 +155,7 @@ def _generate_completion_with_backoff(
     """
 
     # Submit the completion request
+    _load_env()
     completion = openai.beta.chat.completions.parse(
         model=gpt_model,
         messages=messages,
@@ -199,6 +221,7 @@ def generate_embeddings_for_texts(
     max_tokens_per_batch: int = 8_191,
     show_progress: bool = True,
     progress_callback: Optional[Callable[[int], None]] = None,
+    usage_callback: Optional[Callable[[str, float, Optional[int]], None]] = None,
 ) -> np.ndarray:
     """
     This function generates embeddings for a list of texts using an OpenAI embedding model.
@@ -212,6 +235,9 @@ def generate_embeddings_for_texts(
         show_progress (bool): Whether to show a progress bar.
         progress_callback (Optional[Callable[[int], None]]): Optional callback function to report progress.
             Callback function should accept an integer representing completed items.
+        usage_callback (Optional[Callable[[str, float, Optional[int]], None]]): Optional callback called
+            after each API request with the model name, the request's latency in seconds, and the
+            tokens billed (None if the request failed).
 
     Returns:
         np.ndarray: An array of embeddings for the texts.
@@ -229,7 +255,7 @@ def generate_embeddings_for_texts(
         max_tokens_per_batch = 8_191
 
     # Setting up the OpenAI client
-    openai_client = OpenAI()
+    openai_client = get_openai_client()
 
     # -------------
     # Batching Text
@@ -274,14 +300,26 @@ def generate_embeddings_for_texts(
     )
     def _emb_helper(text_list: List[str], openai_client: OpenAI):
         # Generate the embeddings for the current batch
-
-        if embedding_n_dimensions is not None:
-            response = openai_client.embeddings.create(
-                input=text_list, model=model_name, dimensions=embedding_n_dimensions
-            )
-        else:
-            response = openai_client.embeddings.create(
-                input=text_list, model=model_name
+        start_time = time.perf_counter()
+        try:
+            if embedding_n_dimensions is not None:
+                response = openai_client.embeddings.create(
+                    input=text_list, model=model_name, dimensions=embedding_n_dimensions
+                )
+            else:
+                response = openai_client.embeddings.create(
+                    input=text_list, model=model_name
+                )
+        except Exception:
+            if usage_callback:
+                usage_callback(model_name, time.perf_counter() - start_time, None)
+            raise
+        if usage_callback:
+            usage = getattr(response, "usage", None)
+            usage_callback(
+                model_name,
+                time.perf_counter() - start_time,
+                getattr(usage, "total_tokens", 0),
             )
 
         # Extract the embeddings
@@ -0,0 +1,759 @@
+"""
+In-memory vector indexes for the semantic stage of hybrid search.
+
+The `game_embs` vec0 table holds full 1536-d float32 vectors and vec0 answers KNN
+queries by brute force. The indexes in this module replace that scan:
+
+- the compact tiers keep a much smaller copy of the vectors in memory (int8 scalar
+  codes, binary sign codes, or truncated low-dimensional embeddings), use it to
+  produce a wide candidate shortlist, and re-rank only that shortlist exactly
+  against the float32 vectors;
+- the IVF tier clusters the vectors with k-means and only scans the inverted
+  lists of the `nprobe` closest centroids, for catalogs too large to brute force.
+
+The float32 vectors are exported once to a memory-mapped `.npy` file next to the
+database, so the re-rank only pages in the rows of the shortlisted candidates.
+(Point lookups against vec0 read whole vector chunks and are far too slow for it.)
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import os
+import sqlite3
+import tempfile
+from typing import BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from db import DATABASE_PATH, catalog_of
+
+# ==========
+# CONSTANTS
+# ==========
+# The tier used by the API. "exact" keeps the original brute-force vec0 KNN.
+VECTOR_TIERS = ("exact", "int8", "binary", "reduced", "ivf")
+VECTOR_TIER = os.environ.get("PAXPAL_VECTOR_TIER", "exact")
+
+# Dimensionality of the "reduced" tier. text-embedding-3 models are trained so that
+# a truncated, re-normalized prefix is itself a usable embedding.
+REDUCED_DIMENSIONS = int(os.environ.get("PAXPAL_REDUCED_DIMENSIONS", "256"))
+
+# IVF settings. 0 inverted lists means "pick from the catalog size" (~sqrt(n)).
+IVF_N_LISTS = int(os.environ.get("PAXPAL_IVF_LISTS", "0"))
+IVF_NPROBE = int(os.environ.get("PAXPAL_IVF_NPROBE", "8"))
+
+# How many more candidates than requested the compact tier hands to the re-ranker
+DEFAULT_OVERSAMPLE = int(os.environ.get("PAXPAL_VECTOR_OVERSAMPLE", "4"))
+
+# Number of rows scored at a time, which bounds the temporary float32 buffer
+# needed to score int8 codes.
+_SCORING_BLOCK_ROWS = 8_192
+
+# Lookup table for counting set bits, used when numpy lacks `bitwise_count`
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def compact_index_path(tier: str, database_path: str = DATABASE_PATH) -> str:
+    """
+    Returns the path of the persisted compact tier that sits next to the database.
+    For example, `database.sqlite` -> `database.int8.npz` or `database.reduced256.npz`.
+    """
+    if tier == "reduced":
+        tier = f"reduced{REDUCED_DIMENSIONS}"
+    return f"{os.path.splitext(database_path)[0]}.{tier}.npz"
+
+
+def full_vectors_path(database_path: str = DATABASE_PATH) -> str:
+    """
+    Returns the path of the float32 vector export used for exact re-ranking.
+    For example, `database.sqlite` -> `database.f32.npy`.
+    """
+    return f"{os.path.splitext(database_path)[0]}.f32.npy"
+
+
+def _is_fresh(path: str, database_path: str = DATABASE_PATH) -> bool:
+    """Whether a derived artifact exists and is at least as new as the database."""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(
+        database_path
+    )
+
+
+def vector_artifacts_fresh(tier: str, database_path: str = DATABASE_PATH) -> bool:
+    """
+    Whether a tier's persisted artifacts (see `build_indexes.py`) are newer than
+    the database, so `get_vector_index` loads them instead of building the tier
+    in memory. Writing to the database afterwards makes them stale.
+    """
+    index_path = compact_index_path(tier, database_path)
+    full_path = full_vectors_path(database_path)
+    return _is_fresh(index_path, database_path) and _is_fresh(full_path, database_path)
+
+
+def load_embeddings(db: sqlite3.Connection) -> Tuple[List[str], np.ndarray]:
+    """
+    Loads every vector from `game_embs` into a float32 matrix.
+
+    Returns:
+        A tuple of (game IDs, matrix of shape (n_games, embedding_dim)).
+    """
+    rows = db.execute("SELECT game_id, vector FROM game_embs").fetchall()
+    if not rows:
+        return [], np.zeros((0, 0), dtype=np.float32)
+
+    ids = [row["game_id"] for row in rows]
+    matrix = np.frombuffer(
+        b"".join(row["vector"] for row in rows), dtype=np.float32
+    ).reshape(len(ids), -1)
+    return ids, matrix
+
+
+def popcount_rows(packed: np.ndarray) -> np.ndarray:
+    """Counts the set bits in each row of a packed uint8 matrix."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(packed).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT_TABLE[packed].sum(axis=1, dtype=np.int32)
+
+
+def _top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Returns the indices of the n smallest scores, smallest first."""
+    n = min(n, scores.shape[0])
+    if n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if n < scores.shape[0]:
+        candidates = np.argpartition(scores, n - 1)[:n]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(scores[candidates], kind="stable")]
+
+
+def truncate_embeddings(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Shortens embeddings to their first `dimensions` components and re-normalizes
+    them. For text-embedding-3 models this is the same transformation the API
+    applies when a smaller `dimensions` is requested.
+    """
+    truncated = np.asarray(vectors, dtype=np.float32)[..., :dimensions]
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (truncated / norms).astype(np.float32)
+
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Assigns each vector to its closest centroid (L2), in bounded-size blocks."""
+    centroid_sq_norms = np.einsum("ij,ij->i", centroids, centroids)
+    assignments = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], _SCORING_BLOCK_ROWS):
+        block = np.asarray(vectors[start : start + _SCORING_BLOCK_ROWS])
+        scores = centroid_sq_norms - 2.0 * (block @ centroids.T)
+        assignments[start : start + block.shape[0]] = scores.argmin(axis=1)
+    return assignments
+
+
+def kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 20,
+    max_training_points: int = 50_000,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Runs Lloyd's k-means on (a sample of) the vectors and returns the centroids.
+    Empty clusters are re-seeded from random training points.
+    """
+    rng = np.random.default_rng(seed)
+    n_points = vectors.shape[0]
+    n_clusters = max(1, min(n_clusters, n_points))
+    sample = rng.choice(n_points, size=min(n_points, max_training_points), replace=False)
+    training = np.asarray(vectors[np.sort(sample)], dtype=np.float32)
+
+    centroids = training[
+        rng.choice(training.shape[0], size=n_clusters, replace=False)
+    ].copy()
+    for _ in range(n_iter):
+        assignments = _nearest_centroids(training, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_clusters)
+        non_empty = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts[non_empty])[:-1]))
+        sums = np.add.reduceat(training[order], starts, axis=0)
+        centroids[non_empty] = sums / counts[non_empty, None]
+
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            centroids[empty] = training[rng.choice(training.shape[0], size=empty.size)]
+    return centroids.astype(np.float32)
+
+
+def write_atomically(path: str, write: Callable[[BinaryIO], None]) -> None:
+    """
+    Writes a file through a uniquely named temp file in the same directory, then
+    renames it into place. A reader never sees a half-written file, and two
+    builds writing the same file don't clobber each other's temp file.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates it private to its owner
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def export_full_vectors(vectors: np.ndarray, path: str) -> None:
+    """Writes the float32 matrix used for re-ranking as a plain `.npy` file."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    write_atomically(path, lambda f: np.save(f, vectors))
+
+
+# ==============
+# VECTOR INDEXES
+# ==============
+
+
+class CompactVectorIndex:
+    """
+    Base class for the in-memory vector tiers.
+
+    Subclasses only decide how the candidate shortlist is produced, usually by
+    scoring every row in a compact space (`_approximate_distances`). Final
+    distances always come from re-ranking the shortlist with the exact float32
+    vectors in `full_vectors`, which is normally a read-only memory map rather
+    than resident memory.
+    """
+
+    tier: str = ""
+
+    def __init__(self, ids: List[str], full_vectors: np.ndarray):
+        self.ids = ids
+        self.full_vectors = full_vectors
+        self._row_of: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes held by the compact representation."""
+        raise NotImplementedError
+
+    def _approximate_distances(
+        self, query: np.ndarray, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Scores the stored vectors (or only `rows`, if given) against the query;
+        lower is closer.
+        """
+        raise NotImplementedError
+
+    def save(self, path: str) -> None:
+        raise NotImplementedError
+
+    @staticmethod
+    def _write_npz(path: str, **arrays: np.ndarray) -> None:
+        """Writes the arrays so a reader never sees a half-written index."""
+        write_atomically(path, lambda f: np.savez(f, **arrays))
+
+    def rows_for_ids(self, game_ids) -> np.ndarray:
+        """
+        Maps game IDs to sorted row numbers, skipping IDs without a vector. Used to
+        turn a metadata pre-filter into the `allowed_rows` of a search.
+        """
+        if self._row_of is None:
+            self._row_of = {game_id: row for row, game_id in enumerate(self.ids)}
+        rows = [self._row_of[gid] for gid in game_ids if gid in self._row_of]
+        return np.sort(np.array(rows, dtype=np.int64))
+
+    def shortlist(
+        self,
+        query: Sequence[float],
+        n: int,
+        allowed_rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Returns the row indices of the n closest vectors in the compact space,
+        considering only `allowed_rows` when a pre-filter is given.
+        """
+        if not self.ids:
+            return np.zeros(0, dtype=np.int64)
+        query_array = np.asarray(query, dtype=np.float32)
+        if allowed_rows is None:
+            return _top_n(self._approximate_distances(query_array), n)
+        scores = self._approximate_distances(query_array, rows=allowed_rows)
+        return allowed_rows[_top_n(scores, n)]
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int,
+        oversample: int = DEFAULT_OVERSAMPLE,
+        allowed_rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Finds the k nearest games to the query.
+
+        The compact tier produces a shortlist of `k * oversample` candidates, which
+        is then re-ranked with exact L2 distances from the float32 vectors, so the
+        distances are on the same scale as vec0's. When `allowed_rows` is given,
+        only those rows are ever scored, so a filtered search returns a full k
+        (if that many rows match) and costs no more than an unfiltered one.
+
+        Returns:
+            A list of (game ID, L2 distance) tuples, closest first.
+        """
+        candidate_rows = self.shortlist(
+            query, k * max(oversample, 1), allowed_rows=allowed_rows
+        )
+        if candidate_rows.size == 0:
+            return []
+
+        # Sorting the rows keeps memory-mapped reads in file order
+        candidate_rows = np.sort(candidate_rows)
+        query_array = np.asarray(query, dtype=np.float32)
+        distances = np.linalg.norm(
+            self.full_vectors[candidate_rows] - query_array, axis=1
+        )
+        return [
+            (self.ids[candidate_rows[i]], float(distances[i]))
+            for i in _top_n(distances, k)
+        ]
+
+
+class QuantizedVectorIndex(CompactVectorIndex):
+    """
+    A quantized copy of the `game_embs` vectors.
+
+    - The "int8" tier stores per-dimension min/max scalar-quantized codes (4x smaller
+      than float32) and scores candidates with an asymmetric L2 estimate.
+    - The "binary" tier stores one sign bit per dimension (32x smaller) and scores
+      candidates by Hamming distance.
+    """
+
+    def __init__(
+        self,
+        tier: str,
+        ids: List[str],
+        codes: np.ndarray,
+        full_vectors: np.ndarray,
+        offset: Optional[np.ndarray] = None,
+        scale: Optional[np.ndarray] = None,
+        sq_norms: Optional[np.ndarray] = None,
+    ):
+        if tier not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantized vector tier '{tier}'.")
+        super().__init__(ids=ids, full_vectors=full_vectors)
+        self.tier = tier
+        self.codes = codes
+        self.offset = offset
+        self.scale = scale
+        self.sq_norms = sq_norms
+
+    @classmethod
+    def build(
+        cls, tier: str, ids: List[str], vectors: np.ndarray
+    ) -> "QuantizedVectorIndex":
+        """
+        Quantizes a float32 matrix into the requested compact tier. The matrix
+        itself is kept as `full_vectors` for re-ranking.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        if tier == "binary":
+            codes = np.packbits(vectors > 0, axis=1)
+            return cls(tier=tier, ids=list(ids), codes=codes, full_vectors=vectors)
+
+        if tier == "int8":
+            offset = vectors.min(axis=0)
+            scale = (vectors.max(axis=0) - offset) / 255.0
+            scale[scale == 0] = 1.0
+            codes = (np.rint((vectors - offset) / scale) - 128).astype(np.int8)
+
+            # Keep the squared norms of the *dequantized* vectors so that the
+            # approximate L2 distance is consistent with the codes.
+            dequantized = (codes.astype(np.float32) + 128.0) * scale + offset
+            sq_norms = np.einsum("ij,ij->i", dequantized, dequantized).astype(
+                np.float32
+            )
+            return cls(
+                tier=tier,
+                ids=list(ids),
+                codes=codes,
+                full_vectors=vectors,
+                offset=offset.astype(np.float32),
+                scale=scale.astype(np.float32),
+                sq_norms=sq_norms,
+            )
+
+        raise ValueError(f"Unknown quantized vector tier '{tier}'.")
+
+    def save(self, path: str) -> None:
+        """
+        Persists the compact tier as an uncompressed .npz file. The float32 vectors
+        are written separately with `export_full_vectors`.
+        """
+        arrays = {
+            "tier": np.array(self.tier),
+            "ids": np.array(self.ids),
+            "codes": self.codes,
+        }
+        if self.tier == "int8":
+            arrays.update(offset=self.offset, scale=self.scale, sq_norms=self.sq_norms)
+        self._write_npz(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str, full_vectors_file: str) -> "QuantizedVectorIndex":
+        """
+        Loads a compact tier previously written by `save`, memory-mapping the
+        float32 vectors from `full_vectors_file`.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            tier = str(data["tier"])
+            return cls(
+                tier=tier,
+                ids=data["ids"].tolist(),
+                codes=data["codes"],
+                full_vectors=np.load(full_vectors_file, mmap_mode="r"),
+                offset=data["offset"] if tier == "int8" else None,
+                scale=data["scale"] if tier == "int8" else None,
+                sq_norms=data["sq_norms"] if tier == "int8" else None,
+            )
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes held by the compact codes and quantization parameters."""
+        total = self.codes.nbytes
+        for array in (self.offset, self.scale, self.sq_norms):
+            if array is not None:
+                total += array.nbytes
+        return total
+
+    def _approximate_distances(
+        self, query: np.ndarray, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.tier == "binary":
+            query_bits = np.packbits(query > 0)
+            return popcount_rows(np.bitwise_xor(codes, query_bits)).astype(
+                np.float32
+            )
+
+        # int8: ||v||^2 - 2 * v.q, where v is the dequantized vector. The
+        # ||q||^2 term is constant for the query, so it's left out.
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        scaled_query = (query * self.scale).astype(np.float32)
+        constant = 128.0 * float(query @ self.scale) + float(query @ self.offset)
+        dots = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], _SCORING_BLOCK_ROWS):
+            block = codes[start : start + _SCORING_BLOCK_ROWS]
+            dots[start : start + block.shape[0]] = (
+                block.astype(np.float32) @ scaled_query
+            )
+        return sq_norms - 2.0 * (dots + constant)
+
+
+class ReducedDimVectorIndex(CompactVectorIndex):
+    """
+    A truncated, low-dimensional copy of the `game_embs` vectors (256-d by default).
+
+    The coarse stage scans the small matrix with the query truncated the same way,
+    which cuts both memory and scan cost by `1536 / dimensions`; the fine stage
+    re-scores the shortlist at full dimension.
+    """
+
+    tier = "reduced"
+
+    def __init__(
+        self, ids: List[str], reduced_vectors: np.ndarray, full_vectors: np.ndarray
+    ):
+        super().__init__(ids=ids, full_vectors=full_vectors)
+        self.reduced_vectors = reduced_vectors
+
+    @property
+    def dimensions(self) -> int:
+        return self.reduced_vectors.shape[1]
+
+    @classmethod
+    def build(
+        cls, ids: List[str], vectors: np.ndarray, dimensions: int = REDUCED_DIMENSIONS
+    ) -> "ReducedDimVectorIndex":
+        """Truncates a float32 matrix to `dimensions` components."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return cls(
+            ids=list(ids),
+            reduced_vectors=truncate_embeddings(vectors, dimensions),
+            full_vectors=vectors,
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Persists the reduced vectors as an uncompressed .npz file. The float32
+        vectors are written separately with `export_full_vectors`.
+        """
+        self._write_npz(
+            path, ids=np.array(self.ids), reduced_vectors=self.reduced_vectors
+        )
+
+    @classmethod
+    def load(cls, path: str, full_vectors_file: str) -> "ReducedDimVectorIndex":
+        """
+        Loads reduced vectors previously written by `save`, memory-mapping the
+        float32 vectors from `full_vectors_file`.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                ids=data["ids"].tolist(),
+                reduced_vectors=data["reduced_vectors"],
+                full_vectors=np.load(full_vectors_file, mmap_mode="r"),
+            )
+
+    @property
+    def nbytes(self) -> int:
+        return self.reduced_vectors.nbytes
+
+    def _approximate_distances(
+        self, query: np.ndarray, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        # Both sides are unit-norm, so ||a - b||^2 = 2 - 2 * a.b and ranking by
+        # the negated dot product is equivalent.
+        reduced = self.reduced_vectors if rows is None else self.reduced_vectors[rows]
+        reduced_query = truncate_embeddings(query, self.dimensions)
+        return -(reduced @ reduced_query)
+
+
+class IVFVectorIndex(CompactVectorIndex):
+    """
+    An inverted-file (IVF-flat) approximate nearest-neighbor index.
+
+    The vectors are partitioned into `n_lists` clusters with k-means. A query is
+    compared against the centroids, and only the vectors in the `nprobe` closest
+    lists are scored, exactly, against the float32 vectors. Raising `nprobe`
+    trades speed for recall; `nprobe == n_lists` is an exact search.
+    """
+
+    tier = "ivf"
+
+    def __init__(
+        self,
+        ids: List[str],
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        list_rows: np.ndarray,
+        full_vectors: np.ndarray,
+        nprobe: int = IVF_NPROBE,
+    ):
+        super().__init__(ids=ids, full_vectors=full_vectors)
+        self.centroids = centroids
+        self.centroid_sq_norms = np.einsum("ij,ij->i", centroids, centroids)
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.nprobe = nprobe
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(
+        cls,
+        ids: List[str],
+        vectors: np.ndarray,
+        n_lists: int = IVF_N_LISTS,
+        nprobe: int = IVF_NPROBE,
+        seed: int = 0,
+    ) -> "IVFVectorIndex":
+        """Clusters the vectors and builds the inverted lists."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if n_lists <= 0:
+            n_lists = max(1, int(round(np.sqrt(vectors.shape[0]))))
+        centroids = kmeans(vectors, n_lists, seed=seed)
+
+        # Each list holds its row numbers in ascending order, so a probe reads the
+        # (memory-mapped) vectors front to back.
+        assignments = _nearest_centroids(vectors, centroids)
+        list_rows = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=centroids.shape[0])
+        list_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(
+            ids=list(ids),
+            centroids=centroids,
+            list_offsets=list_offsets,
+            list_rows=list_rows.astype(np.int64),
+            full_vectors=vectors,
+            nprobe=nprobe,
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Persists the centroids and inverted lists as an uncompressed .npz file. The
+        float32 vectors are written separately with `export_full_vectors`.
+        """
+        self._write_npz(
+            path,
+            ids=np.array(self.ids),
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            list_rows=self.list_rows,
+        )
+
+    @classmethod
+    def load(cls, path: str, full_vectors_file: str) -> "IVFVectorIndex":
+        """
+        Loads an index previously written by `save`, memory-mapping the float32
+        vectors from `full_vectors_file`.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                ids=data["ids"].tolist(),
+                centroids=data["centroids"],
+                list_offsets=data["list_offsets"],
+                list_rows=data["list_rows"],
+                full_vectors=np.load(full_vectors_file, mmap_mode="r"),
+            )
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes held by the centroids and inverted lists."""
+        return (
+            self.centroids.nbytes
+            + self.centroid_sq_norms.nbytes
+            + self.list_offsets.nbytes
+            + self.list_rows.nbytes
+        )
+
+    def shortlist(
+        self,
+        query: Sequence[float],
+        n: int = 0,
+        allowed_rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Returns every row in the `nprobe` lists closest to the query.
+
+        Without a pre-filter `n` is ignored: the probe count, not a candidate
+        count, bounds the scan. With `allowed_rows`, only allowed rows are kept
+        and probing continues past `nprobe` lists until at least `n` candidates
+        have been found (or every list has been probed), so a selective filter
+        can't starve the result list.
+        """
+        if not self.ids:
+            return np.zeros(0, dtype=np.int64)
+        query_array = np.asarray(query, dtype=np.float32)
+        centroid_scores = self.centroid_sq_norms - 2.0 * (self.centroids @ query_array)
+
+        if allowed_rows is None:
+            probed = _top_n(centroid_scores, max(self.nprobe, 1))
+            return np.concatenate(
+                [
+                    self.list_rows[self.list_offsets[i] : self.list_offsets[i + 1]]
+                    for i in probed
+                ]
+            )
+
+        allowed_mask = np.zeros(len(self.ids), dtype=bool)
+        allowed_mask[allowed_rows] = True
+        needed = min(n, allowed_rows.size)
+        candidates: List[np.ndarray] = []
+        n_found = 0
+        for n_probed, i in enumerate(np.argsort(centroid_scores), start=1):
+            rows = self.list_rows[self.list_offsets[i] : self.list_offsets[i + 1]]
+            rows = rows[allowed_mask[rows]]
+            candidates.append(rows)
+            n_found += rows.size
+            if n_probed >= self.nprobe and n_found >= needed:
+                break
+        return np.concatenate(candidates) if candidates else np.zeros(0, np.int64)
+
+
+# ==============
+# INDEX REGISTRY
+# ==============
+
+
+def _index_class(tier: str):
+    if tier == "reduced":
+        return ReducedDimVectorIndex
+    if tier == "ivf":
+        return IVFVectorIndex
+    return QuantizedVectorIndex
+
+
+def build_vector_index(
+    db: sqlite3.Connection,
+    tier: str,
+    database_path: str = DATABASE_PATH,
+    persist: bool = True,
+) -> CompactVectorIndex:
+    """
+    Builds the compact tier from `game_embs`.
+
+    Args:
+        db: Database connection.
+        tier: The compact tier to build.
+        database_path: The database the artifacts sit next to.
+        persist: Whether to write the tier and the float32 export next to the
+                 database and return the index backed by the memory map, as
+                 `build_indexes.py` does. Otherwise the index only lives in
+                 memory, with the float32 vectors resident.
+    """
+    ids, vectors = load_embeddings(db)
+    if tier == "reduced":
+        index = ReducedDimVectorIndex.build(ids=ids, vectors=vectors)
+    elif tier == "ivf":
+        index = IVFVectorIndex.build(ids=ids, vectors=vectors)
+    else:
+        index = QuantizedVectorIndex.build(tier=tier, ids=ids, vectors=vectors)
+    if not persist:
+        return index
+
+    full_path = full_vectors_path(database_path)
+    if not _is_fresh(full_path, database_path):
+        export_full_vectors(vectors, full_path)
+    index_path = compact_index_path(tier, database_path)
+    index.save(index_path)
+    return _index_class(tier).load(index_path, full_path)
+
+
+def get_vector_index(
+    db: sqlite3.Connection, tier: str = VECTOR_TIER
+) -> Optional[CompactVectorIndex]:
+    """
+    Returns the catalog's compact vector index for `tier`, or None for "exact".
+
+    The artifacts written by `build_indexes.py` next to the catalog's database are
+    used when they are newer than it. Requests never write them: without them,
+    the index is built from `game_embs` in memory only, on first use.
+    """
+    if tier == "exact":
+        return None
+    if tier not in VECTOR_TIERS:
+        raise ValueError(
+            f"Unknown vector tier '{tier}'. Expected one of {VECTOR_TIERS}."
+        )
+
+    database_path = catalog_of(db).path
+
+    def load_or_build() -> CompactVectorIndex:
+        if vector_artifacts_fresh(tier, database_path):
+            return _index_class(tier).load(
+                compact_index_path(tier, database_path),
+                full_vectors_path(database_path),
+            )
+        print(
+            f"The {tier} vector index of {database_path} is missing or older than "
+            f"the database (run `python build_indexes.py --db {database_path}`); "
+            "building it in memory."
+        )
+        return build_vector_index(db, tier, database_path, persist=False)
+
+    return catalog_of(db).derived(f"vector_index.{tier}", load_or_build)
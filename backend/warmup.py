@@ -0,0 +1,352 @@
+"""
+Startup warm-up, and the readiness it gates.
+
+Right after a deploy, the first requests would otherwise pay for cold database
+pages, building the in-memory indexes, opening connections, the first OpenAI
+TLS handshake and empty caches. The lifespan starts `WarmUp.run` as a
+background task, so `/health` (liveness) answers at once while `/ready` returns
+a 503 until warm-up is done; Cloud Run's startup probe checks `/ready`, so no
+traffic reaches the instance before then.
+
+The stages, each timed and reported by `/ready`:
+
+1. `schema`: checks that the database has the normalized child tables.
+2. `pages`: reads the database file and the vector index artifacts once, so
+   their pages are in the OS page cache.
+3. `indexes`: builds the in-memory indexes (facets and the `/api/games/all`
+   payload, booths, route planner, booth map, similar-games graph, catalog
+   snapshot, vector index) and the database version used for ETags.
+4. `connections`: sends `WARMUP_CONNECTIONS` concurrent streams of canned
+   database-only requests through the app, which opens that many pooled
+   connections and compiles the hot statements into their statement caches.
+5. `upstream`: embeds one query, which imports the OpenAI SDK and opens the
+   shared client's connection.
+6. `queries`: runs the canned searches end to end.
+
+A stage that fails is logged and reported, and warm-up moves on. If one of the
+`CORE_STAGES` failed (no database, a database that wasn't normalized, requests
+that fail), the instance can't serve and `/ready` keeps answering 503. Other
+failures (no OpenAI key locally, ...) only cost the first requests some latency,
+so the instance becomes ready anyway.
+
+When serving with several workers, `prefork` runs the first two stages once in
+the master process, before forking, so the workers share what they build; each
+worker's own `indexes` stage then finds them already built.
+"""
+
+# =====
+# SETUP
+# =====
+# General imports
+import asyncio
+import gc
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+# Third-party imports
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message
+
+# Local imports
+import search_utils
+from booth_index import get_booth_index
+from catalog_snapshot import get_catalog_snapshot
+from db import DB_POOL_SIZE, Catalog, current_catalog
+from game_filters import get_filter_index
+from map_images import get_booth_map_renderer
+from normalize_db import is_normalized
+from route_planner import get_route_planner
+from similar_games import get_similar_graph
+from vector_index import (
+    VECTOR_TIER,
+    compact_index_path,
+    full_vectors_path,
+    get_vector_index,
+)
+
+# ==========
+# CONSTANTS
+# ==========
+# Searches run end to end once the upstream connection is open
+WARMUP_QUERIES = (
+    "cozy farming game",
+    "roguelike deckbuilder",
+    "co-op horror",
+    "pixel art platformer",
+)
+
+# Concurrent streams of canned requests, i.e. pooled connections warmed
+WARMUP_CONNECTIONS = DB_POOL_SIZE
+
+# Canned requests use this many games
+N_WARMUP_GAMES = 10
+
+PAGE_READ_SIZE = 1 << 20
+
+# Stages without which the instance can't serve: if one fails, it never becomes
+# ready
+CORE_STAGES = ("schema", "indexes", "connections")
+
+
+# ================
+# HELPER FUNCTIONS
+# ================
+
+
+def touch_files(paths: List[str]) -> int:
+    """Reads files once so they're in the page cache; returns the bytes read."""
+    n_bytes = 0
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb", buffering=0) as f:
+            while chunk := f.read(PAGE_READ_SIZE):
+                n_bytes += len(chunk)
+    return n_bytes
+
+
+def touch_pages(catalog: Optional[Catalog] = None):
+    """
+    Reads a catalog's database and vector index artifacts into the page cache.
+
+    Args:
+        catalog: The catalog (defaults to the served one).
+    """
+    path = (catalog or current_catalog()).path
+    paths = [path, f"{path}-wal"]
+    if VECTOR_TIER != "exact":
+        paths += [compact_index_path(VECTOR_TIER, path), full_vectors_path(path)]
+    touch_files(paths)
+
+
+def build_indexes(catalog: Optional[Catalog] = None) -> List[str]:
+    """
+    Builds every in-memory structure the routes read from a catalog, and its
+    version. Uses a connection of its own, which is closed afterwards.
+
+    Args:
+        catalog: The catalog (defaults to the served one).
+
+    Returns:
+        The first `N_WARMUP_GAMES` game IDs, for canned requests.
+    """
+    catalog = catalog or current_catalog()
+    with catalog.connect() as db:
+        if not is_normalized(db):
+            print(
+                "The database has no normalized child tables; "
+                "run `python normalize_db.py` before serving."
+            )
+        # Also encode the /api/games/all payload ahead of the first request
+        get_filter_index(db).table_json
+        get_booth_index(db)
+        get_route_planner(db)
+        get_booth_map_renderer(db)
+        get_similar_graph(db)
+        get_catalog_snapshot(db)
+        get_vector_index(db)
+        game_ids = [
+            row["id"]
+            for row in db.execute(
+                "SELECT id FROM games ORDER BY id LIMIT ?", (N_WARMUP_GAMES,)
+            )
+        ]
+    # Version the database for ETags (hashes the file if there's no stamp)
+    catalog.version
+    return game_ids
+
+
+def prefork():
+    """
+    Builds the in-memory structures in a server's master process, before it
+    forks its workers, so the workers share one copy of them (see
+    `gunicorn.conf.py`).
+
+    Leaves no database connection or OpenAI client open: those can't be
+    shared across a fork, and each worker opens its own during its warm-up.
+    Then freezes the garbage collector's view of every object allocated so far,
+    so collections in the workers don't write to (and so copy) their pages.
+    """
+    start = time.perf_counter()
+    touch_pages()
+    build_indexes()
+    # Only the SDK's modules (no client): every worker imports them to embed
+    # queries, so they're shared too
+    import utils.openai  # noqa: F401
+
+    gc.freeze()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"Built shared indexes before forking in {elapsed_ms:.0f} ms")
+
+
+async def asgi_request(
+    app: ASGIApp, method: str, path: str, query: str = "", body=None
+) -> int:
+    """
+    Sends one request straight to an ASGI app, without a socket.
+
+    Returns:
+        The response status code.
+    """
+    payload = b"" if body is None else json.dumps(body).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"warmup"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("warmup", 80),
+    }
+    body_sent = False
+    status_code = 500
+
+    async def receive() -> Message:
+        nonlocal body_sent
+        if body_sent:
+            return {"type": "http.disconnect"}
+        body_sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message: Message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+
+# =======
+# WARM-UP
+# =======
+
+
+class WarmUp:
+    """Runs the warm-up stages and tracks readiness."""
+
+    def __init__(self):
+        self.ready = False
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        # Stage -> milliseconds, and stage -> error message
+        self.stages: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._game_ids: List[str] = []
+
+    @property
+    def failed(self) -> bool:
+        """Whether a core stage failed, so the instance can't serve."""
+        return any(stage in self.errors for stage in CORE_STAGES)
+
+    @property
+    def serving(self) -> bool:
+        """Whether warm-up is done and every core stage succeeded."""
+        return self.ready and not self.failed
+
+    def status(self) -> dict:
+        """The readiness report served by `/ready`."""
+        if self.failed:
+            state = "failed"
+        else:
+            state = "ready" if self.ready else "warming"
+        return {
+            "status": state,
+            "stages_ms": {name: round(ms, 1) for name, ms in self.stages.items()},
+            "errors": self.errors,
+        }
+
+    # --- Stages ---
+
+    def _check_schema(self):
+        with current_catalog().connect() as db:
+            if not is_normalized(db):
+                raise RuntimeError(
+                    "the database has no normalized child tables; "
+                    "run `python normalize_db.py` before serving"
+                )
+
+    def _touch_pages(self):
+        touch_pages()
+
+    def _build_indexes(self):
+        self._game_ids = build_indexes()
+
+    async def _warm_connections(self, app: ASGIApp):
+        ids = self._game_ids
+        if not ids:
+            raise RuntimeError("no games to warm up with")
+
+        async def stream(i: int):
+            game_id = ids[i % len(ids)]
+            requests = [
+                ("GET", f"/api/games/{game_id}", "", None),
+                ("GET", f"/api/games/{game_id}", "expand=similar", None),
+                ("GET", "/api/games/count", "", None),
+                ("GET", "/api/games/browse", "", None),
+                ("POST", "/api/games/by-ids", "", {"ids": ids}),
+                ("POST", "/api/recommendations/from-played", "", {"ids": ids[:3]}),
+            ]
+            for method, path, query, body in requests:
+                status_code = await asgi_request(app, method, path, query, body)
+                if status_code >= 500:
+                    raise RuntimeError(f"{method} {path} returned {status_code}")
+
+        await asyncio.gather(*(stream(i) for i in range(WARMUP_CONNECTIONS)))
+
+    def _open_upstream(self):
+        search_utils.get_embedding_for_query(WARMUP_QUERIES[0])
+
+    async def _run_queries(self, app: ASGIApp):
+        for query in WARMUP_QUERIES:
+            status_code = await asgi_request(
+                app, "GET", "/api/search", f"q={query.replace(' ', '+')}"
+            )
+            if status_code >= 500:
+                raise RuntimeError(f"search for '{query}' returned {status_code}")
+
+    # --- Running ---
+
+    async def _stage(self, name: str, fn: Callable, *args, blocking: bool = False):
+        start = time.perf_counter()
+        try:
+            if blocking:
+                await run_in_threadpool(fn, *args)
+            else:
+                await fn(*args)
+        except Exception as e:
+            self.errors[name] = f"{type(e).__name__}: {e}"
+            print(f"Warm-up stage '{name}' failed: {self.errors[name]}")
+        finally:
+            self.stages[name] = (time.perf_counter() - start) * 1000
+
+    async def run(self, app: ASGIApp):
+        """Runs every stage, then marks warm-up done."""
+        self.started = time.perf_counter()
+        try:
+            await self._stage("schema", self._check_schema, blocking=True)
+            await self._stage("pages", self._touch_pages, blocking=True)
+            await self._stage("indexes", self._build_indexes, blocking=True)
+            await self._stage("connections", self._warm_connections, app)
+            await self._stage("upstream", self._open_upstream, blocking=True)
+            await self._stage("queries", self._run_queries, app)
+        finally:
+            self.finished = time.perf_counter()
+            self.ready = True
+            total_ms = (self.finished - self.started) * 1000
+            print(f"Warm-up done in {total_ms:.0f} ms: {self.status()}")
+
+
+# The process-wide warm-up
+WARMUP = WarmUp()
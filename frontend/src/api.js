@@ -1,11 +1,20 @@
 const API_BASE_URL = "/api"; // In dev, Vite proxy handles this; in prod, it's same-origin
 
-export async function fetchGameDetails(gameId) {
+// `expand` may list related data to embed in the response, e.g. ["similar"]
+// adds the similar games' cards as `similar_game_cards`.
+export async function fetchGameDetails(gameId, expand = []) {
   if (!gameId) {
     throw new Error("Game ID is required");
   }
 
-  const response = await fetch(`${API_BASE_URL}/games/${gameId}`);
+  const params = new URLSearchParams();
+  if (expand.length > 0) {
+    params.append("expand", expand.join(","));
+  }
+  const query = params.toString();
+  const response = await fetch(
+    `${API_BASE_URL}/games/${gameId}${query ? `?${query}` : ""}`
+  );
 
   if (!response.ok) {
     // Handle different error statuses
@@ -21,7 +30,9 @@ export async function fetchGameDetails(gameId) {
 }
 
 // Add other API functions here as needed
-export async function searchGames(query, semanticWeight, limit) {
+// `filters` may contain: platforms (array), tags (array), released (bool),
+// boothMin / boothMax (numbers). They are applied server-side inside the search.
+export async function searchGames(query, semanticWeight, limit, filters = {}) {
   if (!query) {
     throw new Error("Search query is required");
   }
@@ -34,6 +45,17 @@ export async function searchGames(query, semanticWeight, limit) {
   if (limit !== undefined) {
     params.append("limit", limit);
   }
+  (filters.platforms || []).forEach((p) => params.append("platform", p));
+  (filters.tags || []).forEach((t) => params.append("tag", t));
+  if (filters.released !== undefined) {
+    params.append("released", filters.released);
+  }
+  if (filters.boothMin !== undefined) {
+    params.append("booth_min", filters.boothMin);
+  }
+  if (filters.boothMax !== undefined) {
+    params.append("booth_max", filters.boothMax);
+  }
 
   const response = await fetch(`${API_BASE_URL}/search?${params.toString()}`);
 
@@ -13,6 +13,9 @@ function BoothMapHighlightPage() {
     loaded: false,
   });
   const [isFullscreen, setIsFullscreen] = useState(false);
+  // Show the backend's small pre-highlighted crop first; the full 1.3 MB map
+  // (and booths.json) is only loaded when asked for, or if the crop fails.
+  const [showFullMap, setShowFullMap] = useState(false);
   const mapContainerRef = useRef(null);
 
   useEffect(() => {
@@ -24,6 +27,9 @@ function BoothMapHighlightPage() {
   }, [boothId]);
 
   useEffect(() => {
+    if (!showFullMap) {
+      return;
+    }
     fetch("/booths.json")
       .then((res) => {
         if (!res.ok) {
@@ -38,7 +44,7 @@ function BoothMapHighlightPage() {
           "Could not load booth information. Please try again later. 😕"
         );
       });
-  }, []);
+  }, [showFullMap]);
 
   useEffect(() => {
     const handleFullscreenChange = () => {
@@ -94,6 +100,35 @@ function BoothMapHighlightPage() {
     );
   }
 
+  if (!showFullMap) {
+    const cropUrl = (width) =>
+      `/api/booths/${encodeURIComponent(currentBoothIdString)}/map?width=${width}`;
+    return (
+      <>
+        <Title order={2} ta="center" mb="xl">
+          Map: Booth {currentBoothIdString}
+        </Title>
+        <Center>
+          <Box style={{ width: "100%", maxWidth: 640 }}>
+            <Image
+              src={cropUrl(480)}
+              srcSet={`${cropUrl(320)} 320w, ${cropUrl(480)} 480w, ${cropUrl(640)} 640w, ${cropUrl(960)} 960w`}
+              sizes="(max-width: 640px) 100vw, 640px"
+              alt={`PAX Map - Highlight for Booth ${currentBoothIdString}`}
+              onError={() => setShowFullMap(true)}
+              style={{ display: "block", width: "100%", aspectRatio: "1 / 1" }}
+            />
+            <Center mt="md">
+              <Button variant="default" onClick={() => setShowFullMap(true)}>
+                Show full map
+              </Button>
+            </Center>
+          </Box>
+        </Center>
+      </>
+    );
+  }
+
   if (!boothsData && !error) {
     return (
       <Center style={{ height: "100vh" }}>
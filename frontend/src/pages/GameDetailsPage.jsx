@@ -63,11 +63,15 @@ function GameDetailsPage() {
       setSimilarGamesLoading(false);
       setSimilarGamesError(null);
       try {
-        const data = await fetchGameDetails(id);
+        const data = await fetchGameDetails(id, ["similar"]);
         console.log("Game data:", data);
         setGame(data);
 
-        if (data && data.similar_games && data.similar_games.length > 0) {
+        if (data && Array.isArray(data.similar_game_cards)) {
+          // The cards came embedded in the detail response
+          setSimilarGames(data.similar_game_cards);
+        } else if (data && data.similar_games && data.similar_games.length > 0) {
+          // Older backends don't support expand=similar; fetch the cards separately
           setSimilarGamesLoading(true);
           try {
             const similarData = await fetchGamesByIds(data.similar_games);